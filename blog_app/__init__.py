@@ -1,22 +1,49 @@
+import asyncio
+import contextlib
 import logging
 import traceback
-from typing import Any, List, Optional
+from typing import Any, Callable, Dict, List, Optional
+from starlette.responses import JSONResponse, PlainTextResponse, Response
 from starlette.types import Receive, Scope, Send
 
 import strawberry
-from strawberry.asgi import GraphQL, ExecutionResult, GraphQLHTTPResponse
+from strawberry.asgi import GraphQL, ExecutionResult, GraphQLHTTPResponse, Request
 
 from .core import AppRequest
 from .adapters.auth0 import Auth0Authenticator
 from .auth.resolvers import send_login_code, login_with_code, refresh_login
-from .comments.resolvers import add_comment, update_comment, delete_comment
+from .comments.resolvers import (
+    add_comment,
+    add_comments,
+    update_comment,
+    delete_comment,
+)
 from .comments.types import Comment
-from .posts.resolvers import get_posts, create_post, update_post, delete_post
+from .posts.resolvers import (
+    get_posts,
+    create_post,
+    create_posts,
+    update_post,
+    delete_post,
+)
 from .posts.types import Post
-from .reactions.resolvers import set_reaction, delete_reaction
+from .reactions.resolvers import set_reaction, set_reactions, delete_reaction
 from .reactions.types import Reaction
+from .search.resolvers import search
+from .common.logic import MAX_BATCH_SIZE
 from .context import build_context
-from .database import create_model_map
+from .core.model import SqlStats
+from .core.model.slow_queries import current_operation
+from .database import (
+    check_shard_ids,
+    create_model_map,
+    create_purger,
+    create_reaction_writer,
+    dispose_engines,
+    pool_stats,
+    sql_budget,
+    warm_up_pools,
+)
 from .settings import load, Settings
 
 
@@ -25,6 +52,13 @@ class Query:
     posts = strawberry.field(
         get_posts, description="Retreive a queryable collection of posts."
     )
+    search = strawberry.field(
+        search,
+        description="Search the titles and content of posts, and the content of"
+        " comments, for `query`. Results are ordered by relevance, and paged like"
+        " a collection: at most `first` results (default 20, at most 100) that"
+        " follow the result with the cursor `after`.",
+    )
 
 
 @strawberry.type
@@ -49,7 +83,16 @@ class Mutation:
     # post mutations
     create_post = strawberry.field(
         create_post,
-        description="Create a new post" " with supplied `title` and `content`.",
+        description="Create a new post"
+        " with supplied `title` and `content`."
+        " Retrying with the same `idempotencyKey` returns the post created the"
+        " first time.",
+    )
+    create_posts = strawberry.field(
+        create_posts,
+        description="Create a new post for each of the supplied `posts`"
+        f" (at most {MAX_BATCH_SIZE}). All posts are created together; a result is"
+        " returned for each, in the same order.",
     )
     update_post = strawberry.field(
         update_post,
@@ -60,13 +103,22 @@ class Mutation:
     delete_post = strawberry.field(
         delete_post,
         description="Delete the post"
-        " with the given `id`. All attached comments (and reactions to those comments)"
-        " will also be deleted.",
+        " with the given `id`. The post, its comments and the reactions to them"
+        " are hidden at once, and purged in the background.",
     )
 
     # comment mutations
     add_comment = strawberry.field(
-        add_comment, description="Add a comment to the post with the given `postId`."
+        add_comment,
+        description="Add a comment to the post with the given `postId`."
+        " Retrying with the same `idempotencyKey` returns the comment added the"
+        " first time.",
+    )
+    add_comments = strawberry.field(
+        add_comments,
+        description="Add each of the supplied `comments` to the post with its"
+        f" `postId` (at most {MAX_BATCH_SIZE}). All comments are added together; a"
+        " result is returned for each, in the same order.",
     )
     update_comment = strawberry.field(
         update_comment, description="Update the comment with the given `id`."
@@ -82,13 +134,37 @@ class Mutation:
         " Any previously set reactions by the logged in user to the same comment"
         " are removed.",
     )
+    set_reactions = strawberry.field(
+        set_reactions,
+        description="Set each of the supplied `reactions` to the comment with its"
+        f" `commentId` (at most {MAX_BATCH_SIZE}), as with `setReaction`. If a comment is given more than once,"
+        " the last reaction for it is kept. A result is returned for each reaction,"
+        " in the same order.",
+    )
     delete_reaction = strawberry.field(
         delete_reaction, description="Delete the reaction with the given `id`."
     )
 
 
+# run at startup to warm up the schema, resolvers and loaders; no post has
+# the id 0, so it loads nothing.
+WARM_UP_QUERY = "query WarmUp { posts { byId(ids: [0]) { id title } } }"
+
+
 class BlogApp(GraphQL):
     settings: Settings
+    # answers 200 once the app has warmed up, and 503 until then (and while
+    # it shuts down)
+    readiness_path = "/ready"
+    # answers with the state of the database connection pools, see `pool_stats`
+    pool_stats_path = "/stats/pool"
+    # answers with the progress of the purger, see `purge_progress`
+    purge_progress_path = "/stats/purge"
+    # seconds between attempts to warm up, while the databases can't be reached
+    warm_up_retry_interval = 5.0
+    # the lowest and highest ids of each shard checked at startup, see
+    # `check_shard_ids`; `devtools check-shards` checks every row.
+    shard_check_sample = 1000
 
     def __init__(self, **kwargs):
         # These are types that strawberry can't detect because they aren't returned
@@ -103,38 +179,213 @@ class BlogApp(GraphQL):
 
         self.settings = load()
         self.model_map = create_model_map(self.settings.database)
+        self.reaction_writer = create_reaction_writer(
+            self.settings.database, self.model_map
+        )
+        self.purger = create_purger(self.settings.database, self.model_map)
+        self.sql_budget = sql_budget(self.settings.database)
+        # shared by all requests, so that the signing keys it fetches are kept
+        self.authenticator = Auth0Authenticator(self.settings.auth)
+        self.ready = False
+        self._warming_up: Optional[asyncio.Future] = None
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send):
         if scope["type"] == "lifespan":
             while True:
                 message = await receive()
                 if message["type"] == "lifespan.startup":
-                    await self.startup()
+                    try:
+                        await self.startup()
+                    except Exception as err:
+                        await send(
+                            {"type": "lifespan.startup.failed", "message": str(err)}
+                        )
+                        raise
                     await send({"type": "lifespan.startup.complete"})
                 elif message["type"] == "lifespan.shutdown":
                     await self.shutdown()
                     await send({"type": "lifespan.shutdown.complete"})
                     return
+        elif scope["type"] == "http" and scope["path"] == self.readiness_path:
+            response = PlainTextResponse(
+                "ready" if self.ready else "not ready",
+                status_code=200 if self.ready else 503,
+            )
+            await response(scope, receive, send)
+        elif scope["type"] == "http" and scope["path"] == self.pool_stats_path:
+            await JSONResponse(self.pool_stats())(scope, receive, send)
+        elif scope["type"] == "http" and scope["path"] == self.purge_progress_path:
+            await JSONResponse(self.purge_progress())(scope, receive, send)
         else:
             await super().__call__(scope, receive, send)
 
     async def startup(self):
-        ...
+        """
+        Warm up before reporting that the app is ready: open connections to
+        the databases, fetch the keys that sign tokens, and run a query
+        through the schema, so that the first requests don't wait for any of
+        them.
+
+        If the databases can't be reached, the app starts anyway but isn't
+        ready until they can be, trying to warm up again every
+        `warm_up_retry_interval` seconds. It fails to start if a shard holds
+        rows that belong on another (of those with its lowest or highest ids).
+        """
+        if self.purger:
+            self.purger.start()
+
+        if not await self._warm_up():
+            self._warming_up = asyncio.ensure_future(self._retry_warm_up())
+
+    async def _warm_up(self) -> bool:
+        """Warm up, and return whether the app is ready."""
+        try:
+            await check_shard_ids(self.model_map, self.shard_check_sample)
+            await asyncio.gather(
+                warm_up_pools(
+                    self.model_map, self.settings.database.warm_up_connections
+                ),
+                self._fetch_signing_keys(),
+            )
+        except ValueError:
+            raise
+        except Exception:
+            logging.warning("Could not connect to the databases.", exc_info=True)
+            return False
+
+        await self._run_warm_up_query()
+        self.ready = True
+        return True
+
+    async def _retry_warm_up(self):
+        while True:
+            await asyncio.sleep(self.warm_up_retry_interval)
+            try:
+                if await self._warm_up():
+                    return
+            except ValueError:
+                logging.exception("The app won't be ready.")
+                return
+
+    async def _fetch_signing_keys(self):
+        if not self.settings.auth.domain:
+            return
+
+        try:
+            await self.authenticator.fetch_signing_keys()
+        except Exception:
+            # they're fetched again when the first token is verified
+            logging.warning("Could not fetch the token signing keys.", exc_info=True)
+
+    async def _run_warm_up_query(self):
+        request = Request({"type": "http", "method": "POST", "headers": []})
+        context: Any = await self.get_context(request)
+
+        try:
+            result = await self.execute(
+                WARM_UP_QUERY, context=context, operation_name="WarmUp"
+            )
+        finally:
+            await context.session.close()
+
+        if result.errors:
+            logging.warning("The warm up query failed: %s", result.errors)
 
     async def shutdown(self):
-        # the same db engine is shared by all modules
-        await self.model_map["post"].engine.dispose()
+        # stop taking requests before the engines are closed
+        self.ready = False
+
+        if self._warming_up:
+            self._warming_up.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._warming_up
+
+        if self.purger:
+            await self.purger.close()
+
+        if self.reaction_writer:
+            await self.reaction_writer.close()
+
+        # the same db engines are shared by all modules
+        await dispose_engines(self.model_map)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        Report the state of the database connection pool: its size, the
+        connections checked in/out and in overflow, a histogram of checkout
+        wait times, and counts of checkouts that timed out or failed.
+        """
+        return pool_stats(self.model_map)
+
+    def purge_progress(self) -> Optional[Dict[str, Any]]:
+        """
+        Report the progress of the background purge of deleted posts: the
+        posts left to purge, the post being purged, and the rows deleted
+        from each table so far.
+        """
+        return self.purger.progress() if self.purger else None
 
     async def get_context(
         self, request: AppRequest, response: Optional[Any] = None
     ) -> Optional[Any]:
-        authenticator = Auth0Authenticator(self.settings.auth)
+        sql_stats = None
+
+        if self._shows_sql_stats(request) or self.sql_budget.enabled:
+            # kept with the request, for `process_result`
+            sql_stats = request.state.sql_stats = SqlStats(self.sql_budget)
+
         return await build_context(
             request=request,
-            authenticator=authenticator,
+            authenticator=self.authenticator,
             model_map=self.model_map,
+            reaction_writer=self.reaction_writer,
+            plan_queries=self.settings.database.plan_queries,
+            sql_stats=sql_stats,
         )
 
+    def _shows_sql_stats(self, request: AppRequest) -> bool:
+        return self.debug or self.settings.database.sql_stats_header in request.headers
+
+    async def execute(
+        self, query, variables=None, context=None, operation_name=None, root_value=None
+    ):
+        # names the operation in the slow query log
+        token = current_operation.set(operation_name)
+        try:
+            return await super().execute(
+                query,
+                variables=variables,
+                context=context,
+                operation_name=operation_name,
+                root_value=root_value,
+            )
+        finally:
+            current_operation.reset(token)
+
+    async def get_http_response(
+        self,
+        request: Request,
+        execute: Callable,
+        process_result: Callable,
+        graphiql: bool,
+        root_value: Optional[Any],
+        context: Optional[Any],
+    ) -> Response:
+        try:
+            return await super().get_http_response(
+                request=request,
+                execute=execute,
+                process_result=process_result,
+                graphiql=graphiql,
+                root_value=root_value,
+                context=context,
+            )
+        finally:
+            # the response has been fully resolved, so the request's connection
+            # can go back to the pool before the response is sent.
+            if context is not None:
+                await context.session.close()
+
     async def process_result(
         self, request: AppRequest, result: ExecutionResult
     ) -> GraphQLHTTPResponse:
@@ -150,6 +401,17 @@ class BlogApp(GraphQL):
                         "".join(traceback.format_tb(error.original_error.__traceback__))
                     )
 
+        sql_stats: Optional[SqlStats] = getattr(request.state, "sql_stats", None)
+        if sql_stats:
+            # statements rejected within a resolver may have been reported
+            # as an `InternalError` instead.
+            rejection = sql_stats.rejection()
+            errors = data.get("errors") or []
+            if rejection and all(err["message"] != rejection for err in errors):
+                data["errors"] = [*errors, {"message": rejection}]
+            if self._shows_sql_stats(request):
+                data["extensions"] = {"sql": sql_stats.report()}  # type: ignore[misc]
+
         return data
 
 
@@ -156,6 +156,16 @@ class Auth0Authenticator(Authenticator):
             self._handle_token_response
         )
 
+    async def fetch_signing_keys(self):
+        """
+        Fetch the keys that sign id tokens, which are cached (for 10 minutes)
+        by the signature verifier, so that verifying the first token doesn't
+        wait for them.
+        """
+        # the verifier only fetches the keys when asked for one by its id
+        fetcher = self.signature_verifier._fetcher
+        await asyncio.to_thread(fetcher._fetch_jwks)
+
     async def parse_id_token(self, token: str) -> User:
         """Verify that the id token generated is correct and return the payload."""
         issuer = f"https://{self.settings.domain}/".format(self.settings.domain)
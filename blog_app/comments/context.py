@@ -3,11 +3,11 @@ from typing import Any, List, Optional
 
 from strawberry.dataloader import DataLoader
 
-from blog_app.core.helpers import Loader
+from blog_app.core.helpers import Loader, Selection
 from blog_app.core.model import ModelHelper, ModelMap
 from blog_app.core.protocols import CommentContext
 
-from .types import Comment
+from .types import Comment, COMMENT_FIELD_COLUMNS
 
 
 @dataclass
@@ -16,10 +16,25 @@ class Context:
     model: ModelHelper
 
     @property
-    def by_post_id(self):
-        return self.loader.get_group_dataloader("post_id")
+    def dataloader(self) -> DataLoader[int, Optional[Comment]]:
+        return self.loader.dataloader
+
+    def by_post_id(self, selection: Selection = None):
+        columns = self.loader.project(selection, "post_id")
+        return self.loader.get_group_dataloader("post_id", columns)
+
+    def page_by_post_id(self, selection: Selection = None):
+        columns = self.loader.project(selection, "post_id")
+        return self.loader.get_page_dataloader("post_id", columns)
+
+    def count_by_post_id(self):
+        return self.loader.get_count_dataloader("post_id")
 
 
 async def build_comment_context(model_map: ModelMap) -> CommentContext:
-    loader = Loader(constructor=Comment, model=model_map["comment"])
+    loader = Loader(
+        constructor=Comment,
+        model=model_map["comment"],
+        field_columns=COMMENT_FIELD_COLUMNS,
+    )
     return Context(loader=loader, model=model_map["comment"])
@@ -1,5 +1,5 @@
 import logging
-from typing import Union, cast
+from typing import List, Optional, Union, cast
 
 import strawberry
 from strawberry.types import Info
@@ -11,10 +11,16 @@ from blog_app.core import (
     InternalError,
     ItemNotFoundError,
 )
-from blog_app.common.logic import EditType, handle_create, handle_edit, Unauthorized
+from blog_app.common.logic import (
+    EditType,
+    handle_create,
+    handle_create_many,
+    handle_edit,
+    Unauthorized,
+)
 from blog_app.auth.types import AuthError
 from .context import Context as LocalContext
-from .types import CommentResponse, CommentDeletionResponse
+from .types import CommentInput, CommentResponse, CommentDeletionResponse
 
 CommentError = Union[AuthError, InternalError]
 CommentEditError = Union[CommentError, ItemNotFoundError]
@@ -48,7 +54,10 @@ def get_comments_model(info: Info[AppContext, AppRequest]):
 
 
 async def add_comment(
-    post_id: int, content: str, info: Info[AppContext, AppRequest]
+    post_id: int,
+    content: str,
+    info: Info[AppContext, AppRequest],
+    idempotency_key: Optional[str] = None,
 ) -> Union[CommentResponse, CommentError]:
     return (
         (
@@ -56,6 +65,7 @@ async def add_comment(
                 {"post_id": post_id, "content": content},
                 info.context.auth,
                 get_comments_model(info),
+                idempotency_key=idempotency_key,
             )
         )
         .map(lambda comment_id: CommentResponse(id=comment_id, content=content))
@@ -64,6 +74,25 @@ async def add_comment(
     )
 
 
+async def add_comments(
+    comments: List[CommentInput], info: Info[AppContext, AppRequest]
+) -> List[Union[CommentResponse, CommentError]]:
+    created = await handle_create_many(
+        [
+            {"post_id": comment.post_id, "content": comment.content}
+            for comment in comments
+        ],
+        info.context.auth,
+        get_comments_model(info),
+    )
+    return [
+        created.map(lambda ids: CommentResponse(id=ids[i], content=comment.content))
+        .map_err(coerce_error)
+        .collapse()
+        for i, comment in enumerate(comments)
+    ]
+
+
 async def update_comment(
     id: int, content: str, info: Info[AppContext, AppRequest]
 ) -> Union[CommentResponse, CommentEditError]:
@@ -1,15 +1,35 @@
 from datetime import datetime
-
+from typing import List
 
 import strawberry
 from strawberry.types import Info
 
-from blog_app.core import AppComment, AppContext, AppRequest, Person, AppReaction
-from blog_app.core.helpers import Collection
+from blog_app.core import (
+    AppComment,
+    AppContext,
+    AppRequest,
+    AppReaction,
+    AppReactionType,
+    Person,
+    ReactionCount,
+)
+from blog_app.core.helpers import IdOrderedCollection
+
+
+# columns needed by the fields of `Comment` that aren't loaded from a column of
+# the same name.
+COMMENT_FIELD_COLUMNS = {
+    "author": ["author_id"],
+    "reactions": ["id"],
+    "reaction_counts": ["id"],
+}
 
 
 @strawberry.type(name="Comment_")
 class Comment(AppComment):
+    # items are built from rows by the thousand, see `Loader._build`
+    __slots__ = ("id", "post_id", "author_id", "content", "created", "updated")
+
     id: int
     post_id: int
     author_id: strawberry.ID
@@ -26,8 +46,34 @@ class Comment(AppComment):
     @strawberry.field
     async def reactions(
         self, info: Info[AppContext, AppRequest]
-    ) -> Collection[AppReaction]:
-        return Collection(lambda: info.context.reactions.by_comment_id.load(self.id))
+    ) -> IdOrderedCollection[AppReaction]:
+        return IdOrderedCollection(
+            lambda selection: info.context.reactions.by_comment_id(selection).load(
+                self.id
+            ),
+            lambda request, selection: info.context.reactions.page_by_comment_id(
+                selection
+            ).load((self.id, request)),
+        )
+
+    @strawberry.field
+    async def reaction_counts(
+        self, info: Info[AppContext, AppRequest]
+    ) -> List[ReactionCount]:
+        counts = await info.context.reactions.count_by_comment_id().load(self.id)
+        return [
+            ReactionCount(
+                reaction_type=reaction_type,
+                count=counts.get((reaction_type,), 0),
+            )
+            for reaction_type in AppReactionType
+        ]
+
+
+@strawberry.input
+class CommentInput:
+    post_id: int
+    content: str
 
 
 @strawberry.type
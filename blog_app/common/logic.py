@@ -1,10 +1,14 @@
 from enum import Enum
-from typing import Iterable, Mapping, NewType, Union
+from typing import Iterable, List, Mapping, NewType, Optional, Sequence, Union
 
 from blog_app.core import Result, AppError, InternalError, ItemNotFoundError
 from blog_app.core.helpers import Loader
 from blog_app.core.protocols import AuthContext, Person
-from blog_app.core.model import ModelHelper
+from blog_app.core.model import ModelHelper, WriteCoalescer
+
+
+# the most items created by one call of `handle_create_many`
+MAX_BATCH_SIZE = 100
 
 
 class Unauthorized(AppError):
@@ -34,12 +38,47 @@ def remove_falsy_values(
 
 
 async def handle_create(
-    args: dict, auth: AuthContext, model: ModelHelper, *, on_conflict_set: dict = None
+    args: dict,
+    auth: AuthContext,
+    model: Union[ModelHelper, WriteCoalescer],
+    *,
+    on_conflict_set: dict = None,
+    idempotency_key: Optional[str] = None,
 ) -> Result[int, Union[AppError, InternalError]]:
+    """
+    Create an item for the logged in user. With an `idempotency_key`, an
+    item that was already created with the same key is returned instead.
+    """
+    # only models have idempotency keys, not the reaction writer
+    keys = {} if idempotency_key is None else {"idempotency_key": idempotency_key}
     return await (await auth.get_logged_in_user()).and_then(
         lambda user: model.create(
             on_duplicate_key=on_conflict_set,
-            **_update_dict(args, {model.author_key: user.id})
+            **keys,
+            **_update_dict(args, {model.author_key: user.id}),
+        )
+    )
+
+
+async def handle_create_many(
+    args_list: Sequence[dict],
+    auth: AuthContext,
+    model: ModelHelper,
+    *,
+    update_on_conflict: Sequence[str] = (),
+) -> Result[List[int], Union[AppError, InternalError]]:
+    """
+    Like `handle_create`, but create every item with a single statement,
+    authenticating the user only once. Raises a `ValueError` (which is
+    reported as a GraphQL error) for more than `MAX_BATCH_SIZE` items.
+    """
+    if len(args_list) > MAX_BATCH_SIZE:
+        raise ValueError(f"At most {MAX_BATCH_SIZE} items can be created at once.")
+
+    return await (await auth.get_logged_in_user()).and_then(
+        lambda user: model.create_many(
+            [_update_dict(args, {model.author_key: user.id}) for args in args_list],
+            update_on_duplicate=update_on_conflict,
         )
     )
 
@@ -47,33 +86,40 @@ async def handle_create(
 async def handle_edit(
     item_id: int, auth: AuthContext, loader: Loader, edit: EditType, **args
 ) -> Result[None, Union[AppError, ItemNotFoundError, Unauthorized, InternalError]]:
-    edit_func = getattr(loader.model, edit.value)
-    user_result = await (await auth.get_logged_in_user()).and_then(
-        lambda user: _validate_edit_authority(item_id, user, loader)
-    )
+    """
+    Update or delete an item, if it belongs to the logged in user. The
+    ownership check is part of the write itself, so that nothing can change
+    hands in between; the item is only looked up again when nothing was
+    written, to find out why.
+    """
+    model = loader.model
+    edit_func = getattr(model, edit.value)
+    user_result = await auth.get_logged_in_user()
     db_result = await user_result.and_then(
-        lambda user: edit_func(
-            item_id, where={loader.model.author_key: user.id}, **args
-        )
+        lambda user: edit_func(item_id, where={model.author_key: user.id}, **args)
+    )
+    return await db_result.and_then(
+        lambda rowcount: _explain_edit(item_id, rowcount, model)
     )
-    return db_result.map(lambda _: None)
-
 
-async def _validate_edit_authority(
-    item_id: int, user: Person, loader: Loader
-) -> Result[Person, Union[ItemNotFoundError, Unauthorized]]:
-    unauthorized = Unauthorized("No authority to edit this")
-    row = await loader.load(item_id)
 
-    if row is None:
-        return Result(error=ItemNotFoundError(id=item_id))
+async def _explain_edit(
+    item_id: int, rowcount: int, model: ModelHelper
+) -> Result[None, Union[ItemNotFoundError, Unauthorized, InternalError]]:
+    if rowcount:
+        return Result(value=None)
 
-    author_id = getattr(row, loader.model.author_key, None)
+    rows, error = (
+        await InternalError.wrap(model.load_all, "id", id=item_id)
+    ).as_tuple()
 
-    if author_id is None:
-        return Result(error=unauthorized)
+    if error:
+        return Result(error=error)
+    # archived items can't be changed, as if they didn't exist
+    if rows and not model.is_archived(item_id):
+        return Result(error=Unauthorized("No authority to edit this"))
 
-    return Result(value=user) if (author_id == user.id) else Result(error=unauthorized)
+    return Result(error=ItemNotFoundError(id=item_id))
 
 
 def _update_dict(d: dict, values: Mapping):
@@ -81,4 +127,4 @@ def _update_dict(d: dict, values: Mapping):
     return d
 
 
-__all__ = ["remove_falsy_values", "check_edit_authority"]
+__all__ = ["MAX_BATCH_SIZE", "remove_falsy_values", "check_edit_authority"]
@@ -1,7 +1,16 @@
+import hashlib
 from dataclasses import dataclass
-from typing import Any, Optional
+from typing import Any, Optional, Union
 
-from .core.model import ModelMap
+from .core.model import (
+    ModelMap,
+    RequestSession,
+    ShardedSession,
+    SqlStats,
+    WriteCoalescer,
+    bind_model_map,
+    open_session,
+)
 from .core.protocols import (
     AppRequest,
     AppContext,
@@ -9,11 +18,13 @@ from .core.protocols import (
     CommentContext,
     PostContext,
     ReactionContext,
+    SearchContext,
 )
 from .auth import Authenticator, build_auth_context
 from .comments import build_comment_context
 from .posts import build_post_context
 from .reactions import build_reaction_context
+from .search import build_search_context
 from blog_app import reactions
 
 
@@ -24,15 +35,62 @@ class Context(AppContext):
     posts: PostContext
     comments: CommentContext
     reactions: ReactionContext
+    search: SearchContext
+    session: Union[RequestSession, ShardedSession]
+
+
+def _sticky_key(request: AppRequest) -> Optional[str]:
+    """
+    The key of the client making `request`, which reads its own writes: a
+    hash of its access token, so that the tokens aren't kept, or `None` for
+    clients that don't authenticate.
+
+    >>> from types import SimpleNamespace
+    >>> _sticky_key(SimpleNamespace(headers={"authorization": "Bearer abc"}))
+    'c355dce96c1612880d11940ffdd9014d386c253e0c3652a6cd06a7226f7bd2b6'
+    >>> _sticky_key(SimpleNamespace(headers={})) is None
+    True
+    """
+    authorization = request.headers.get("authorization")
+    if not authorization:
+        return None
+    return hashlib.sha256(authorization.encode()).hexdigest()
 
 
 async def build_context(
-    request: AppRequest, authenticator: Authenticator, model_map: ModelMap
+    request: AppRequest,
+    authenticator: Authenticator,
+    model_map: ModelMap,
+    reaction_writer: Optional[WriteCoalescer] = None,
+    plan_queries: bool = False,
+    sql_stats: Optional[SqlStats] = None,
 ):
+    """
+    Build the context for a single request. All database access made while
+    handling the request shares one connection from `session`, which must be
+    closed once the response is ready.
+
+    `reaction_writer`, when given, is shared between requests so that it can
+    group their reactions into one commit.
+
+    With `plan_queries`, the collections nested in a `posts` query are loaded
+    before it is resolved (see `QueryPlanner`).
+
+    With `sql_stats`, the SQL run for the request is tallied there.
+    """
+    # the same routers are shared by all models. Only clients that can write
+    # (those which authenticate) need to read their own writes.
+    session = open_session(model_map["post"], _sticky_key(request), sql_stats)
+    model_map = bind_model_map(model_map, session)
+    if reaction_writer:
+        reaction_writer = reaction_writer.bind(session)
+
     return Context(
         request=request,
         auth=await build_auth_context(authenticator, request),
-        posts=await build_post_context(model_map),
+        posts=await build_post_context(model_map, plan_queries),
         comments=await build_comment_context(model_map),
-        reactions=await build_reaction_context(model_map),
+        reactions=await build_reaction_context(model_map, reaction_writer),
+        search=await build_search_context(model_map),
+        session=session,
     )
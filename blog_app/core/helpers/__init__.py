@@ -1,2 +1,5 @@
 from .collection import *
 from .loader import Loader
+from .pagination import *
+from .planner import *
+from .projection import *
@@ -1,30 +1,94 @@
 import functools
-from typing import Awaitable, Callable, Generic, List, Optional, Sequence, TypeVar
+from typing import Awaitable, Callable, Generic, List, Optional, Sequence
 
 import strawberry
+from strawberry.types import Info
 
 from .loader import Loader
+from .pagination import (
+    CollectionOrder,
+    Connection,
+    IdOrder,
+    ItemType,  # generic types must share a type variable with Connection
+    PageRequest,
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+)
+from .projection import Selection, get_selection
 
 
-ItemType = TypeVar("ItemType")
+PAGE_DESCRIPTION = (
+    f"Gets a page of at most `first` items (default {DEFAULT_PAGE_SIZE}, at most"
+    f" {MAX_PAGE_SIZE}) that follow the item with the cursor `after`. Items are"
+    " ordered by `orderBy` (default `ID`); cursors can only be used with the"
+    " ordering they were issued for."
+)
 
 
 @strawberry.type
 class Collection(Generic[ItemType]):
-    def __init__(self, load_fn: Callable[[], Awaitable[Sequence[ItemType]]]):
+    def __init__(
+        self,
+        load_fn: Callable[[Selection], Awaitable[Sequence[ItemType]]],
+        page_fn: Callable[[PageRequest, Selection], Awaitable[Connection[ItemType]]],
+    ):
+        """
+        :param load_fn: Loads all items in the collection.
+        :param page_fn: Loads a single page of items in the collection.
+
+        Both are passed the names of the GraphQL fields selected on the items,
+        so that they can avoid loading anything else.
+        """
         self.load_fn = functools.cache(load_fn)
+        self.page_fn = page_fn
 
     @strawberry.field(
         description="Gets a full, unpaginated list of all items in the collection."
     )
-    async def all_items(self) -> List[ItemType]:
-        return [item for item in await self.load_fn()]
+    async def all_items(self, info: Info) -> List[ItemType]:
+        return [item for item in await self.load_fn(get_selection(info))]
+
+    @strawberry.field(description=PAGE_DESCRIPTION)
+    async def page(
+        self,
+        first: Optional[int] = None,
+        after: Optional[str] = None,
+        order_by: Optional[CollectionOrder] = None,
+        info: Info = None,
+    ) -> Connection[ItemType]:
+        return await self.page_fn(
+            PageRequest.parse(first, after, order_by),
+            get_selection(info, "edges", "node"),
+        )
+
+
+@strawberry.type
+class IdOrderedCollection(Collection[ItemType]):
+    """A `Collection` of items which have no creation time to be ordered by."""
+
+    @strawberry.field(description=PAGE_DESCRIPTION)
+    async def page(
+        self,
+        first: Optional[int] = None,
+        after: Optional[str] = None,
+        order_by: Optional[IdOrder] = None,
+        info: Info = None,
+    ) -> Connection[ItemType]:
+        return await self.page_fn(
+            PageRequest.parse(
+                first, after, order_by.collection_order if order_by else None
+            ),
+            get_selection(info, "edges", "node"),
+        )
 
 
 @strawberry.type
 class QueryableCollection(Collection[ItemType]):
     def __init__(self, loader: Loader[ItemType]):
-        super().__init__(loader.all)
+        super().__init__(
+            lambda selection: loader.all(loader.project(selection)),
+            lambda request, selection: loader.page(request, loader.project(selection)),
+        )
         self.loader = loader
 
     @strawberry.field(
@@ -33,8 +97,9 @@ class QueryableCollection(Collection[ItemType]):
         " the input list of ids; if an item for a particular id cannot be found, then"
         " `null` is returned in its position in the list."
     )
-    async def by_id(self, ids: List[int]) -> List[Optional[ItemType]]:
-        return [item for item in await self.loader.load_many(ids)]
+    async def by_id(self, ids: List[int], info: Info) -> List[Optional[ItemType]]:
+        columns = self.loader.project(get_selection(info))
+        return [item for item in await self.loader.load_many(ids, columns)]
 
 
-__all__ = ["Collection", "QueryableCollection"]
+__all__ = ["Collection", "IdOrderedCollection", "QueryableCollection"]
@@ -1,5 +1,7 @@
 import asyncio
+import dataclasses
 import functools
+import operator
 from typing import (
     Any,
     Callable,
@@ -7,19 +9,26 @@ from typing import (
     Generator,
     Generic,
     Hashable,
+    Iterable,
     List,
     Literal,
+    Mapping,
     Optional,
     Protocol,
     Sequence,
+    Tuple,
     TypeVar,
     Union,
+    cast,
     overload,
 )
 
 from strawberry.dataloader import DataLoader
+from strawberry.utils.str_converters import to_camel_case
 
-from blog_app.core.model.model_helper import ModelHelper
+from blog_app.core.model.model_helper import ModelHelper, PageSpec
+from .pagination import Connection, PageRequest
+from .projection import Projection, Selection
 
 
 class Identifyable(Protocol):
@@ -27,6 +36,25 @@ class Identifyable(Protocol):
 
 
 LoaderType = TypeVar("LoaderType", covariant=True)
+Method = TypeVar("Method", bound=Callable[..., Any])
+
+
+def cached_dataloader(method: Method) -> Method:
+    """
+    Keep the dataloader returned by a `Loader` method for each of its
+    arguments, on the loader itself. Loaders are made for each request, so
+    the dataloaders (and the items they cache) go along with it, where
+    `functools.cache` would keep every one of them.
+    """
+
+    @functools.wraps(method)
+    def get(self: "Loader[Any]", *args: Hashable) -> Any:
+        key = (method.__name__, *args)
+        if key not in self._dataloaders:
+            self._dataloaders[key] = method(self, *args)
+        return self._dataloaders[key]
+
+    return cast(Method, get)
 
 
 class Loader(Generic[LoaderType]):
@@ -34,21 +62,148 @@ class Loader(Generic[LoaderType]):
         self,
         constructor: Callable[..., LoaderType],
         model: ModelHelper,
+        field_columns: Optional[Mapping[str, Sequence[str]]] = None,
     ):
+        """
+        :param field_columns: Maps the GraphQL fields of `constructor` which
+                              are not backed by a column of the same name to
+                              the columns their resolvers need, e.g.
+                              `{"author": ["author_id"]}`.
+        """
         self.constructor = constructor
         self.model = model
-        self.dataloader = self.get_dataloader("id")
+        # see `cached_dataloader`
+        self._dataloaders: Dict[Tuple[Hashable, ...], DataLoader[Any, Any]] = {}
+        self.dataloader = self.get_dataloader("id", None)
+        # every item, by projection, when loaded ahead of time; see `prime_all`
+        self._all: Dict[Projection, List[LoaderType]] = {}
+        # functions building items, by the fields of their rows; see `_build`
+        self._builders: Dict[Tuple[str, ...], Callable[[Any], LoaderType]] = {}
 
-    async def all(self):
-        return (
-            self.constructor(**row._asdict()) for row in await self.model.load_all()
+        self._field_columns: Dict[str, Tuple[str, ...]] = {
+            to_camel_case(col.name): (col.name,) for col in model.columns
+        }
+        self._field_columns.update(
+            (to_camel_case(field), tuple(cols))
+            for field, cols in (field_columns or {}).items()
         )
 
-    async def load(self, key: int) -> Optional[LoaderType]:
-        return await self.dataloader.load(key)
+    def project(self, selection: Selection, *required: str) -> Projection:
+        """
+        Return the columns needed to resolve the selected GraphQL fields
+        (along with `id` and any `required` columns), or `None` if every
+        column must be loaded.
+        """
+        if selection is None:
+            return None
+
+        columns = {"id", *required}
+
+        for field in selection:
+            if field not in self._field_columns:
+                return None  # unknown fields might need anything
+
+            columns.update(self._field_columns[field])
+
+        return tuple(sorted(columns))
+
+    def _build(self, row: Any) -> LoaderType:
+        build = self._builders.get(row._fields)
+        if build is None:
+            build = self._builders[row._fields] = self._builder(row._fields)
+        return build(row)
+
+    def _builder(self, fields: Tuple[str, ...]) -> Callable[[Any], LoaderType]:
+        """
+        Return a function building an item from a row with `fields`, which
+        passes the row's values positionally, in the order of the arguments
+        of the constructor (when it's a dataclass), rather than by keyword.
+        Items are built from rows of only a few shapes, so each shape's
+        mapping of columns to arguments is only worked out once.
+        """
+        # unloaded columns are never read by a query, so leave them empty
+        constructor = self.constructor
 
-    async def load_many(self, keys: List[int]) -> Sequence[Optional[LoaderType]]:
-        return await asyncio.gather(*(self.load(key) for key in keys))
+        if not dataclasses.is_dataclass(constructor):
+            empty = dict.fromkeys(col.name for col in self.model.columns)
+            return lambda row: constructor(**{**empty, **row._asdict()})
+
+        args = [field.name for field in dataclasses.fields(constructor) if field.init]
+        if tuple(args) == fields:
+            return lambda row: constructor(*row)
+
+        # missing columns are read from a `None` appended to the row
+        index = {field: i for i, field in enumerate(fields)}
+        positions = [index.get(arg, len(fields)) for arg in args]
+        get = operator.itemgetter(*positions)
+
+        if len(positions) == 1:
+            return lambda row: constructor(get((*row, None)))
+        return lambda row: constructor(*get((*row, None)))
+
+    async def all(self, columns: Projection = None):
+        if columns in self._all:
+            return iter(self._all[columns])
+
+        return (self._build(row) for row in await self.model.load_all(*columns or ()))
+
+    def prime_all(self, rows: Sequence[Any], columns: Projection = None):
+        """Have `all(columns)` return the items of `rows`, rather than query."""
+        self._all[columns] = [self._build(row) for row in rows]
+
+    @staticmethod
+    def prime(dataloader: DataLoader[Any, Any], values: Mapping[Hashable, Any]):
+        """
+        Fill the cache of `dataloader` with `values` by key, so that loading
+        them doesn't query the database. Keys which are already cached keep
+        their value.
+        """
+        for key, value in values.items():
+            if key not in dataloader.cache_map:
+                future = dataloader.loop.create_future()
+                future.set_result(value)
+                dataloader.cache_map[key] = future
+
+    async def page(
+        self, request: PageRequest, columns: Projection = None, **where
+    ) -> Connection[LoaderType]:
+        """Load a single page of items matching `where`."""
+        rows = await self.model.load_page(
+            *self._with_order_columns(columns, [request]),
+            order_by=request.order.columns,
+            descending=request.order.descending,
+            after=request.after,
+            limit=request.first + 1,  # one extra row tells us if there's more
+            **where,
+        )
+        return self._build_connection(rows, request)
+
+    @staticmethod
+    def _with_order_columns(
+        columns: Projection, requests: Iterable[PageRequest]
+    ) -> Tuple[str, ...]:
+        if columns is None:
+            return ()
+
+        order_columns = (col for request in requests for col in request.order.columns)
+        return tuple(sorted({*columns, *order_columns}))
+
+    def _build_connection(
+        self, rows: Sequence[Any], request: PageRequest
+    ) -> Connection[LoaderType]:
+        return Connection.build(
+            [self._build(row) for row in rows[: request.first]],
+            request,
+            has_next_page=len(rows) > request.first,
+        )
+
+    async def load(self, key: int, columns: Projection = None) -> Optional[LoaderType]:
+        return await self.get_dataloader("id", columns).load(key)
+
+    async def load_many(
+        self, keys: List[int], columns: Projection = None
+    ) -> Sequence[Optional[LoaderType]]:
+        return await asyncio.gather(*(self.load(key, columns) for key in keys))
 
     K = TypeVar("K", bound=Hashable)
     V = TypeVar("V")
@@ -69,14 +224,19 @@ class Loader(Generic[LoaderType]):
 
         return (groups.get(key, []) for key in keys)
 
-    @functools.cache
-    def get_dataloader(self, key_field: str) -> DataLoader[int, Optional[LoaderType]]:
+    # Dataloaders are cached per projection, so that items loaded with only
+    # some of their columns are never handed to a query that needs others.
+
+    @cached_dataloader
+    def get_dataloader(
+        self, key_field: str, columns: Projection = None
+    ) -> DataLoader[int, Optional[LoaderType]]:
         async def load_fn(keys: List[int]) -> List[Optional[LoaderType]]:
             matching_rows = await self.model.load_all(
-                **{key_field: keys}
+                *columns or (), **{key_field: keys}
             )  # where `<key_field>` in `<keys>`
             return [
-                self.constructor(**row._asdict()) if row else None
+                self._build(row) if row else None
                 for row in Loader.fillBy(
                     keys, matching_rows, lambda row: getattr(row, key_field, None)
                 )
@@ -84,14 +244,16 @@ class Loader(Generic[LoaderType]):
 
         return DataLoader(load_fn)
 
-    @functools.cache
-    def get_group_dataloader(self, key_field: str) -> DataLoader[int, List[LoaderType]]:
+    @cached_dataloader
+    def get_group_dataloader(
+        self, key_field: str, columns: Projection = None
+    ) -> DataLoader[int, List[LoaderType]]:
         async def load_fn(keys: List[int]) -> List[List[LoaderType]]:
             matching_rows = await self.model.load_all(
-                **{key_field: keys}
+                *columns or (), **{key_field: keys}
             )  # where `<key_field>` in `<keys>`
             return [
-                [self.constructor(**row._asdict()) for row in group]
+                [self._build(row) for row in group]
                 for group in Loader.groupBy(
                     keys, matching_rows, lambda row: getattr(row, key_field, None)
                 )
@@ -99,5 +261,63 @@ class Loader(Generic[LoaderType]):
 
         return DataLoader(load_fn)
 
+    @cached_dataloader
+    def get_count_dataloader(
+        self, key_field: str, *group_fields: str
+    ) -> DataLoader[int, Dict[Tuple[Any, ...], int]]:
+        """
+        Return a dataloader counting the items for each `key_field` value,
+        by the values of `group_fields`, e.g. the number of reactions of each
+        type on each of several comments. Counts are keyed by a tuple of the
+        `group_fields` values (an empty tuple, for a plain count), and groups
+        without any items are left out.
+        """
+
+        async def load_fn(keys: List[int]) -> List[Dict[Tuple[Any, ...], int]]:
+            rows = await self.model.count_all(
+                key_field, *group_fields, **{key_field: keys}
+            )  # `GROUP BY <key_field>, <group_fields>`
+            counts: Dict[int, Dict[Tuple[Any, ...], int]] = {key: {} for key in keys}
+
+            for key, *group, count in rows:
+                counts[key][tuple(group)] = count
+
+            return [counts[key] for key in keys]
+
+        return DataLoader(load_fn)
+
+    @cached_dataloader
+    def get_page_dataloader(
+        self, key_field: str, columns: Projection = None
+    ) -> DataLoader[Tuple[int, PageRequest], Connection[LoaderType]]:
+        """
+        Return a dataloader for pages of items grouped by `key_field`, e.g.
+        a page of comments for each of several posts, keyed by
+        `(post_id, page_request)`.
+        """
+
+        async def load_fn(
+            keys: List[Tuple[int, PageRequest]]
+        ) -> List[Connection[LoaderType]]:
+            pages = await self.model.load_pages(
+                *self._with_order_columns(columns, (request for _, request in keys)),
+                pages=[
+                    PageSpec(
+                        where={key_field: key},
+                        order_by=request.order.columns,
+                        descending=request.order.descending,
+                        after=request.after,
+                        limit=request.first + 1,
+                    )
+                    for key, request in keys
+                ],
+            )
+            return [
+                self._build_connection(rows, request)
+                for rows, (_, request) in zip(pages, keys)
+            ]
+
+        return DataLoader(load_fn)
+
 
 __all__ = ["Loader"]
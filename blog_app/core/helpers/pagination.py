@@ -0,0 +1,222 @@
+"""
+blog_app.core.helpers.pagination - Relay-style connection types and the
+opaque cursors used to page through collections with keyset queries.
+
+A cursor encodes the ordering it was issued for, along with the values of
+the ordering columns for the last item on a page:
+
+>>> cursor = encode_cursor(CollectionOrder.CREATED, (datetime(2021, 3, 8), 4))
+>>> decode_cursor(cursor, CollectionOrder.CREATED)
+(datetime.datetime(2021, 3, 8, 0, 0), 4)
+
+Cursors cannot be reused with a different ordering:
+
+>>> decode_cursor(cursor, CollectionOrder.ID)
+Traceback (most recent call last):
+    ...
+ValueError: The cursor was not issued for this ordering.
+"""
+
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Generic, List, Optional, Protocol, Sequence, Tuple, TypeVar
+
+import strawberry
+
+
+ItemType = TypeVar("ItemType")
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+@strawberry.enum(description="The order in which items of a collection are paged.")
+class CollectionOrder(Enum):
+    ID = "id"
+    ID_DESC = "id_desc"
+    CREATED = "created"
+    CREATED_DESC = "created_desc"
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        """The (indexed) columns that items are ordered by, ending with `id`."""
+        return ("id",) if self.value.startswith("id") else ("created", "id")
+
+    @property
+    def descending(self) -> bool:
+        return self.value.endswith("_desc")
+
+
+@strawberry.enum(
+    description="The order in which items of a collection that have no creation"
+    " time (such as reactions) are paged."
+)
+class IdOrder(Enum):
+    ID = "id"
+    ID_DESC = "id_desc"
+
+    @property
+    def collection_order(self) -> CollectionOrder:
+        return CollectionOrder(self.value)
+
+
+class CursorOrder(Protocol):
+    """An ordering that cursors can be issued for, such as a `CollectionOrder`."""
+
+    @property
+    def value(self) -> str:
+        ...
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        ...
+
+
+@dataclass(frozen=True)
+class PageRequest:
+    """A validated request for a single page of a collection."""
+
+    first: int
+    after: Optional[Tuple[Any, ...]] = None
+    order: CollectionOrder = CollectionOrder.ID
+
+    @classmethod
+    def parse(
+        cls,
+        first: Optional[int] = None,
+        after: Optional[str] = None,
+        order: Optional[CollectionOrder] = None,
+    ) -> "PageRequest":
+        """
+        Build a page request from GraphQL arguments, enforcing the maximum
+        page size.
+
+        >>> PageRequest.parse(first=1000).first == MAX_PAGE_SIZE
+        True
+        >>> PageRequest.parse(first=0)
+        Traceback (most recent call last):
+            ...
+        ValueError: `first` must be a positive number.
+        """
+        order = order or CollectionOrder.ID
+        first = DEFAULT_PAGE_SIZE if first is None else first
+
+        if first < 1:
+            raise ValueError("`first` must be a positive number.")
+
+        return cls(
+            first=min(first, MAX_PAGE_SIZE),
+            after=decode_cursor(after, order) if after else None,
+            order=order,
+        )
+
+
+def _encode_value(value: Any):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"dec": str(value)}
+    return value
+
+
+def _decode_value(value: Any):
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    if isinstance(value, dict) and "dec" in value:
+        return Decimal(value["dec"])
+    return value
+
+
+def encode_cursor(order: CursorOrder, values: Sequence[Any]) -> str:
+    """Encode the ordering column values of an item as an opaque cursor."""
+    data = json.dumps([order.value, [_encode_value(value) for value in values]])
+    return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, order: CursorOrder) -> Tuple[Any, ...]:
+    """
+    Decode a cursor issued by `encode_cursor` for the same ordering.
+    """
+    try:
+        order_value, values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        issued_for_order = order_value == order.value and len(values) == len(
+            order.columns
+        )
+        decoded = tuple(_decode_value(value) for value in values)
+    except (binascii.Error, ArithmeticError, ValueError, TypeError):
+        raise ValueError("The cursor is invalid.")
+
+    if not issued_for_order:
+        raise ValueError("The cursor was not issued for this ordering.")
+
+    return decoded
+
+
+@strawberry.type
+class PageInfo:
+    has_next_page: bool
+    has_previous_page: bool
+    start_cursor: Optional[str]
+    end_cursor: Optional[str]
+
+
+@strawberry.type
+class Edge(Generic[ItemType]):
+    cursor: str
+    node: ItemType
+
+
+@strawberry.type
+class Connection(Generic[ItemType]):
+    edges: List[Edge[ItemType]]
+    page_info: PageInfo
+
+    @staticmethod
+    def build(
+        items: Sequence[Any], request: PageRequest, has_next_page: bool
+    ) -> "Connection":
+        """Wrap one page of items, issuing a cursor for each of them."""
+        return Connection.from_edges(
+            [
+                Edge(
+                    cursor=encode_cursor(
+                        request.order,
+                        [getattr(item, col) for col in request.order.columns],
+                    ),
+                    node=item,
+                )
+                for item in items
+            ],
+            has_next_page,
+        )
+
+    @staticmethod
+    def from_edges(edges: List[Edge], has_next_page: bool) -> "Connection":
+        return Connection(
+            edges=edges,
+            page_info=PageInfo(
+                has_next_page=has_next_page,
+                # paging is forward-only, see the relay connection spec.
+                has_previous_page=False,
+                start_cursor=edges[0].cursor if edges else None,
+                end_cursor=edges[-1].cursor if edges else None,
+            ),
+        )
+
+
+__all__ = [
+    "CollectionOrder",
+    "Connection",
+    "CursorOrder",
+    "Edge",
+    "IdOrder",
+    "PageInfo",
+    "PageRequest",
+    "DEFAULT_PAGE_SIZE",
+    "MAX_PAGE_SIZE",
+]
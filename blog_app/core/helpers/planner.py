@@ -0,0 +1,184 @@
+"""
+blog_app.core.helpers.planner - load the nested collections selected by a
+query up front, rather than one level at a time as they are resolved.
+"""
+
+import asyncio
+import dataclasses
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from graphql import GraphQLError, get_named_type
+from graphql.execution.values import get_argument_values
+from graphql.language import FieldNode
+
+from .loader import Loader
+from .projection import Projection, selection_of, sub_fields
+
+
+@dataclasses.dataclass(frozen=True)
+class NestedCollection:
+    """
+    A collection nested in each item of another, e.g. the comments of a post,
+    whose items refer to their parent's id by `key_field`. Its `allItems`
+    must be resolved with `loader.get_group_dataloader(key_field, columns)`,
+    where `columns` is `loader.project(selection, key_field)`.
+    """
+
+    loader: Loader
+    key_field: str
+    nested: Mapping[str, "NestedCollection"] = dataclasses.field(default_factory=dict)
+
+
+@dataclasses.dataclass
+class _Step:
+    loader: Loader
+    columns: Projection
+    where: Dict[str, Any]
+    parent: Optional["_Step"] = None
+    key_field: str = "id"
+    rows: List[Any] = dataclasses.field(default_factory=list)
+
+
+class QueryPlanner:
+    """
+    Plans the loads made by a query for a `QueryableCollection`, such as
+    `posts { allItems { comments { allItems { id } } } }`, by walking its
+    selection before any of it is resolved.
+
+    The items selected by `allItems` or `byId`, and those of the nested
+    collections selected by `allItems` beneath them, are each loaded with a
+    single query. Rather than waiting for the ids of its parents, each query
+    filters on a subquery for them, so every query is issued at once. The
+    items loaded are then primed into the loaders that the resolvers use, so
+    resolving the selection doesn't query the database again.
+
+    Anything else, such as pages of a nested collection, is left for the
+    resolvers to load as usual.
+    """
+
+    def __init__(self, loader: Loader, nested: Mapping[str, NestedCollection]):
+        self.loader = loader
+        self.nested = nested
+
+    async def prefetch(self, info: Any):
+        """Load and prime the items selected beneath the field `info` resolves."""
+        steps = list(self._plan(info))
+
+        rows = await asyncio.gather(
+            *(
+                step.loader.model.load_all(*step.columns or (), **step.where)
+                for step in steps
+            )
+        )
+
+        # parents are planned before their children
+        for step, step_rows in zip(steps, rows):
+            step.rows = step_rows
+            self._prime(step)
+
+    def _plan(self, info: Any) -> Iterable[_Step]:
+        fragments = info.fragments
+        collection_type = get_named_type(info.return_type)
+
+        for nodes in _by_response_key(sub_fields(info.field_nodes, fragments)):
+            name = nodes[0].name.value
+            columns = self.loader.project(selection_of(nodes, fragments))
+
+            if name == "allItems":
+                step = _Step(self.loader, columns, where={})
+            elif name == "byId":
+                try:
+                    args = get_argument_values(
+                        collection_type.fields[name], nodes[0], info.variable_values
+                    )
+                except GraphQLError:
+                    continue
+                step = _Step(self.loader, columns, where={"id": args["ids"]})
+            else:
+                continue
+
+            yield step
+            yield from self._plan_nested(step, nodes, self.nested, fragments)
+
+    def _plan_nested(
+        self,
+        parent: _Step,
+        item_nodes: List[FieldNode],
+        nested: Mapping[str, NestedCollection],
+        fragments: dict,
+    ) -> Iterable[_Step]:
+        for field_nodes in _by_response_key(sub_fields(item_nodes, fragments)):
+            collection = nested.get(field_nodes[0].name.value)
+            if collection is None:
+                continue
+
+            for nodes in _by_response_key(sub_fields(field_nodes, fragments)):
+                if nodes[0].name.value != "allItems":
+                    continue
+
+                loader = collection.loader
+                columns = loader.project(
+                    selection_of(nodes, fragments), collection.key_field
+                )
+                step = _Step(
+                    loader,
+                    columns,
+                    where=_children_of(parent, collection.key_field),
+                    parent=parent,
+                    key_field=collection.key_field,
+                )
+
+                yield step
+                yield from self._plan_nested(step, nodes, collection.nested, fragments)
+
+    @staticmethod
+    def _prime(step: _Step):
+        loader = step.loader
+
+        if step.parent is not None:
+            keys = [row.id for row in step.parent.rows]
+            groups = Loader.groupBy(
+                keys, step.rows, lambda row: getattr(row, step.key_field)
+            )
+            loader.prime(
+                loader.get_group_dataloader(step.key_field, step.columns),
+                {
+                    key: [loader._build(row) for row in group]
+                    for key, group in zip(keys, groups)
+                },
+            )
+        elif "id" in step.where:
+            ids = step.where["id"]
+            items = Loader.fillBy(ids, step.rows, lambda row: row.id)
+            loader.prime(
+                loader.get_dataloader("id", step.columns),
+                {
+                    key: loader._build(row) if row else None
+                    for key, row in zip(ids, items)
+                },
+            )
+        else:
+            loader.prime_all(step.rows, step.columns)
+
+
+def _by_response_key(nodes: Iterable[FieldNode]) -> List[List[FieldNode]]:
+    # fields with the same response key are merged, and resolved together.
+    groups: Dict[str, List[FieldNode]] = {}
+
+    for node in nodes:
+        key = node.alias.value if node.alias else node.name.value
+        groups.setdefault(key, []).append(node)
+
+    return list(groups.values())
+
+
+def _children_of(parent: _Step, key_field: str) -> Dict[str, Any]:
+    if not parent.where:
+        return {}  # every item has a parent
+    if list(parent.where) == ["id"]:
+        return {key_field: parent.where["id"]}
+
+    return {key_field: parent.loader.model.select_ids(**parent.where)}
+
+
+__all__ = ["NestedCollection", "QueryPlanner"]
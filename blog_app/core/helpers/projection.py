@@ -0,0 +1,73 @@
+"""
+blog_app.core.helpers.projection - find out which fields a GraphQL query
+selects on the items of a collection, so that only the columns backing
+those fields need to be loaded.
+"""
+
+from typing import Any, FrozenSet, Iterable, List, Optional, Tuple
+
+from graphql.language import FieldNode, FragmentSpreadNode, InlineFragmentNode
+
+
+# Names of the GraphQL fields selected on an item; `None` means that the
+# selection could not be determined, and every field should be loaded.
+Selection = Optional[FrozenSet[str]]
+
+# Names of the columns to load for an item; `None` loads every column.
+Projection = Optional[Tuple[str, ...]]
+
+
+def sub_fields(nodes: Iterable[Any], fragments: dict) -> List[FieldNode]:
+    """Return the fields selected directly beneath `nodes`, through any fragments."""
+    fields: List[FieldNode] = []
+
+    for node in nodes:
+        selection_set = getattr(node, "selection_set", None)
+
+        for selection in selection_set.selections if selection_set else []:
+            if isinstance(selection, FieldNode):
+                fields.append(selection)
+            elif isinstance(selection, InlineFragmentNode):
+                fields.extend(sub_fields([selection], fragments))
+            elif isinstance(selection, FragmentSpreadNode):
+                fields.extend(sub_fields([fragments[selection.name.value]], fragments))
+
+    return fields
+
+
+def get_selection(info: Any, *path: str) -> Selection:
+    """
+    Return the names of the fields selected beneath the field being
+    resolved, after following `path` through the selection set. For example,
+    `get_selection(info, "edges", "node")` returns the fields selected on the
+    nodes of a connection.
+
+    Fields are included regardless of `@skip`/`@include` directives, so the
+    selection may be larger than what is returned, but never smaller.
+    """
+    field_nodes = getattr(info, "field_nodes", None)
+    fragments = getattr(info, "fragments", {})
+
+    if field_nodes is None:
+        return None
+
+    nodes: List[FieldNode] = list(field_nodes)
+
+    for name in path:
+        nodes = [
+            node for node in sub_fields(nodes, fragments) if node.name.value == name
+        ]
+
+    return selection_of(nodes, fragments)
+
+
+def selection_of(nodes: Iterable[FieldNode], fragments: dict) -> Selection:
+    """Return the names of the fields selected beneath `nodes`."""
+    return frozenset(
+        node.name.value
+        for node in sub_fields(nodes, fragments)
+        if not node.name.value.startswith("__")
+    )
+
+
+__all__ = ["Projection", "Selection", "get_selection", "selection_of", "sub_fields"]
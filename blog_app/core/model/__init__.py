@@ -1,13 +1,34 @@
 import enum
-from typing import TypedDict
+from typing import Any, List, Optional, Sequence, TypedDict, Union, cast
 
-from sqlalchemy.schema import Column, MetaData, Table, UniqueConstraint
-from sqlalchemy.sql import func, text, ColumnElement
+from sqlalchemy.schema import Column, Index, MetaData, Table, UniqueConstraint
+from sqlalchemy.sql import func, ColumnElement
 
 from sqlalchemy.sql.schema import ForeignKey
 from sqlalchemy.types import Enum, Integer, String, Text, TIMESTAMP
 
+from .archive import ArchivedIds
+from .archiver import Archiver
+from .coalescer import WriteCoalescer
+from .counter import Counter
+from .dialects import UpdatedTimestamp
+from .idempotency import IdempotencyKeys
 from .model_helper import ModelHelper
+from .purger import Purger
+from .router import EngineRouter
+from .session import RequestSession
+from .shards import (
+    ShardIds,
+    ShardedModel,
+    ShardedPurger,
+    ShardedSession,
+    open_session,
+    routers_of,
+)
+from .stats import SqlBudget, SqlBudgetExceeded, SqlStats
+
+# registers the `sqlite+aiosqlite` dialect
+from . import sqlite  # noqa: F401
 
 
 class ReactionType(enum.Enum):
@@ -22,31 +43,71 @@ class ModelMap(TypedDict):
     reaction: ModelHelper
 
 
-def register_tables(metadata: MetaData) -> ModelMap:
-    return ModelMap(
-        post=ModelHelper(
-            table=Table(
-                "post",
-                metadata,
-                Column("id", Integer, primary_key=True, autoincrement=True),
-                Column("title", String(150), nullable=False),
-                Column("author_id", String(32), nullable=False, index=True),
-                Column("content", Text),
-                Column("created", TIMESTAMP, nullable=False, server_default=func.now()),
-                Column(
-                    "updated",
-                    TIMESTAMP,
-                    nullable=False,
-                    server_default=text(
-                        "CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"
-                    ),
-                ),
-                mysql_engine="InnoDB",
-                mysql_charset="utf8mb4",
+def register_tables(
+    metadata: MetaData,
+    router: Optional[EngineRouter] = None,
+    fast_loads: bool = False,
+    idempotency_ttl: float = 24 * 60 * 60,
+    id_step: int = 1,
+    id_offset: int = 1,
+    archived: Optional[ArchivedIds] = None,
+) -> ModelMap:
+    router = router or EngineRouter(metadata.bind)
+    # the ids found in the archives, by the models of every table
+    archived = archived or ArchivedIds()
+
+    # the rows created for the idempotency keys of create mutations
+    idempotency_keys = Table(
+        "idempotency_key",
+        metadata,
+        Column("scope", String(32), primary_key=True),
+        Column("author_id", String(32), primary_key=True),
+        Column("key", String(64), primary_key=True),
+        Column("item_id", Integer, nullable=False),
+        Column("expires", TIMESTAMP, nullable=False),
+        mysql_engine="InnoDB",
+        mysql_charset="utf8mb4",
+    )
+
+    post = ModelHelper(
+        table=Table(
+            "post",
+            metadata,
+            Column("id", Integer, primary_key=True, autoincrement=True),
+            Column("title", String(150), nullable=False),
+            Column("author_id", String(32), nullable=False, index=True),
+            Column("content", Text),
+            Column("created", TIMESTAMP, nullable=False, server_default=func.now()),
+            Column(
+                "updated",
+                TIMESTAMP,
+                nullable=False,
+                server_default=UpdatedTimestamp(),
+                onupdate=func.now(),
             ),
-            author_key="author_id",
-            engine=metadata.bind,
+            # set when the post is deleted, until it's purged
+            Column("deleted", TIMESTAMP, nullable=True),
+            # supports keyset pagination ordered by creation time
+            Index("ix_post_created_id", "created", "id"),
+            Index("ix_post_fulltext", "title", "content", mysql_prefix="FULLTEXT"),
+            Index("ix_post_deleted", "deleted"),
+            mysql_engine="InnoDB",
+            mysql_charset="utf8mb4",
         ),
+        author_key="author_id",
+        engine=metadata.bind,
+        router=router,
+        fast_loads=fast_loads,
+        id_step=id_step,
+        id_offset=id_offset,
+        soft_delete="deleted",
+        archive=True,
+        archived=archived,
+        idempotency=IdempotencyKeys(idempotency_keys, "post", idempotency_ttl),
+    )
+
+    return ModelMap(
+        post=post,
         comment=ModelHelper(
             table=Table(
                 "comment",
@@ -57,7 +118,6 @@ def register_tables(metadata: MetaData) -> ModelMap:
                     Integer,
                     ForeignKey("post.id", ondelete="CASCADE"),
                     nullable=False,
-                    index=True,
                 ),
                 Column("author_id", String(32), nullable=False),
                 Column("content", Text),
@@ -66,15 +126,40 @@ def register_tables(metadata: MetaData) -> ModelMap:
                     "updated",
                     TIMESTAMP,
                     nullable=False,
-                    server_default=text(
-                        "CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"
-                    ),
+                    server_default=UpdatedTimestamp(),
+                    onupdate=func.now(),
                 ),
+                Index("ix_comment_post_id_created_id", "post_id", "created", "id"),
+                Index("ix_comment_fulltext", "content", mysql_prefix="FULLTEXT"),
                 mysql_engine="InnoDB",
                 mysql_charset="utf8mb4",
             ),
             author_key="author_id",
             engine=metadata.bind,
+            router=router,
+            fast_loads=fast_loads,
+            id_step=id_step,
+            id_offset=id_offset,
+            parent=("post_id", post),
+            archive=True,
+            archived=archived,
+            idempotency=IdempotencyKeys(idempotency_keys, "comment", idempotency_ttl),
+            counter=Counter(
+                Table(
+                    "comment_count",
+                    metadata,
+                    Column(
+                        "post_id",
+                        Integer,
+                        ForeignKey("post.id", ondelete="CASCADE"),
+                        primary_key=True,
+                        autoincrement=False,
+                    ),
+                    Column("count", Integer, nullable=False),
+                    mysql_engine="InnoDB",
+                ),
+                key=["post_id"],
+            ),
         ),
         reaction=ModelHelper(
             table=Table(
@@ -94,9 +179,8 @@ def register_tables(metadata: MetaData) -> ModelMap:
                     "updated",
                     TIMESTAMP,
                     nullable=False,
-                    server_default=text(
-                        "CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"
-                    ),
+                    server_default=UpdatedTimestamp(),
+                    onupdate=func.now(),
                 ),
                 UniqueConstraint("comment_id", "author_id"),
                 mysql_engine="InnoDB",
@@ -104,8 +188,97 @@ def register_tables(metadata: MetaData) -> ModelMap:
             ),
             author_key="author_id",
             engine=metadata.bind,
+            router=router,
+            fast_loads=fast_loads,
+            id_step=id_step,
+            id_offset=id_offset,
+            archive=True,
+            archived=archived,
+            counter=Counter(
+                Table(
+                    "reaction_count",
+                    metadata,
+                    Column(
+                        "comment_id",
+                        Integer,
+                        ForeignKey("comment.id", ondelete="CASCADE"),
+                        primary_key=True,
+                        autoincrement=False,
+                    ),
+                    Column("reaction_type", Enum(ReactionType), primary_key=True),
+                    Column("count", Integer, nullable=False),
+                    mysql_engine="InnoDB",
+                ),
+                key=["comment_id", "reaction_type"],
+            ),
+        ),
+    )
+
+
+def shard_model_map(shards: Sequence[ModelMap], ids: ShardIds) -> ModelMap:
+    """
+    Return a model map over the model maps of `shards`, which keeps each
+    post on one shard with its comments and their reactions.
+    """
+    return ModelMap(
+        post=ShardedModel([shard["post"] for shard in shards], ids, "id"),
+        comment=ShardedModel([shard["comment"] for shard in shards], ids, "post_id"),
+        reaction=ShardedModel(
+            [shard["reaction"] for shard in shards], ids, "comment_id"
         ),
     )
 
 
-__all__ = ["ModelHelper", "ModelMap"]
+def split_model_map(model_map: ModelMap) -> List[ModelMap]:
+    """Return the model map of each shard of `model_map`, if it's sharded."""
+    posts = model_map["post"]
+    if not isinstance(posts, ShardedModel):
+        return [model_map]
+
+    return [
+        ModelMap(post=post, comment=comment, reaction=reaction)
+        for post, comment, reaction in zip(
+            posts.shards,
+            cast(ShardedModel, model_map["comment"]).shards,
+            cast(ShardedModel, model_map["reaction"]).shards,
+        )
+    ]
+
+
+def bind_model_map(
+    model_map: ModelMap, session: Union[RequestSession, ShardedSession]
+) -> ModelMap:
+    """Return a model map whose models all run their queries in `session`."""
+    # the models of a sharded model map take a `ShardedSession`
+    bound: Any = session
+    return ModelMap(
+        post=model_map["post"].bind(bound),
+        comment=model_map["comment"].bind(bound),
+        reaction=model_map["reaction"].bind(bound),
+    )
+
+
+__all__ = [
+    "ArchivedIds",
+    "Archiver",
+    "Counter",
+    "EngineRouter",
+    "IdempotencyKeys",
+    "ModelHelper",
+    "ModelMap",
+    "Purger",
+    "RequestSession",
+    "SqlBudget",
+    "SqlBudgetExceeded",
+    "ShardIds",
+    "ShardedModel",
+    "ShardedPurger",
+    "ShardedSession",
+    "SqlStats",
+    "WriteCoalescer",
+    "bind_model_map",
+    "open_session",
+    "routers_of",
+    "shard_model_map",
+    "split_model_map",
+]
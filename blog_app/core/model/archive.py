@@ -0,0 +1,70 @@
+"""
+blog_app.core.model.archive - cold storage for rows that are rarely read.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List
+
+from sqlalchemy.schema import Column, Table
+
+
+def archive_table(table: Table) -> Table:
+    """
+    Declare the archive of `table`, `<table>_archive`, in the same metadata.
+    It has the same columns and primary key, but no foreign keys (its rows'
+    parents may be archived too) or defaults (rows are copied in whole).
+    Foreign key columns are indexed, so that nested rows can be found by
+    their parent.
+    """
+    return Table(
+        f"{table.name}_archive",
+        table.metadata,
+        *(
+            Column(
+                col.name,
+                col.type,
+                primary_key=col.primary_key,
+                autoincrement=False,
+                nullable=col.nullable,
+                index=bool(col.foreign_keys),
+            )
+            for col in table.columns
+        ),
+        mysql_engine="InnoDB",
+        mysql_charset="utf8mb4",
+    )
+
+
+class ArchivedIds:
+    """
+    The ids of the rows found in the archive tables, by table, which are
+    never moved back. Rows are looked for in an archive by their parent's id
+    only if the parent is known to be archived, i.e. was loaded from its own
+    archive first, as a post is before its comments. The `size` ids of each
+    table seen last are kept.
+
+    >>> archived = ArchivedIds(size=2)
+    >>> archived.add("post", [1, 2, 3])
+    >>> archived.known("post", [1, 2, 3, 4])
+    [2, 3]
+    """
+
+    def __init__(self, size: int = 10_000):
+        self.size = size
+        self._ids: Dict[str, "OrderedDict[Any, None]"] = {}
+
+    def add(self, table: str, ids: Iterable[Any]):
+        known = self._ids.setdefault(table, OrderedDict())
+        for item_id in ids:
+            known[item_id] = None
+            known.move_to_end(item_id)
+        while len(known) > self.size:
+            known.popitem(last=False)
+
+    def known(self, table: str, ids: Iterable[Any]) -> List[Any]:
+        """Return those of `ids` known to be archived."""
+        known = self._ids.get(table)
+        return [item_id for item_id in ids if known and item_id in known]
+
+
+__all__ = ["ArchivedIds", "archive_table"]
@@ -0,0 +1,112 @@
+"""
+blog_app.core.model.archiver - moves old rows, along with the rows nested
+beneath them, to their archive tables.
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Sequence, Tuple
+
+from sqlalchemy.sql import select
+
+from .model_helper import ModelHelper
+from .purger import select_nested
+
+
+class Archiver:
+    """
+    Moves the rows of `model` which were `created` before a cutoff to its
+    archive, along with the rows nested beneath each of them, which go to
+    their own archives. As for `Purger`, each model in `nested` refers to the
+    one before it (the first, to `model`) by a key column.
+
+    Each row is moved with everything beneath it in one transaction, so that
+    a row and its nested rows are always found in the same place. Rows are
+    archived oldest first, `chunk_size` rows a round.
+    """
+
+    def __init__(
+        self,
+        model: ModelHelper,
+        nested: Sequence[Tuple[str, ModelHelper]],
+        *,
+        created: str = "created",
+        chunk_size: int = 100,
+    ):
+        self.model = model
+        self.nested = nested
+        self.created = model.table.c[created]
+        self.chunk_size = chunk_size
+
+    async def archive(self, before: datetime) -> Dict[str, int]:
+        """
+        Archive every row created before `before`, returning the number of
+        rows moved from each table.
+        """
+        table = self.model.table
+        columns: List[Any] = [table.c["id"]]
+        stmt = self.model._visible(select(*columns).where(self.created < before))
+        stmt = stmt.order_by(self.created, table.c["id"]).limit(self.chunk_size)
+        moved = dict.fromkeys(
+            (model.table.name for model in [self.model, *(m for _, m in self.nested)]),
+            0,
+        )
+
+        while True:
+            async with self.model.engine.connect() as conn:
+                cursor = await conn.execute(stmt)
+                ids = cursor.scalars().all()
+
+                for row_id in ids:
+                    for name, count in (await self._move(conn, row_id)).items():
+                        moved[name] += count
+
+            if len(ids) < self.chunk_size:
+                return moved
+
+    async def _move(self, conn: Any, row_id: int) -> Dict[str, int]:
+        moved: Dict[str, int] = {}
+
+        # copy parents first, then delete children first
+        for depth, (_, model) in enumerate(self.nested):
+            assert model.archive
+            names = model.table.c.keys()
+            rows = select_nested(self.nested, depth, row_id, names)
+            cursor = await conn.execute(
+                model.archive.table.insert().from_select(names, rows)
+            )
+            moved[model.table.name] = cursor.rowcount
+
+        for depth in reversed(range(len(self.nested))):
+            key, model = self.nested[depth]
+            column = model.table.c[key]
+            await conn.execute(
+                model.table.delete().where(
+                    column == row_id
+                    if depth == 0
+                    else column.in_(select_nested(self.nested, depth - 1, row_id))
+                )
+            )
+
+        table = self.model.table
+        columns: List[Any] = list(table.columns)
+        assert self.model.archive
+        cursor = await conn.execute(
+            self.model.archive.table.insert().from_select(
+                table.c.keys(), select(*columns).where(table.c["id"] == row_id)
+            )
+        )
+        moved[table.name] = cursor.rowcount
+        await conn.execute(table.delete().where(table.c["id"] == row_id))
+        await conn.commit()
+
+        logging.info(
+            "Archived %s %s, with %s.",
+            table.name,
+            row_id,
+            ", ".join(f"{count} {name} rows" for name, count in moved.items()),
+        )
+        return moved
+
+
+__all__ = ["Archiver"]
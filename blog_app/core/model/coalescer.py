@@ -0,0 +1,137 @@
+"""
+blog_app.core.model.coalescer - group commit for small, frequent writes.
+"""
+
+import asyncio
+import copy
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+from blog_app.core.result import Result
+from blog_app.core.types import InternalError
+from .model_helper import ModelHelper
+from .session import RequestSession
+from .shards import ShardedSession
+
+
+# rows with the same columns, which update the same columns on a duplicate key
+BatchKey = Tuple[Tuple[str, ...], Tuple[str, ...]]
+Pending = Tuple[Dict[str, Any], "asyncio.Future[Result[int, InternalError]]"]
+
+
+class WriteCoalescer:
+    """
+    Stands in for a model's `create`, collecting the rows created by
+    concurrent callers (across requests) for up to `window` seconds, then
+    writing them with one multi-row upsert in one transaction. A batch is
+    written early once it holds `max_rows` rows.
+
+    Each caller still gets the result for its own row. If a batch fails,
+    its rows are retried one at a time, so that only the callers whose rows
+    are at fault see an error.
+
+    Writes are made on connections of their own, outside of any request's
+    session, so they aren't counted in the requests' `SqlStats`. A writer
+    bound to a request's session (see `bind`) has the request read from the
+    primary once its row is written, as the session would after a write.
+    """
+
+    session: Optional[Union[RequestSession, ShardedSession]] = None
+
+    def __init__(self, model: ModelHelper, *, window: float, max_rows: int = 500):
+        self.model = model
+        self.author_key = model.author_key
+        self.window = window
+        self.max_rows = max_rows
+        self._batches: Dict[BatchKey, List[Pending]] = {}
+        self._timers: Dict[BatchKey, asyncio.TimerHandle] = {}
+        self._writes: Set["asyncio.Future[None]"] = set()
+
+    def bind(self, session: Union[RequestSession, ShardedSession]) -> "WriteCoalescer":
+        """
+        Return a copy of the writer for a request with `session`, which
+        shares its batches with the writer.
+        """
+        bound = copy.copy(self)
+        bound.session = session
+        return bound
+
+    async def create(
+        self, on_duplicate_key: dict = None, **values
+    ) -> Result[int, InternalError]:
+        created = await self._create(on_duplicate_key, **values)
+        if self.session and created.is_ok:
+            await self.session.wrote_elsewhere()
+        return created
+
+    async def _create(
+        self, on_duplicate_key: dict = None, **values
+    ) -> Result[int, InternalError]:
+        on_duplicate_key = on_duplicate_key or {}
+
+        if any(values.get(col) != val for col, val in on_duplicate_key.items()):
+            # a batch can only update columns to the values it inserts.
+            return await self.model.create(on_duplicate_key, **values)
+
+        loop = asyncio.get_event_loop()
+        key = (tuple(sorted(values)), tuple(sorted(on_duplicate_key)))
+        future: "asyncio.Future[Result[int, InternalError]]" = loop.create_future()
+
+        batch = self._batches.setdefault(key, [])
+        batch.append((values, future))
+
+        if len(batch) >= self.max_rows:
+            self._flush(key)
+        elif len(batch) == 1:
+            self._timers[key] = loop.call_later(self.window, self._flush, key)
+
+        return await future
+
+    def _flush(self, key: BatchKey):
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+
+        write = asyncio.ensure_future(self._write(key, self._batches.pop(key)))
+        self._writes.add(write)
+        write.add_done_callback(self._writes.discard)
+
+    async def _write(self, key: BatchKey, batch: List[Pending]):
+        try:
+            await self._write_batch(key, batch)
+        except Exception as err:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(err)
+        finally:
+            # e.g. when the write is cancelled
+            for _, future in batch:
+                future.cancel()
+
+    async def _write_batch(self, key: BatchKey, batch: List[Pending]):
+        rows = [values for values, _ in batch]
+        created = await self.model.create_many(rows, update_on_duplicate=key[1])
+
+        if created.is_ok:
+            ids = created.collapse()
+            for (_, future), row_id in zip(batch, ids):
+                # a caller may have stopped waiting (its request was cancelled)
+                if not future.done():
+                    future.set_result(Result(value=row_id))
+            return
+
+        for values, future in batch:
+            result = await self.model.create(
+                {col: values[col] for col in key[1]}, **values
+            )
+            if not future.done():
+                future.set_result(result)
+
+    async def close(self):
+        """Write any rows that are still waiting for their batch."""
+        for key in list(self._batches):
+            self._flush(key)
+
+        await asyncio.gather(*self._writes)
+
+
+__all__ = ["WriteCoalescer"]
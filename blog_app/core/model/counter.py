@@ -0,0 +1,126 @@
+"""
+blog_app.core.model.counter - counts of a table's rows, kept up to date as
+the rows are written.
+"""
+
+import collections
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from sqlalchemy.schema import Table
+from sqlalchemy.sql import func, select
+from sqlalchemy.sql.dml import Delete, Insert
+from sqlalchemy.sql.selectable import Select
+
+from .dialects import upsert
+
+
+CounterKey = Tuple[Any, ...]
+# the key a row was counted under before a write, and the key it's counted
+# under after it (`None` for a row that doesn't exist).
+Move = Tuple[Optional[CounterKey], Optional[CounterKey]]
+
+
+class Counter:
+    """
+    Counts the rows of a model by the values of its `key` columns, e.g.
+    comments by `post_id`, in a `table` of its own which holds a `count`
+    for each key, so that counts are read by primary key rather than by
+    counting index entries.
+
+    The model keeps the counts up to date in the same transaction as each
+    write to its rows. Counts can be rebuilt from the rows with `recount`.
+    """
+
+    def __init__(self, table: Table, key: Sequence[str]):
+        self.table = table
+        self.key = tuple(key)
+
+    def key_of(self, row: Mapping[str, Any]) -> CounterKey:
+        return tuple(row[col] for col in self.key)
+
+    def covers(self, group_by: Sequence[str], where: Mapping[str, Any]) -> bool:
+        """Whether the counts of rows grouped by `group_by` can be read from here."""
+        return set(group_by) == set(self.key) and set(where) <= set(self.key)
+
+    def select_counts(
+        self, group_by: Sequence[str], where: Mapping[str, Any]
+    ) -> Select:
+        columns: List[Any] = [self.table.c[col] for col in group_by]
+        stmt = select(*[*columns, self.table.c["count"]])
+        stmt = stmt.where(self.table.c["count"] > 0)
+
+        for key, val in where.items():
+            stmt = stmt.where(
+                self.table.c[key].in_(val)
+                if isinstance(val, (list, tuple))
+                else self.table.c[key] == val
+            )
+
+        return stmt
+
+    @staticmethod
+    def changes(moves: Iterable[Move]) -> Dict[CounterKey, int]:
+        """Tally the change to the count for each key made by `moves`."""
+        changes: Dict[CounterKey, int] = collections.Counter()
+
+        for before, after in moves:
+            if before == after:
+                continue
+            if before is not None:
+                changes[before] -= 1
+            if after is not None:
+                changes[after] += 1
+
+        return changes
+
+    async def add(self, conn: Any, changes: Mapping[CounterKey, int]):
+        """Add each change to the count for its key, with one statement."""
+        rows = [
+            {**dict(zip(self.key, key)), "count": change}
+            for key, change in changes.items()
+            if change
+        ]
+        if not rows:
+            return
+
+        count = self.table.c["count"]
+        await conn.execute(
+            upsert(
+                conn,
+                self.table,
+                rows,
+                self.key,
+                lambda inserted: {"count": count + inserted["count"]},
+            )
+        )
+
+    def recount(self, source: Table, start: int, end: int) -> Tuple[Delete, Insert]:
+        """
+        Return statements replacing the counts whose first key column is
+        between `start` and `end` (inclusive) with a count of the `source`
+        rows.
+        """
+        counted = self.table.c[self.key[0]].between(start, end)
+        columns: List[Any] = [source.c[col] for col in self.key]
+
+        return (
+            self.table.delete().where(counted),
+            self.table.insert().from_select(
+                [*self.key, "count"],
+                select(*[*columns, func.count()])
+                .where(source.c[self.key[0]].between(start, end))
+                .group_by(*columns),
+            ),
+        )
+
+
+__all__ = ["Counter"]
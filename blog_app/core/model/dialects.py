@@ -0,0 +1,100 @@
+"""
+blog_app.core.model.dialects - SQL which is written differently for each of
+the databases that the app runs on (MySQL, and SQLite).
+"""
+
+import contextlib
+from typing import Any, AsyncIterator, Callable, Dict, Mapping, Sequence, Union
+
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.schema import Table
+from sqlalchemy.sql.dml import Insert
+from sqlalchemy.sql.expression import ColumnElement
+from sqlalchemy.types import TIMESTAMP
+
+
+class UpdatedTimestamp(ColumnElement):
+    """
+    The server default of a column holding the time its row was last
+    updated. MySQL keeps it current itself; other databases only set it when
+    the row is inserted, so such columns should also be given
+    `onupdate=func.now()`.
+    """
+
+    type = TIMESTAMP()
+
+
+@compiles(UpdatedTimestamp)
+def _compile_updated_timestamp(element: UpdatedTimestamp, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(UpdatedTimestamp, "mysql")
+def _compile_updated_timestamp_mysql(element: UpdatedTimestamp, compiler, **kw):
+    return "CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"
+
+
+def upsert(
+    conn: Any,
+    table: Table,
+    values: Union[Dict[str, Any], Sequence[Dict[str, Any]]],
+    key: Sequence[str],
+    update: Callable[[Any], Mapping[str, Any]],
+) -> Insert:
+    """
+    Return a statement inserting `values` into `table`, for execution on
+    `conn`. Rows which collide with an existing row on the unique `key`
+    columns update that row with `update(inserted)` instead, where
+    `inserted` holds the columns of the row that would have been inserted.
+
+    MySQL updates rows which collide on any unique key, SQLite only those
+    which collide on `key`. Columns with an `onupdate` value are set to it,
+    as they are by an UPDATE.
+    """
+    if conn.dialect.name == "sqlite":
+        stmt = sqlite.insert(table).values(values)
+        inserted = stmt.excluded
+    else:
+        stmt = mysql.insert(table).values(values)
+        inserted = stmt.inserted
+
+    set_ = {
+        **{
+            col.name: col.onupdate.arg
+            for col in table.columns
+            if col.onupdate is not None
+        },
+        **update(inserted),
+    }
+
+    if conn.dialect.name == "sqlite":
+        return stmt.on_conflict_do_update(index_elements=list(key), set_=set_)
+    return stmt.on_duplicate_key_update(set_)
+
+
+@contextlib.asynccontextmanager
+async def claim(conn: Any, name: str) -> AsyncIterator[bool]:
+    """
+    Try to take the lock `name` on `conn`, without waiting, and hold it for
+    the rest of the context, across transactions; yield whether it was
+    taken. Only one connection can hold a lock at a time, and it's released
+    if the connection is lost.
+
+    MySQL has named locks; SQLite doesn't, but holds a single write lock for
+    every writer anyway, so the lock is always taken there.
+    """
+    if conn.dialect.name != "mysql":
+        yield True
+        return
+
+    cursor = await conn.exec_driver_sql("SELECT GET_LOCK(%s, 0)", (name,))
+    taken = cursor.scalar() == 1
+    try:
+        yield taken
+    finally:
+        if taken:
+            await conn.exec_driver_sql("SELECT RELEASE_LOCK(%s)", (name,))
+
+
+__all__ = ["UpdatedTimestamp", "claim", "upsert"]
@@ -0,0 +1,47 @@
+"""
+blog_app.core.model.fulltext - MySQL full text search expressions.
+
+SQLite has no FULLTEXT indexes, so there the search is a scan for the query
+as a substring of each column, which is only fit for small databases.
+"""
+
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.types import Float
+
+
+class MatchAgainst(FunctionElement):
+    """
+    `MATCH (<columns>) AGAINST (<query> IN NATURAL LANGUAGE MODE)`: the
+    relevance of a row to the search `query`, which is zero for rows that
+    don't match. The columns must be exactly those of a FULLTEXT index.
+
+    Called as `MatchAgainst(*columns, query)`.
+    """
+
+    name = "match_against"
+    type = Float()
+    inherit_cache = True
+
+
+@compiles(MatchAgainst)
+def _compile_match_against(element: MatchAgainst, compiler, **kw):
+    *columns, query = element.clauses
+    return "MATCH (%s) AGAINST (%s IN NATURAL LANGUAGE MODE)" % (
+        ", ".join(compiler.process(column, **kw) for column in columns),
+        compiler.process(query, **kw),
+    )
+
+
+@compiles(MatchAgainst, "sqlite")
+def _compile_match_against_sqlite(element: MatchAgainst, compiler, **kw):
+    # the number of columns which contain the query, ignoring case.
+    *columns, query = element.clauses
+    return "(%s)" % " + ".join(
+        "(instr(lower(coalesce(%s, '')), lower(%s)) > 0)"
+        % (compiler.process(column, **kw), compiler.process(query, **kw))
+        for column in columns
+    )
+
+
+__all__ = ["MatchAgainst"]
@@ -0,0 +1,74 @@
+"""
+blog_app.core.model.idempotency - the rows created for the idempotency keys
+given by clients, so that a retried create returns the row that was created
+the first time rather than creating another.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from sqlalchemy.schema import Table
+from sqlalchemy.sql import and_, select
+
+
+class IdempotencyKeys:
+    """
+    Remembers the id of the row that was created for each key, by author
+    (keys are chosen by clients, so they're only unique to one), in a
+    `table` which may be shared by several models, each with its own
+    `scope`. Keys are forgotten after `ttl` seconds.
+
+    Keys are saved in the same transaction as the rows created for them, so
+    a key is never saved for a row that wasn't. Of two concurrent creates
+    with the same key, the second fails to save it, and so creates nothing.
+    """
+
+    def __init__(self, table: Table, scope: str, ttl: float):
+        self.table = table
+        self.scope = scope
+        self.ttl = timedelta(seconds=ttl)
+
+    def _where(self, author_id: Any, *clauses: Any) -> Any:
+        return and_(
+            self.table.c["scope"] == self.scope,
+            self.table.c["author_id"] == author_id,
+            *clauses,
+        )
+
+    async def find(self, conn: Any, author_id: Any, key: str) -> Optional[int]:
+        """The id of the row created for `key`, if it's not expired."""
+        columns: Any = [self.table.c["item_id"]]
+        cursor = await conn.execute(
+            select(*columns).where(
+                self._where(
+                    author_id,
+                    self.table.c["key"] == key,
+                    self.table.c["expires"] > datetime.now(),
+                )
+            )
+        )
+        return cursor.scalar()
+
+    async def save(self, conn: Any, author_id: Any, key: str, item_id: int):
+        """
+        Save the id of the row created for `key`, forgetting the author's
+        expired keys (which may include `key`) as it does.
+        """
+        now = datetime.now()
+        await conn.execute(
+            self.table.delete().where(
+                self._where(author_id, self.table.c["expires"] <= now)
+            )
+        )
+        await conn.execute(
+            self.table.insert().values(
+                scope=self.scope,
+                author_id=author_id,
+                key=key,
+                item_id=item_id,
+                expires=now + self.ttl,
+            )
+        )
+
+
+__all__ = ["IdempotencyKeys"]
@@ -0,0 +1,423 @@
+"""
+blog_app.core.model.migrations - versioned changes to the database schema.
+
+The tables and indexes themselves are declared once, in `register_tables`;
+each migration names the parts of that schema which it adds (and removes
+again when downgraded), and its SQL is generated from their declarations.
+"""
+
+import dataclasses
+from typing import Any, Dict, List, Optional, Protocol, Sequence, Set, Tuple
+
+from sqlalchemy import inspect
+from sqlalchemy.schema import (
+    Column,
+    CreateIndex,
+    CreateTable as CreateTableDDL,
+    DropIndex,
+    DropTable,
+    Index,
+    MetaData,
+    Table,
+)
+from sqlalchemy.sql import func, select
+from sqlalchemy.types import Integer, String, TIMESTAMP
+
+
+# one row for each migration applied to the database
+VERSION_TABLE = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(150), nullable=False),
+    Column("applied", TIMESTAMP, nullable=False, server_default=func.now()),
+    mysql_engine="InnoDB",
+    mysql_charset="utf8mb4",
+)
+
+# indexes dropped by a later migration, by table and name, with their
+# columns: they're no longer declared in `register_tables`, but the
+# migrations before still create them.
+REMOVED_INDEXES: Dict[Tuple[str, str], Tuple[str, ...]] = {
+    ("comment", "ix_comment_post_id"): ("post_id",),
+}
+
+
+class Schema:
+    """
+    The tables of a database, with the names of their indexes (and of
+    their columns), and its version, as they will be once the statements
+    planned so far have run.
+    """
+
+    def __init__(
+        self,
+        metadata: MetaData,
+        dialect: Any,
+        indexes: Dict[str, Set[str]],
+        version: int = 0,
+        columns: Optional[Dict[str, Set[str]]] = None,
+    ):
+        self.metadata = metadata
+        self.dialect = dialect
+        self.indexes = indexes
+        self.version = version
+        # tables created by a migration have every column they're declared with
+        self.columns = columns if columns is not None else {}
+
+    @classmethod
+    def inspect(cls, conn: Any, metadata: MetaData) -> "Schema":
+        """Inspect the database of a (synchronous) connection."""
+        inspector = inspect(conn)
+        tables = inspector.get_table_names()
+        indexes = {
+            table: {index["name"] for index in inspector.get_indexes(table)}
+            for table in tables
+        }
+        columns = {
+            table: {column["name"] for column in inspector.get_columns(table)}
+            for table in tables
+        }
+        version = 0
+
+        if VERSION_TABLE.name in indexes:
+            stmt = select(func.max(VERSION_TABLE.c.version))
+            version = conn.execute(stmt).scalar() or 0
+
+        return cls(metadata, conn.dialect, indexes, version, columns)
+
+    @property
+    def online(self) -> bool:
+        """
+        Whether tables are changed with MySQL's online DDL. Other databases
+        (i.e. SQLite, whose ALTER TABLE is quick but locks the whole
+        database) use plain DDL.
+        """
+        return self.dialect.name == "mysql"
+
+    def table(self, name: str) -> Table:
+        return self.metadata.tables[name]
+
+    def has_column(self, table: str, name: str) -> bool:
+        if table in self.columns:
+            return name in self.columns[table]
+        return table in self.indexes and name in self.table(table).c
+
+    def index(self, table: str, name: str) -> Index:
+        if (table, name) in REMOVED_INDEXES:
+            # declared on a copy of the table, which is left as it is
+            declared: Any = self.table(table)
+            copy = declared.to_metadata(MetaData())
+            columns = [copy.c[column] for column in REMOVED_INDEXES[table, name]]
+            return Index(name, *columns)
+
+        return next(idx for idx in self.table(table).indexes if idx.name == name)
+
+    def quote(self, name: str) -> str:
+        return self.dialect.identifier_preparer.quote(name)
+
+    def compile(self, element: Any) -> str:
+        return str(element.compile(dialect=self.dialect)).strip()
+
+    def literal(self, stmt: Any) -> str:
+        """Compile a statement with its parameters written out."""
+        return str(
+            stmt.compile(dialect=self.dialect, compile_kwargs={"literal_binds": True})
+        ).strip()
+
+
+class Step(Protocol):
+    def upgrade(self, schema: Schema) -> List[str]:
+        """Return the statements applying this step, if it isn't already."""
+
+    def downgrade(self, schema: Schema) -> List[str]:
+        """Return the statements reverting this step, if it's applied."""
+
+
+@dataclasses.dataclass(frozen=True)
+class CreateTable:
+    """
+    Create a table, with those of its `indexes` which it was introduced with
+    (any added later have migrations of their own).
+    """
+
+    name: str
+    indexes: Sequence[str] = ()
+
+    def upgrade(self, schema: Schema) -> List[str]:
+        if self.name in schema.indexes:
+            return []
+
+        schema.indexes[self.name] = set(self.indexes)
+        schema.columns.pop(self.name, None)
+        indexes: List[Any] = [schema.index(self.name, name) for name in self.indexes]
+        return [
+            schema.compile(CreateTableDDL(schema.table(self.name))),
+            *(schema.compile(CreateIndex(index)) for index in indexes),
+        ]
+
+    def downgrade(self, schema: Schema) -> List[str]:
+        if self.name not in schema.indexes:
+            return []
+
+        table: Any = schema.table(self.name)
+        del schema.indexes[self.name]
+        schema.columns.pop(self.name, None)
+        return [schema.compile(DropTable(table))]
+
+
+@dataclasses.dataclass(frozen=True)
+class AddIndex:
+    """
+    Add an index to a live table with an online DDL statement (on MySQL), so
+    that the table can still be read and written while the index is built.
+    """
+
+    table: str
+    name: str
+
+    def upgrade(self, schema: Schema) -> List[str]:
+        if self.name in schema.indexes[self.table]:
+            return []
+
+        index: Any = schema.index(self.table, self.name)
+        schema.indexes[self.table].add(self.name)
+        if not schema.online:
+            return [schema.compile(CreateIndex(index))]
+
+        prefix = index.dialect_options["mysql"]["prefix"]
+        kind = f"{prefix} INDEX" if prefix else "INDEX"
+        if index.unique:
+            kind = f"UNIQUE {kind}"
+        columns = ", ".join(schema.quote(column.name) for column in index.columns)
+        # InnoDB builds FULLTEXT indexes in place, but can't accept writes
+        # to the table meanwhile.
+        lock = "SHARED" if prefix == "FULLTEXT" else "NONE"
+
+        return [
+            f"ALTER TABLE {schema.quote(self.table)} "
+            f"ADD {kind} {schema.quote(self.name)} ({columns}), "
+            f"ALGORITHM=INPLACE, LOCK={lock}"
+        ]
+
+    def downgrade(self, schema: Schema) -> List[str]:
+        if self.name not in schema.indexes.get(self.table, ()):
+            return []
+
+        schema.indexes[self.table].discard(self.name)
+        if not schema.online:
+            index: Any = schema.index(self.table, self.name)
+            return [schema.compile(DropIndex(index))]
+
+        return [
+            f"ALTER TABLE {schema.quote(self.table)} "
+            f"DROP INDEX {schema.quote(self.name)}, ALGORITHM=INPLACE, LOCK=NONE"
+        ]
+
+
+@dataclasses.dataclass(frozen=True)
+class RemoveIndex:
+    """
+    Drop an index which another covers (on MySQL, with an online DDL
+    statement), declared in `REMOVED_INDEXES` so that it can be added back
+    when downgraded.
+    """
+
+    table: str
+    name: str
+
+    def upgrade(self, schema: Schema) -> List[str]:
+        return AddIndex(self.table, self.name).downgrade(schema)
+
+    def downgrade(self, schema: Schema) -> List[str]:
+        return AddIndex(self.table, self.name).upgrade(schema)
+
+
+@dataclasses.dataclass(frozen=True)
+class AddColumn:
+    """
+    Add a column to a live table with an online DDL statement (on MySQL). The
+    table is rebuilt in place, while it can still be read and written.
+    """
+
+    table: str
+    name: str
+
+    def upgrade(self, schema: Schema) -> List[str]:
+        if schema.has_column(self.table, self.name):
+            return []
+
+        column = schema.table(self.table).c[self.name]
+        spec = schema.dialect.ddl_compiler(
+            schema.dialect, None
+        ).get_column_specification(column)
+
+        self._set(schema, add=True)
+        sql = f"ALTER TABLE {schema.quote(self.table)} ADD COLUMN {spec}"
+        return [f"{sql}, ALGORITHM=INPLACE, LOCK=NONE" if schema.online else sql]
+
+    def downgrade(self, schema: Schema) -> List[str]:
+        if not schema.has_column(self.table, self.name):
+            return []
+
+        self._set(schema, add=False)
+        sql = f"ALTER TABLE {schema.quote(self.table)} DROP COLUMN {schema.quote(self.name)}"
+        return [f"{sql}, ALGORITHM=INPLACE, LOCK=NONE" if schema.online else sql]
+
+    def _set(self, schema: Schema, add: bool):
+        columns = schema.columns.setdefault(
+            self.table, set(schema.table(self.table).c.keys())
+        )
+        if add:
+            columns.add(self.name)
+        else:
+            columns.discard(self.name)
+
+
+@dataclasses.dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    steps: Sequence[Step]
+
+    def upgrade(self, schema: Schema) -> List[str]:
+        statements = [sql for step in self.steps for sql in step.upgrade(schema)]
+        record = VERSION_TABLE.insert().values(version=self.version, name=self.name)
+
+        schema.version = self.version
+        return [*statements, schema.literal(record)]
+
+    def downgrade(self, schema: Schema, target: int) -> List[str]:
+        statements = [
+            sql for step in reversed(self.steps) for sql in step.downgrade(schema)
+        ]
+        record = VERSION_TABLE.delete().where(VERSION_TABLE.c.version == self.version)
+
+        schema.version = target
+        return [*statements, schema.literal(record)]
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        1,
+        "create tables",
+        [
+            CreateTable("post", ["ix_post_author_id"]),
+            CreateTable("comment", ["ix_comment_post_id"]),
+            CreateTable("reaction", ["ix_reaction_comment_id"]),
+        ],
+    ),
+    Migration(
+        2,
+        "indexes for pagination by creation time",
+        [
+            AddIndex("post", "ix_post_created_id"),
+            AddIndex("comment", "ix_comment_post_id_created_id"),
+        ],
+    ),
+    Migration(
+        3,
+        "comment and reaction counters",
+        [CreateTable("comment_count"), CreateTable("reaction_count")],
+    ),
+    Migration(
+        4,
+        "full text search indexes",
+        [
+            AddIndex("post", "ix_post_fulltext"),
+            AddIndex("comment", "ix_comment_fulltext"),
+        ],
+    ),
+    Migration(
+        5,
+        "soft deletion of posts",
+        [AddColumn("post", "deleted"), AddIndex("post", "ix_post_deleted")],
+    ),
+    Migration(
+        6,
+        "archive tables",
+        [
+            CreateTable("post_archive"),
+            CreateTable("comment_archive", ["ix_comment_archive_post_id"]),
+            CreateTable("reaction_archive", ["ix_reaction_archive_comment_id"]),
+        ],
+    ),
+    Migration(7, "idempotency keys", [CreateTable("idempotency_key")]),
+    Migration(
+        8,
+        "drop the post index of comments, covered by their pagination index",
+        [RemoveIndex("comment", "ix_comment_post_id")],
+    ),
+]
+
+# a migration's name, and the statements which apply or revert it
+PlannedMigration = Tuple[str, List[str]]
+
+
+def plan_migration(
+    schema: Schema,
+    target: Optional[int] = None,
+    migrations: Sequence[Migration] = MIGRATIONS,
+) -> List[PlannedMigration]:
+    """
+    Plan the statements migrating the database of `schema` from its version
+    to `target` (the latest version by default), upgrading or downgrading
+    it one migration at a time.
+
+    Steps which are already applied (or reverted) are skipped, so that a
+    database created before it was versioned can be brought up to date.
+    """
+    versions = [migration.version for migration in migrations]
+    if target is None:
+        target = versions[-1]
+    if target != 0 and target not in versions:
+        raise ValueError(f"Unknown schema version {target}")
+
+    planned: List[PlannedMigration] = []
+
+    if VERSION_TABLE.name not in schema.indexes:
+        schema.indexes[VERSION_TABLE.name] = set()
+        planned.append(
+            ("schema versions", [schema.compile(CreateTableDDL(VERSION_TABLE))])
+        )
+
+    if target >= schema.version:
+        for migration in migrations:
+            if schema.version < migration.version <= target:
+                name = f"{migration.version}: {migration.name}"
+                planned.append((name, migration.upgrade(schema)))
+    else:
+        for previous, migration in reversed(list(zip([0, *versions], migrations))):
+            if target < migration.version <= schema.version:
+                name = f"{migration.version}: revert {migration.name}"
+                planned.append((name, migration.downgrade(schema, previous)))
+
+    return planned
+
+
+def run_migration(conn: Any, planned: Sequence[PlannedMigration]):
+    """
+    Run planned migrations on a (synchronous) connection, committing after
+    each one. MySQL commits each DDL statement as it runs, so a migration
+    that fails part way is left partly applied; as its steps are skipped
+    once applied, it can be run again when the cause is fixed.
+    """
+    for _, statements in planned:
+        for sql in statements:
+            conn.exec_driver_sql(sql)
+        conn.commit()
+
+
+__all__ = [
+    "AddColumn",
+    "AddIndex",
+    "CreateTable",
+    "MIGRATIONS",
+    "Migration",
+    "REMOVED_INDEXES",
+    "RemoveIndex",
+    "Schema",
+    "VERSION_TABLE",
+    "plan_migration",
+    "run_migration",
+]
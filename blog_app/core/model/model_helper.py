@@ -1,12 +1,71 @@
-from typing import Any, Collection, Dict, List, Sequence, Union, cast, overload
+import copy
+from decimal import Decimal
+from typing import (
+    Any,
+    AsyncContextManager,
+    AsyncIterator,
+    Collection,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+    overload,
+)
 
-from sqlalchemy.sql import select, ColumnElement
-from sqlalchemy.schema import Table
+from sqlalchemy.sql import (
+    and_,
+    bindparam,
+    cast as sql_cast,
+    func,
+    or_,
+    select,
+    tuple_,
+    union_all,
+    ColumnElement,
+)
+from sqlalchemy.schema import Table, UniqueConstraint
 from sqlalchemy.sql.dml import Delete, Insert, Update
 from sqlalchemy.sql.selectable import Select
-from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.types import Numeric
 
 from blog_app.core.types import InternalError
+from .archive import ArchivedIds, archive_table
+from .counter import Counter
+from .dialects import upsert
+from .fast_path import IdLoad, supports
+from .idempotency import IdempotencyKeys
+from .fulltext import MatchAgainst
+from .router import EngineRouter
+from .session import RequestSession
+
+
+STREAM_CHUNK_SIZE = 1000
+
+
+# the columns selected, and the columns filtered on (and whether each is
+# filtered by a list of values).
+StatementShape = Tuple[Tuple[Any, ...], Tuple[Tuple[str, bool], ...]]
+
+Statement = TypeVar("Statement", Select, Update, Delete)
+
+
+class PageSpec(NamedTuple):
+    """
+    Describes a single keyset-paginated query: rows matching `where`
+    (equality filters only), ordered by the `order_by` columns, which follow
+    the row whose ordering values are `after`.
+    """
+
+    where: Dict[str, Any]
+    order_by: Tuple[str, ...]
+    descending: bool = False
+    after: Optional[Tuple[Any, ...]] = None
+    limit: int = 20
 
 
 class ModelHelper:
@@ -16,50 +75,826 @@ class ModelHelper:
 
     engine: Any
     author_key: str
+    session: Optional[RequestSession] = None
 
-    def __init__(self, author_key: str, table: Table, engine: Any):
+    def __init__(
+        self,
+        author_key: str,
+        table: Table,
+        engine: Any,
+        router: Optional[EngineRouter] = None,
+        counter: Optional[Counter] = None,
+        soft_delete: Optional[str] = None,
+        parent: Optional[Tuple[str, "ModelHelper"]] = None,
+        archive: bool = False,
+        archived: Optional[ArchivedIds] = None,
+        fast_loads: bool = False,
+        idempotency: Optional[IdempotencyKeys] = None,
+        id_step: int = 1,
+        id_offset: int = 1,
+    ):
+        """
+        `engine` is the primary database engine. Requests read from the engine
+        picked by `router`, which should be shared by all models.
+
+        If there's a `counter`, every write keeps it up to date, and counts of
+        rows grouped by its key are read from it.
+
+        With `soft_delete`, deleting a row only sets that (nullable timestamp)
+        column, and the row is hidden until it's purged (see `Purger`). A
+        `parent` is the key column of the rows' parents and their model; rows
+        whose parent is hidden are hidden too.
+
+        With `archive`, rows can be moved to an archive table (see
+        `archive_table` and `Archiver`). Loads by id look for the ids that
+        match no rows in the archive, as do loads by a foreign key for the
+        parents in `archived` (the ids found in archives, shared by models).
+
+        With `fast_loads`, rows loaded by a list of ids (as the dataloaders
+        do) are selected with SQL compiled ahead of time, see `IdLoad`.
+
+        With `idempotency`, a create may be given an idempotency key; creating
+        with the same key again returns the id of the row created the first
+        time, without writing anything.
+
+        New rows are given ids `id_step` apart, from those equal to
+        `id_offset` modulo `id_step` (see `ShardIds`). MySQL must be set up
+        to allocate them so; ids are allocated here on other databases.
+        """
         self.table = table
         self.engine = engine
         self.author_key = author_key
+        self.router = router or EngineRouter(engine)
+        self.counter = counter
+        self.soft_delete = soft_delete
+        self.parent = parent
+        # the columns of an item, loaded when no columns are asked for
+        self.columns = [col for col in table.columns if col.name != soft_delete]
+        self.archive: Optional[ModelHelper] = None
+        self.archived = archived or ArchivedIds()
+        if archive:
+            self.archive = ModelHelper(
+                author_key,
+                archive_table(table),
+                engine,
+                self.router,
+                soft_delete=soft_delete,
+                fast_loads=fast_loads,
+            )
+        # select statements by shape, see `_select_rows`
+        self._statements: Dict[StatementShape, Select] = {}
+        self.fast_loads = fast_loads
+        self.idempotency = idempotency
+        # loads by id, by the columns loaded and dialect; see `_load_by_ids`
+        self._id_loads: Dict[Tuple[Tuple[str, ...], str], IdLoad] = {}
+        self.id_step = id_step
+        self.id_offset = id_offset
+
+    def bind(self, session: RequestSession) -> "ModelHelper":
+        """Return a copy of the helper which runs its queries in `session`."""
+        bound = copy.copy(self)
+        bound.session = session
+        if self.archive:
+            bound.archive = self.archive.bind(session)
+        return bound
+
+    def _reading(self) -> AsyncContextManager[Any]:
+        return self.session.read() if self.session else self.engine.connect()
+
+    def _writing(self) -> AsyncContextManager[Any]:
+        return self.session.write() if self.session else self.engine.connect()
 
     async def load_all(self, *cols: Union[ColumnElement, str], **where):
-        columns = [self.table.c[col] if isinstance(col, str) else col for col in cols]
-        stmt = select(*(columns or self.table.columns))
-        stmt = self._restrict_rows(stmt, where)
+        """
+        Load `cols` (or all columns) of the rows matching `where`, ordered by
+        their ids, so that the order doesn't depend on the index a query
+        happens to be planned with.
+        """
+        async with self._reading() as conn:
+            if self._loads_by_ids(conn, cols, where):
+                rows = await self._load_by_ids(conn, cast(Any, cols), where["id"])
+            else:
+                cursor = await conn.execute(*self._select_rows(cols, where))
+                rows = cursor.fetchall()
+
+        names = [col if isinstance(col, str) else str(col.key) for col in cols]
+        archived = self._archived_where(rows, where, names)
+        if archived:
+            assert self.archive
+            found = await self.archive.load_all(*names, **archived)
+            if not names or "id" in names:
+                self.archived.add(self.table.name, (row.id for row in found))
+            rows = [*rows, *found]
+            if not names or "id" in names:
+                rows.sort(key=lambda row: row.id)
+
+        return rows
+
+    async def count_all(self, *group_by: str, **where):
+        """
+        Count the rows matching `where` for each distinct value of the
+        `group_by` columns, returning rows of the group's values followed
+        by its count, e.g. `(comment_id, reaction_type, count)`.
+        """
+        where = {key: val for key, val in where.items() if key in self.table.c}
+
+        if self.counter and self.counter.covers(group_by, where):
+            stmt = self.counter.select_counts(group_by, where)
+        else:
+            columns: List[Any] = [self.table.c[col] for col in group_by]
+            stmt = select(*[*columns, func.count().label("count")])
+            stmt = self._visible(self._restrict_rows(stmt.group_by(*columns), where))
+
+        async with self._reading() as conn:
+            cursor = await conn.execute(stmt)
+            rows = cursor.fetchall()
+
+        archived = self._archived_where(rows, where, group_by)
+        if archived:
+            assert self.archive
+            rows = [*rows, *await self.archive.count_all(*group_by, **archived)]
+
+        return rows
+
+    def _loads_by_ids(
+        self, conn: Any, cols: Sequence[Union[ColumnElement, str]], where: Any
+    ) -> bool:
+        return (
+            self.fast_loads
+            and list(where) == ["id"]
+            and isinstance(where["id"], (list, tuple))
+            and all(isinstance(col, str) for col in cols)
+            and supports(conn.dialect)
+        )
+
+    async def _load_by_ids(
+        self, conn: Any, cols: Tuple[str, ...], ids: Sequence[int]
+    ) -> List[Any]:
+        key = (cols, conn.dialect.name)
+        load = self._id_loads.get(key)
+
+        if load is None:
+            columns: List[Any] = [self.table.c[col] for col in cols] or self.columns
+            stmt = self._visible(select(*columns)).order_by(self.table.c["id"])
+            load = self._id_loads[key] = IdLoad(stmt, self.table.c["id"], conn.dialect)
+
+        return await load.load(conn, ids)
+
+    def _archived_where(
+        self, rows: Sequence[Any], where: Dict[str, Any], cols: Sequence[str]
+    ) -> Dict[str, Any]:
+        """
+        Return the filter for the rows to look for in the archive, after
+        loading `rows` (with `cols`, or all columns) matching `where`: the
+        ids which matched no rows, or the values of a foreign key filter
+        which matched no rows and are ids of archived parents.
+        """
+        if self.archive is None or len(where) != 1:
+            return {}
+
+        ((key, values),) = where.items()
+        column = self.table.c.get(key)
+        if column is None or not (column.primary_key or column.foreign_keys):
+            return {}
+        if isinstance(values, Select) or (cols and key not in cols):
+            return {}
+
+        found = {getattr(row, key) for row in rows}
+        listed = isinstance(values, (list, tuple))
+        missing = [
+            value for value in (values if listed else [values]) if value not in found
+        ]
+
+        if not column.primary_key:
+            (foreign_key,) = column.foreign_keys
+            missing = self.archived.known(foreign_key.column.table.name, missing)
+
+        if not missing:
+            return {}
+        return {key: missing if listed else missing[0]}
+
+    def is_archived(self, item_id: int) -> bool:
+        """Whether the item `item_id` was found in the archive."""
+        return bool(self.archived.known(self.table.name, [item_id]))
+
+    async def stream_all(
+        self,
+        *cols: Union[ColumnElement, str],
+        chunk_size: int = STREAM_CHUNK_SIZE,
+        **where,
+    ) -> AsyncIterator[Any]:
+        """
+        Like `load_all`, but yield rows one at a time from an unbuffered
+        server-side cursor, fetching `chunk_size` rows per round trip. At most
+        one chunk of rows is held in memory, however many rows are read.
+
+        The cursor holds its own connection until iteration finishes, so
+        don't issue other queries on it while consuming the rows.
+        """
+        stmt, params = self._select_rows(cols, where)
 
         async with self.engine.connect() as conn:
+            result = await conn.stream(stmt, params)
+
+            async for chunk in result.partitions(chunk_size):
+                for row in chunk:
+                    yield row
+
+    def _select_rows(
+        self, cols: Sequence[Union[ColumnElement, str]], where: Dict[str, Any]
+    ) -> Tuple[Select, Dict[str, Any]]:
+        """
+        Return a statement selecting `cols` from the rows matching `where`
+        (as in `_restrict_rows`), along with the parameters to execute it with.
+
+        Models are only queried in a handful of shapes, so the statement for
+        each shape is built once and kept. Its filter values are bound
+        parameters, and lists of values are "expanding" parameters, so the
+        same statement serves an IN list of any length. SQLAlchemy can then
+        reuse its compiled form without building and hashing a new statement
+        for every query.
+        """
+        where = {key: val for key, val in where.items() if key in self.table.c}
+        columns = [self.table.c[col] if isinstance(col, str) else col for col in cols]
+
+        if any(isinstance(val, Select) for val in where.values()):
+            # a subquery isn't a parameter, so its statement can't be reused.
+            stmt = self._visible(select(*(columns or self.columns)))
+            stmt = self._restrict_rows(stmt, where)
+            return stmt.order_by(self.table.c["id"]), {}
+
+        shape = (
+            tuple(cols),
+            tuple((key, isinstance(val, (list, tuple))) for key, val in where.items()),
+        )
+        cached = self._statements.get(shape)
+
+        if cached is None:
+            stmt = self._visible(select(*(columns or self.columns)))
+
+            for key, expanding in shape[1]:
+                param: Any = bindparam(f"where_{key}", expanding=expanding)
+                stmt = stmt.where(
+                    self.table.c[key].in_(param)
+                    if expanding
+                    else self.table.c[key] == param
+                )
+
+            self._statements[shape] = cached = stmt.order_by(self.table.c["id"])
+
+        return cached, {
+            f"where_{key}": list(val) if isinstance(val, (list, tuple)) else val
+            for key, val in where.items()
+        }
+
+    def select_ids(self, **where) -> Select:
+        """
+        Return a statement selecting the ids of the rows matching `where`,
+        which can be passed as a filter to another query, as in
+        `comments.load_all(post_id=posts.select_ids(author_id=...))`.
+        """
+        columns: List[Any] = [self.table.c["id"]]
+        return self._visible(self._restrict_rows(select(*columns), where))
+
+    def select_hidden_ids(self) -> Optional[Select]:
+        """
+        Return a statement selecting the ids of the rows which are hidden,
+        pending their purge, or `None` if rows are never hidden.
+        """
+        columns: List[Any] = [self.table.c["id"]]
+
+        if self.soft_delete:
+            return select(*columns).where(self.table.c[self.soft_delete].isnot(None))
+
+        if self.parent:
+            key, parent = self.parent
+            hidden = parent.select_hidden_ids()
+            if hidden is not None:
+                return select(*columns).where(self.table.c[key].in_(hidden))
+
+        return None
+
+    def _visible(self, stmt: Statement) -> Statement:
+        """Restrict a statement to the rows which aren't hidden."""
+        if self.soft_delete:
+            stmt = stmt.where(self.table.c[self.soft_delete].is_(None))
+
+        if self.parent:
+            key, parent = self.parent
+            hidden = parent.select_hidden_ids()
+            if hidden is not None:
+                # only rows pending their purge are hidden, so this is short.
+                stmt = stmt.where(self.table.c[key].notin_(hidden))
+
+        return stmt
+
+    async def load_matches(
+        self,
+        query: str,
+        *,
+        after: Optional[Tuple[Decimal, Optional[int]]] = None,
+        limit: int,
+    ):
+        """
+        Load the `id` and `score` of the rows matching the full text search
+        `query`, on the columns of the table's FULLTEXT index, ordered by
+        relevance (most relevant first) and then by id.
+
+        `after` is a `(score, id)` pair, and continues after the row with that
+        score and id: only rows less relevant than `score`, or as relevant with
+        an id above `id` (unless `id` is `None`), are loaded.
+        """
+        index = next(
+            index
+            for index in self.table.indexes
+            if index.dialect_options["mysql"]["prefix"] == "FULLTEXT"
+        )
+        match = MatchAgainst(*index.columns, query)
+        # scores are compared exactly between pages, so they mustn't be floats.
+        score = sql_cast(match, Numeric(20, 10))
+        score_label = score.label("score")
+        columns: List[Any] = [self.table.c["id"], score_label]
+        stmt = self._visible(select(*columns).where(match > 0))
+
+        if after is not None:
+            after_score, after_id = after
+            beyond = score < after_score
+
+            if after_id is not None:
+                beyond = or_(
+                    beyond, and_(score == after_score, self.table.c["id"] > after_id)
+                )
+
+            stmt = stmt.where(beyond)
+
+        stmt = stmt.order_by(score_label.desc(), self.table.c["id"]).limit(limit)
+
+        async with self._reading() as conn:
             cursor = await conn.execute(stmt)
             return cursor.fetchall()
 
-    async def create(self, on_duplicate_key: dict = None, **values):
-        return await InternalError.wrap(self._create, on_duplicate_key, **values)
+    async def load_page(
+        self,
+        *cols: Union[ColumnElement, str],
+        order_by: Sequence[str],
+        descending: bool = False,
+        after: Optional[Sequence[Any]] = None,
+        limit: int,
+        **where,
+    ):
+        spec = PageSpec(
+            where=where,
+            order_by=tuple(order_by),
+            descending=descending,
+            after=tuple(after) if after is not None else None,
+            limit=limit,
+        )
+        return (await self.load_pages(*cols, pages=[spec]))[0]
+
+    async def load_pages(
+        self, *cols: Union[ColumnElement, str], pages: Sequence[PageSpec]
+    ) -> List[List[Any]]:
+        """
+        Load several keyset pages at once, returning a list of rows for each
+        page. Pages for distinct `where` values are combined into a single
+        `UNION ALL` query, so loading the first page of comments for many
+        posts costs one round trip.
+        """
+        if len(pages) == 1:
+            async with self._reading() as conn:
+                cursor = await conn.execute(self._page_statement(cols, pages[0]))
+                return [cursor.fetchall()]
+
+        results: List[List[Any]] = [[] for _ in pages]
+
+        async with self._reading() as conn:
+            for group in self._page_rounds(pages):
+                branch_for = {self._page_key(pages[i]): i for i in group}
+                # each page is wrapped in a derived table, since a limited
+                # select can't be a direct branch of a union everywhere.
+                branches: List[Any] = [
+                    self._page_statement(cols, pages[i]) for i in group
+                ]
+                stmt = union_all(*(select(branch.subquery()) for branch in branches))
+
+                cursor = await conn.execute(stmt)
+
+                for row in cursor.fetchall():
+                    key = tuple(getattr(row, col) for col in pages[group[0]].where)
+                    results[branch_for[key]].append(row)
+
+        # UNION ALL does not guarantee that branch ordering is kept
+        for spec, rows in zip(pages, results):
+            rows.sort(
+                key=lambda row: tuple(getattr(row, col) for col in spec.order_by),
+                reverse=spec.descending,
+            )
+
+        return results
+
+    def _page_statement(
+        self, cols: Sequence[Union[ColumnElement, str]], spec: PageSpec
+    ) -> Select:
+        missing = [col for col in spec.order_by if col not in self.table.c]
+        if missing:
+            raise ValueError(
+                f"Items in '{self.table.name}' cannot be ordered by: {', '.join(missing)}"
+            )
+
+        columns = [self.table.c[col] if isinstance(col, str) else col for col in cols]
+        order_cols = [self.table.c[col] for col in spec.order_by]
+
+        stmt = select(*(columns or self.columns))
+        stmt = self._visible(self._restrict_rows(stmt, spec.where))
+
+        if spec.after is not None:
+            stmt = stmt.where(self._keyset_after(order_cols, spec))
+
+        return stmt.order_by(
+            *(col.desc() if spec.descending else col for col in order_cols)
+        ).limit(spec.limit)
+
+    @staticmethod
+    def _keyset_after(order_cols: Sequence[Any], spec: PageSpec):
+        # (a, b) > (x, y) is expanded to `a > x OR (a = x AND b > y)`, which
+        # MySQL can resolve as a range scan on an (a, b) index.
+        assert spec.after is not None
+        clauses = []
+
+        for i, col in enumerate(order_cols):
+            value = spec.after[i]
+            beyond = col < value if spec.descending else col > value
+            clauses.append(
+                and_(*(c == v for c, v in zip(order_cols[:i], spec.after)), beyond)
+            )
+
+        return or_(*clauses)
+
+    @staticmethod
+    def _page_key(spec: PageSpec) -> Tuple[Any, ...]:
+        return tuple(spec.where.values())
+
+    @staticmethod
+    def _page_rounds(pages: Sequence[PageSpec]) -> List[List[int]]:
+        # Rows from a union are attributed to their page by the values of
+        # the `where` columns, so each query may only contain one page for
+        # a given set of values.
+        rounds: List[List[int]] = []
+        keys: List[set] = []
+
+        for i, spec in enumerate(pages):
+            key = ModelHelper._page_key(spec)
+            for group, group_keys in zip(rounds, keys):
+                if key not in group_keys:
+                    group.append(i)
+                    group_keys.add(key)
+                    break
+            else:
+                rounds.append([i])
+                keys.append({key})
 
-    async def _create(self, on_duplicate_key: dict = None, **values):
+        return rounds
+
+    async def create(
+        self,
+        on_duplicate_key: dict = None,
+        *,
+        idempotency_key: Optional[str] = None,
+        **values,
+    ):
+        return await InternalError.wrap(
+            self._create, on_duplicate_key, idempotency_key=idempotency_key, **values
+        )
+
+    async def _create(
+        self,
+        on_duplicate_key: dict = None,
+        *,
+        idempotency_key: Optional[str] = None,
+        **values,
+    ):
         """Generic database record creation function"""
-        async with self.engine.connect() as conn:
-            stmt = insert(self.table).values(**values)
+        async with self._writing() as conn:
+            if idempotency_key is not None:
+                if self.idempotency is None:
+                    raise ValueError(
+                        f"Items in '{self.table.name}' have no idempotency keys"
+                    )
+                created = await self.idempotency.find(
+                    conn, values[self.author_key], idempotency_key
+                )
+                if created is not None:
+                    return created
+
+            allocated = await self._allocate_ids(conn, 1)
+            if allocated:
+                values = {**values, "id": allocated[0]}
+            await self._lock_parents(conn, [values])
+
+            stmt: Insert = self.table.insert().values(**values)
 
             if on_duplicate_key:
-                stmt = stmt.on_duplicate_key_update(**on_duplicate_key)
+                updates = on_duplicate_key
+                stmt = upsert(
+                    conn,
+                    self.table,
+                    values,
+                    self._conflict_key(values),
+                    lambda _: updates,
+                )
+
+            if self.counter:
+                await self._count_upserts(conn, [values], [on_duplicate_key or {}])
 
             cursor = await conn.execute(stmt)
+            row_id = cast(int, cursor.lastrowid)
+
+            if on_duplicate_key and conn.dialect.name == "sqlite":
+                # SQLite doesn't report the id of a row that was updated
+                # rather than inserted.
+                [row_id] = await self._ids_by_unique_key(conn, [values])
+
+            if idempotency_key is not None:
+                assert self.idempotency
+                await self.idempotency.save(
+                    conn, values[self.author_key], idempotency_key, row_id
+                )
+
+            await conn.commit()
+            return row_id
+
+    async def create_many(
+        self, rows: Sequence[Dict[str, Any]], *, update_on_duplicate: Sequence[str] = ()
+    ):
+        return await InternalError.wrap(
+            self._create_many, rows, update_on_duplicate=update_on_duplicate
+        )
+
+    async def _create_many(
+        self, rows: Sequence[Dict[str, Any]], *, update_on_duplicate: Sequence[str] = ()
+    ) -> List[int]:
+        """
+        Insert all `rows` with a single multi-row INSERT, returning the id of
+        each row in order. Rows which collide with an existing row on a unique
+        key update the `update_on_duplicate` columns of that row instead, in
+        which case the id of the existing row is returned.
+        """
+        if not rows:
+            return []
+
+        async with self._writing() as conn:
+            allocated = await self._allocate_ids(conn, len(rows))
+            if allocated:
+                rows = [{**row, "id": row_id} for row, row_id in zip(rows, allocated)]
+            await self._lock_parents(conn, rows)
+
+            stmt: Insert = self.table.insert().values(list(rows))
+
+            if update_on_duplicate:
+                stmt = upsert(
+                    conn,
+                    self.table,
+                    list(rows),
+                    self._conflict_key(rows[0]),
+                    lambda inserted: {
+                        col: inserted[col] for col in update_on_duplicate
+                    },
+                )
+
+            if self.counter:
+                await self._count_upserts(
+                    conn,
+                    rows,
+                    [{col: row[col] for col in update_on_duplicate} for row in rows],
+                )
+
+            cursor = await conn.execute(stmt)
+
+            if update_on_duplicate:
+                ids = await self._ids_by_unique_key(conn, rows)
+            elif allocated:
+                ids = allocated
+            else:
+                # InnoDB allocates consecutive ids (`id_step` apart) to the
+                # rows of a single INSERT whose row count is known up front,
+                # and reports the first of them. SQLite, which holds the
+                # write lock for the statement, reports the last.
+                first_id = cast(int, cursor.lastrowid)
+                if conn.dialect.name == "sqlite":
+                    first_id -= len(rows) - 1
+                ids = [first_id + i * self.id_step for i in range(len(rows))]
+
             await conn.commit()
-            return cast(int, cursor.lastrowid)
+            return ids
+
+    async def _allocate_ids(self, conn: Any, count: int) -> Optional[List[int]]:
+        """
+        Allocate the ids of `count` new rows, `id_step` apart, or return
+        `None` to leave them to the database.
+        """
+        if self.id_step == 1 or conn.dialect.name == "mysql":
+            return None
+
+        if conn.dialect.name == "sqlite":
+            # take the write lock before reading the last id, so that no other
+            # connection can allocate the same ids until this one commits.
+            await conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+        cursor = await conn.execute(select(func.max(self.table.c["id"])))
+        last = cursor.scalar() or 0
+        first = last + 1 + (self.id_offset - last - 1) % self.id_step
+        return [first + i * self.id_step for i in range(count)]
+
+    async def _lock_parents(self, conn: Any, rows: Sequence[Dict[str, Any]]):
+        """
+        Raise a `ValueError` unless the parents of new `rows` exist and are
+        visible, and lock them until the rows are written, so that they
+        can't be deleted in between.
+        """
+        if not self.parent:
+            return
+
+        key, parent = self.parent
+        parent_ids = {row[key] for row in rows}
+        parent_id: Any = parent.table.c["id"]
+        stmt = parent._visible(select(parent_id).where(parent_id.in_(parent_ids)))
+
+        cursor = await conn.execute(stmt.with_for_update(read=True))
+        missing = parent_ids - set(cursor.scalars().all())
+        if missing:
+            raise ValueError(f"No {parent.table.name} with the ids {sorted(missing)}")
+
+    async def _ids_by_unique_key(
+        self, conn: Any, rows: Sequence[Dict[str, Any]]
+    ) -> List[int]:
+        # ids aren't reported for rows that were updated rather than inserted,
+        # so look every row up again by a unique key that the rows provide.
+        key_cols = self._unique_key(rows[0])
+        assert key_cols is not None
+        keys = [tuple(row[col] for col in key_cols) for row in rows]
+        key_columns: List[Any] = [self.table.c[col] for col in key_cols]
+
+        cursor = await conn.execute(
+            select(*[self.table.c["id"], *key_columns]).where(
+                tuple_(*key_columns).in_(set(keys))
+            )
+        )
+        id_for = {tuple(row[1:]): row[0] for row in cursor.fetchall()}
+        return [id_for[key] for key in keys]
+
+    def _unique_key(self, row: Dict[str, Any]) -> Optional[List[str]]:
+        """Return the columns of a unique key whose values `row` provides."""
+        return next(
+            (
+                [col.name for col in constraint.columns]
+                for constraint in self.table.constraints
+                if isinstance(constraint, UniqueConstraint)
+                and all(col.name in row for col in constraint.columns)
+            ),
+            None,
+        )
+
+    def _conflict_key(self, row: Dict[str, Any]) -> List[str]:
+        """
+        Return the columns of the unique key which an upsert of `row` may
+        collide on: one whose values `row` provides, or else the primary key.
+        """
+        return self._unique_key(row) or [col.name for col in self.table.primary_key]
+
+    async def _count_upserts(
+        self,
+        conn: Any,
+        rows: Sequence[Dict[str, Any]],
+        updates: Sequence[Dict[str, Any]],
+    ):
+        """
+        Update the counter for inserting `rows`, where each row that collides
+        with an existing row on a unique key updates that row with the values
+        in `updates` instead (possibly moving it to another count, e.g. when a
+        reaction changes type).
+
+        The existing rows are read, and locked, so this must come before the
+        insert, in the same transaction.
+        """
+        assert self.counter
+        key_cols = self._unique_key(rows[0]) if any(updates) else None
+        counted: Dict[Tuple[Any, ...], Tuple[Any, ...]] = {}
+
+        if key_cols:
+            key_columns: List[Any] = [self.table.c[col] for col in key_cols]
+            cursor = await conn.execute(
+                select(*key_columns, *(self.table.c[col] for col in self.counter.key))
+                .where(
+                    tuple_(*key_columns).in_(
+                        {tuple(row[col] for col in key_cols) for row in rows}
+                    )
+                )
+                .with_for_update()
+            )
+            counted = {
+                tuple(row[: len(key_cols)]): tuple(row[len(key_cols) :])
+                for row in cursor.fetchall()
+            }
+
+        moves = []
+
+        # rows are written in order, so a row may collide with an earlier one
+        for row, update in zip(rows, updates):
+            unique = tuple(row[col] for col in key_cols or ())
+            before = counted.get(unique) if key_cols else None
+            after = (
+                self.counter.key_of(row)
+                if before is None
+                else tuple(
+                    update.get(col, val) for col, val in zip(self.counter.key, before)
+                )
+            )
+            if key_cols:
+                counted[unique] = after
+            moves.append((before, after))
+
+        await self.counter.add(conn, Counter.changes(moves))
+
+    async def _count_edit(
+        self,
+        conn: Any,
+        item_id: int,
+        where: Optional[Dict[str, Any]],
+        values: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Update the counter for updating the item with `values` (or deleting it,
+        if `values` is `None`), if it matches `where`. The item is locked, so
+        this must come before the write, in the same transaction.
+        """
+        assert self.counter
+        if values is not None and not set(values) & set(self.counter.key):
+            return  # the item keeps its count
+
+        columns: List[Any] = [self.table.c[col] for col in self.counter.key]
+        stmt = select(*columns).where(self.table.c["id"] == item_id)
+        stmt = self._visible(self._restrict_rows(stmt, where))
+        cursor = await conn.execute(stmt.with_for_update())
+
+        moves = [
+            (
+                tuple(row),
+                None
+                if values is None
+                else tuple(
+                    values.get(col, val) for col, val in zip(self.counter.key, row)
+                ),
+            )
+            for row in cursor.fetchall()
+        ]
+        await self.counter.add(conn, Counter.changes(moves))
+
+    async def rebuild_counter(self, chunk_size: int = STREAM_CHUNK_SIZE) -> int:
+        """
+        Recount the counter from the rows of the model, `chunk_size` values of
+        its first key column (e.g. post ids) at a time, each in a transaction
+        of its own, so that concurrent writes are only held up by one chunk.
+        Returns the number of chunks recounted.
+        """
+        assert self.counter
+        first_key = self.counter.key[0]
+        bounds: List[int] = []
+
+        async with self.engine.connect() as conn:
+            for table in (self.table, self.counter.table):
+                column = table.c[first_key]
+                cursor = await conn.execute(select(func.min(column), func.max(column)))
+                bounds.extend(value for value in cursor.one() if value is not None)
+
+            if not bounds:
+                return 0
+
+            starts = range(min(bounds), max(bounds) + 1, chunk_size)
+            for start in starts:
+                for stmt in self.counter.recount(
+                    self.table, start, start + chunk_size - 1
+                ):
+                    await conn.execute(stmt)
+                await conn.commit()
+
+        return len(starts)
 
     async def update(self, item_id: int, *, where: Dict[str, Any] = None, **values):
         return await InternalError.wrap(self._update, item_id, where=where, **values)
 
     async def _update(self, item_id: int, *, where: Dict[str, Any] = None, **values):
         """Generic database record update function."""
-        print(values)
-        async with self.engine.connect() as conn:
+        async with self._writing() as conn:
+            if self.counter:
+                await self._count_edit(conn, item_id, where, values)
+
             stmt = (
                 self.table.update()
                 .where(self.table.c["id"] == item_id)
                 .values(**values)
             )
 
-            stmt = self._restrict_rows(stmt, where)
+            stmt = self._visible(self._restrict_rows(stmt, where))
 
             cursor = await conn.execute(stmt)
             await conn.commit()
@@ -69,10 +904,22 @@ class ModelHelper:
         return await InternalError.wrap(self._delete, item_id, where=where)
 
     async def _delete(self, item_id: int, *, where: Dict[str, Any] = None):
-        """Generic database item delete function"""
-        async with self.engine.connect() as conn:
-            stmt = self.table.delete().where(self.table.c["id"] == item_id)
-            stmt = self._restrict_rows(stmt, where)
+        """
+        Generic database item delete function. Items of a model with
+        `soft_delete` are only marked as deleted, and purged later.
+        """
+        async with self._writing() as conn:
+            if self.counter:
+                await self._count_edit(conn, item_id, where)
+
+            stmt: Any
+            if self.soft_delete:
+                stmt = self.table.update().values({self.soft_delete: func.now()})
+            else:
+                stmt = self.table.delete()
+
+            stmt = stmt.where(self.table.c["id"] == item_id)
+            stmt = self._visible(self._restrict_rows(stmt, where))
 
             cursor = await conn.execute(stmt)
             await conn.commit()
@@ -100,7 +947,7 @@ class ModelHelper:
             if hasattr(self.table.c, key):
                 stmt = stmt.where(
                     self.table.c[key].in_(val)
-                    if isinstance(val, (list, tuple))
+                    if isinstance(val, (list, tuple, Select))
                     else self.table.c[key] == val
                 )
 
@@ -0,0 +1,122 @@
+"""
+blog_app.core.model.pool - a database connection pool which keeps track of
+how it is being used, so that pool exhaustion and connection problems can be
+observed while the application is running.
+"""
+
+import bisect
+import threading
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool  # type: ignore
+
+
+# Upper bounds (in seconds) of the buckets that checkout wait times are
+# counted in. Waits longer than the last bound are counted in "+Inf".
+WAIT_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+
+class PoolMetrics:
+    """
+    Counters for a connection pool. Checkout wait times are recorded in a
+    histogram; `snapshot()` reports cumulative bucket counts, in the same way
+    as a Prometheus histogram.
+
+    >>> metrics = PoolMetrics()
+    >>> metrics.record_wait(0.003)
+    >>> metrics.record_wait(0.2)
+    >>> metrics.snapshot()["wait_time"]["buckets"]["0.005"]
+    1
+    >>> metrics.snapshot()["wait_time"]["count"]
+    2
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wait_counts: List[int] = [0] * (len(WAIT_TIME_BUCKETS) + 1)
+        self._wait_sum = 0.0
+        self.timeouts = 0
+        self.connect_failures = 0
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self._wait_counts[bisect.bisect_left(WAIT_TIME_BUCKETS, seconds)] += 1
+            self._wait_sum += seconds
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def record_connect_failure(self):
+        with self._lock:
+            self.connect_failures += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            buckets: Dict[str, int] = {}
+            total = 0
+
+            for bound, count in zip(
+                [*map(str, WAIT_TIME_BUCKETS), "+Inf"], self._wait_counts
+            ):
+                total += count
+                buckets[bound] = total
+
+            return {
+                "wait_time": {
+                    "buckets": buckets,
+                    "count": total,
+                    "sum": self._wait_sum,
+                },
+                "timeouts": self.timeouts,
+                "connect_failures": self.connect_failures,
+            }
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    The default pool for asyncio drivers, recording the time taken to check
+    out each connection, along with checkouts which time out or fail to
+    connect to the database.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def connect(self):
+        start = time.perf_counter()
+
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.record_timeout()
+            raise
+        except Exception:
+            self.metrics.record_connect_failure()
+            raise
+
+        self.metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        # disposing an engine replaces its pool; keep counting where we left off.
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the current state of the pool, along with its metrics."""
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            # the pool counts up to zero overflow while it fills its `size`.
+            "overflow": max(self.overflow(), 0),
+            **self.metrics.snapshot(),
+        }
+
+
+__all__ = ["InstrumentedPool", "PoolMetrics", "WAIT_TIME_BUCKETS"]
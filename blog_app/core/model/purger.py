@@ -0,0 +1,198 @@
+"""
+blog_app.core.model.purger - removes soft deleted rows, along with the rows
+nested beneath them, in the background.
+"""
+
+import asyncio
+import contextlib
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.sql import func, select
+from sqlalchemy.sql.selectable import Select
+
+from .dialects import claim
+from .model_helper import ModelHelper
+
+
+class Purger:
+    """
+    Purges the rows of `model` which are soft deleted, along with the rows
+    nested beneath each of them. Each model in `nested` refers to the one
+    before it (the first, to `model`) by a key column, e.g. comments by
+    `("post_id", comments)`, then reactions by `("comment_id", reactions)`.
+
+    The nested rows are deleted deepest first, `chunk_size` rows to a
+    transaction, so that no transaction locks many rows at once. Once they
+    are gone, deleting the soft deleted row itself has nothing left to
+    cascade to. Counters of the nested rows aren't updated as they go, as
+    their counts are only read for rows that aren't hidden, and are removed
+    by the final cascade.
+
+    Started with `start()`, it purges every `interval` seconds, until
+    `close()`. Every process of the app runs one, so each row is claimed
+    before it's purged (see `claim`), and rows claimed by another process
+    are left to it.
+    """
+
+    def __init__(
+        self,
+        model: ModelHelper,
+        nested: Sequence[Tuple[str, ModelHelper]],
+        *,
+        chunk_size: int = 500,
+        interval: float = 10.0,
+    ):
+        assert model.soft_delete
+        self.model = model
+        self.deleted = model.table.c[model.soft_delete]
+        self.nested = nested
+        self.chunk_size = chunk_size
+        self.interval = interval
+        # soft deleted rows left to purge, as of the last check
+        self.pending = 0
+        # the row being purged, if any
+        self.purging: Optional[int] = None
+        # rows deleted so far, by table
+        self.purged: Dict[str, int] = {
+            nested_model.table.name: 0
+            for nested_model in [model, *(m for _, m in nested)]
+        }
+        self._task: Optional["asyncio.Future[None]"] = None
+
+    def progress(self) -> Dict[str, Any]:
+        """Report the rows left to purge, and those purged so far."""
+        return {
+            "pending": self.pending,
+            "purging": self.purging,
+            "purged": dict(self.purged),
+        }
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    async def close(self):
+        """Stop purging; a row left part way is finished by the next purge."""
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.purge()
+            except Exception:
+                logging.exception("Purging deleted rows failed.")
+
+            await asyncio.sleep(self.interval)
+
+    async def purge(self) -> int:
+        """Purge every soft deleted row, returning the number purged."""
+        table = self.model.table
+        deleted = self.deleted
+        columns: List[Any] = [table.c["id"]]
+        purged = 0
+
+        while True:
+            async with self.model.engine.connect() as conn:
+                cursor = await conn.execute(
+                    select(func.count()).select_from(table).where(deleted.isnot(None))
+                )
+                self.pending = cursor.scalar()
+                cursor = await conn.execute(
+                    select(*columns)
+                    .where(deleted.isnot(None))
+                    .order_by(deleted)
+                    .limit(self.chunk_size)
+                )
+                ids = cursor.scalars().all()
+
+            claimed = 0
+            for row_id in ids:
+                if await self._purge_row(row_id):
+                    self.pending -= 1
+                    claimed += 1
+
+            # the rows left are being purged by other processes
+            if not claimed:
+                return purged
+            purged += claimed
+
+    async def _purge_row(self, row_id: int) -> bool:
+        """Purge the row `row_id`, unless another process is purging it."""
+        self.purging = row_id
+        counts: List[str] = []
+
+        try:
+            async with self.model.engine.connect() as conn, claim(
+                conn, f"purge:{self.model.table.name}:{row_id}"
+            ) as claimed:
+                if not claimed:
+                    return False
+
+                for depth in reversed(range(len(self.nested))):
+                    model = self.nested[depth][1]
+                    count = await self._delete_nested(conn, depth, row_id)
+                    counts.append(f"{count} {model.table.name} rows")
+
+                table = self.model.table
+                cursor = await conn.execute(
+                    table.delete()
+                    .where(table.c["id"] == row_id)
+                    .where(self.deleted.isnot(None))
+                )
+                await conn.commit()
+                self.purged[table.name] += cursor.rowcount
+        finally:
+            self.purging = None
+
+        logging.info(
+            "Purged %s %s, with %s.",
+            self.model.table.name,
+            row_id,
+            ", ".join(counts) or "nothing nested",
+        )
+        return True
+
+    async def _delete_nested(self, conn: Any, depth: int, row_id: int) -> int:
+        table = self.nested[depth][1].table
+        deleted = 0
+
+        while True:
+            cursor = await conn.execute(
+                select_nested(self.nested, depth, row_id).limit(self.chunk_size)
+            )
+            ids = cursor.scalars().all()
+            if not ids:
+                return deleted
+
+            await conn.execute(table.delete().where(table.c["id"].in_(ids)))
+            await conn.commit()
+            deleted += len(ids)
+            self.purged[table.name] += len(ids)
+
+
+def select_nested(
+    nested: Sequence[Tuple[str, ModelHelper]],
+    depth: int,
+    row_id: int,
+    columns: Sequence[Any] = ("id",),
+) -> Select:
+    """
+    Return a statement selecting `columns` of the rows of `nested[depth]`
+    beneath the row `row_id` of the model which `nested[0]` refers to.
+    """
+    key, model = nested[depth]
+    selected: List[Any] = [model.table.c[col] for col in columns]
+    parent = row_id if depth == 0 else select_nested(nested, depth - 1, row_id)
+
+    return select(*selected).where(
+        model.table.c[key].in_(parent)
+        if isinstance(parent, Select)
+        else model.table.c[key] == parent
+    )
+
+
+__all__ = ["Purger", "select_nested"]
@@ -0,0 +1,76 @@
+"""
+blog_app.core.model.router - choose between the primary database and its
+read replicas.
+"""
+
+import itertools
+import time
+from typing import Any, Dict, Hashable, Optional, Sequence
+
+
+class EngineRouter:
+    """
+    Sends writes to the primary engine, and spreads reads across the replica
+    engines, if there are any, picking the replica with the fewest connections
+    checked out (taking turns between equally busy replicas).
+
+    Replicas lag behind the primary, so a client that has just written
+    (identified by a `sticky_key`) reads from the primary for the following
+    `sticky_window` seconds, and sees its own writes.
+    """
+
+    def __init__(
+        self,
+        primary: Any,
+        replicas: Sequence[Any] = (),
+        *,
+        sticky_window: float = 5.0,
+    ):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.sticky_window = sticky_window
+        self._turns = itertools.count()
+        self._last_write: Dict[Hashable, float] = {}
+        self._prune_at = 1000
+
+    def reader(self, sticky_key: Optional[Hashable] = None) -> Any:
+        """Return the engine to read from."""
+        if not self.replicas or self._is_sticky(sticky_key):
+            return self.primary
+
+        turn = next(self._turns)
+        replicas = self.replicas[turn % len(self.replicas) :]
+        replicas += self.replicas[: turn % len(self.replicas)]
+
+        return min(replicas, key=lambda engine: engine.sync_engine.pool.checkedout())
+
+    def wrote(self, sticky_key: Optional[Hashable] = None):
+        """Record that the client with `sticky_key` has written to the primary."""
+        if sticky_key is None or not self.replicas:
+            return
+
+        now = time.monotonic()
+        self._last_write[sticky_key] = now
+
+        # forget clients whose window has passed, now and then.
+        if len(self._last_write) >= self._prune_at:
+            self._last_write = {
+                key: at
+                for key, at in self._last_write.items()
+                if now - at < self.sticky_window
+            }
+            self._prune_at = max(1000, 2 * len(self._last_write))
+
+    def _is_sticky(self, sticky_key: Optional[Hashable]) -> bool:
+        last_write = self._last_write.get(sticky_key) if sticky_key else None
+        return (
+            last_write is not None
+            and time.monotonic() - last_write < self.sticky_window
+        )
+
+    async def dispose(self):
+        for engine in [self.primary, *self.replicas]:
+            await engine.dispose()
+
+
+__all__ = ["EngineRouter"]
@@ -0,0 +1,129 @@
+"""
+blog_app.core.model.session - a database connection shared by everything
+that runs while handling a single request.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Hashable, Optional
+
+from .router import EngineRouter
+from .stats import SqlStats
+
+
+class RequestSession:
+    """
+    Lazily checks out a single connection from the pool the first time that
+    a request touches the database, and holds it until `close()` is called.
+
+    Reads run in one read-only transaction, so that every query made while
+    resolving a response sees the same consistent snapshot of the database.
+    A write ends the read transaction and runs in a transaction of its own;
+    reads that follow start a new snapshot, which includes the write.
+
+    Reads are made from the engine that `router` picks for the client with
+    `sticky_key`. A write swaps the connection for one to the primary, which
+    is then kept for the rest of the request.
+
+    Resolvers run concurrently, but a connection can only run one statement
+    at a time, so use of the connection is serialized.
+
+    With `stats`, the statements run on the connection are tallied there.
+    """
+
+    def __init__(
+        self,
+        router: EngineRouter,
+        sticky_key: Optional[Hashable] = None,
+        stats: Optional[SqlStats] = None,
+    ):
+        self.router = router
+        self.sticky_key = sticky_key
+        self.stats = stats
+        self._conn: Optional[Any] = None
+        self._engine: Any = None
+        self._reading = False
+        self._lock = asyncio.Lock()
+
+    async def _connection(self, engine: Any) -> Any:
+        if self._conn is not None and self._engine is not engine:
+            await self._release()
+
+        if self._conn is None:
+            self._conn = await engine.connect().start()
+            self._engine = engine
+
+        return self._conn
+
+    async def _release(self):
+        if self._conn is not None:
+            conn, self._conn, self._engine = self._conn, None, None
+            self._reading = False
+            # closing rolls back the read transaction, which wrote nothing.
+            await conn.close()
+
+    async def _begin_read(self, conn: Any):
+        if self._engine.dialect.name == "mysql":
+            # the connection is not in autocommit mode, so this replaces the
+            # transaction that the driver would otherwise start implicitly.
+            await conn.exec_driver_sql(
+                "START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY"
+            )
+        self._reading = True
+
+    async def _end_read(self, conn: Any):
+        if self._reading:
+            await conn.rollback()
+            self._reading = False
+
+    def _tracked(self, conn: Any) -> Any:
+        return self.stats.track(conn) if self.stats else conn
+
+    @asynccontextmanager
+    async def read(self) -> AsyncIterator[Any]:
+        """Use the connection within the request's read transaction."""
+        async with self._lock:
+            # after a write, keep reading from the primary.
+            conn = await self._connection(
+                self._engine or self.router.reader(self.sticky_key)
+            )
+            if not self._reading:
+                await self._begin_read(conn)
+            yield self._tracked(conn)
+
+    @asynccontextmanager
+    async def write(self) -> AsyncIterator[Any]:
+        """
+        Use the connection for a write, which should be committed before
+        leaving the block. It is rolled back if an exception is raised.
+        """
+        async with self._lock:
+            conn = await self._connection(self.router.primary)
+            await self._end_read(conn)
+
+            try:
+                yield self._tracked(conn)
+            except BaseException:
+                await conn.rollback()
+                raise
+
+            self.router.wrote(self.sticky_key)
+
+    async def wrote_elsewhere(self):
+        """
+        Note a write made for the request on another connection (see
+        `WriteCoalescer`): reads that follow see it, from the primary.
+        """
+        async with self._lock:
+            self.router.wrote(self.sticky_key)
+            if self._reading:
+                # the read snapshot was taken before the write
+                await self._release()
+
+    async def close(self):
+        """Return the connection to the pool, if one was checked out."""
+        async with self._lock:
+            await self._release()
+
+
+__all__ = ["RequestSession"]
@@ -0,0 +1,427 @@
+"""
+blog_app.core.model.shards - spreads posts, with their comments and
+reactions, over several databases.
+"""
+
+import asyncio
+import copy
+import heapq
+import zlib
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from sqlalchemy import event, select
+from sqlalchemy.sql import ColumnElement
+from sqlalchemy.sql.selectable import Select
+
+from blog_app.core.result import Result
+from blog_app.core.types import InternalError
+from .model_helper import STREAM_CHUNK_SIZE, ModelHelper, PageSpec
+from .purger import Purger
+from .router import EngineRouter
+from .session import RequestSession
+from .stats import SqlStats
+
+
+class ShardIds(NamedTuple):
+    """
+    The ids of sharded rows, which say which shard holds them: shard `k` (of
+    `shards`) gives its rows the ids `k + 1`, `k + 1 + slots`, and so on.
+    Comments are kept with their post, and reactions with their comment, so
+    the shard of any row is read from its id or its parent's.
+
+    `slots` is the most shards there can be, and can't change once rows are
+    written; shards can be added until there are that many.
+
+    >>> ids = ShardIds(shards=2, slots=4)
+    >>> [ids.shard_of(item_id) for item_id in (1, 2, 5, 6, 7)]
+    [0, 1, 0, 1, None]
+    """
+
+    shards: int
+    slots: int
+
+    def shard_of(self, item_id: int) -> Optional[int]:
+        """The shard holding `item_id`, or `None` if there's no such shard."""
+        shard = (item_id - 1) % self.slots
+        return shard if shard < self.shards else None
+
+    def configure(self, engine: Any, shard: int):
+        """
+        Have a MySQL `engine`, of `shard`, give new rows the shard's ids.
+        Other databases can't, so the models allocate ids for them.
+        """
+        if engine.dialect.name != "mysql":
+            return
+
+        def set_ids(dbapi_connection: Any, connection_record: Any):
+            cursor = dbapi_connection.cursor()
+            cursor.execute(
+                f"SET SESSION auto_increment_increment = {self.slots},"
+                f" auto_increment_offset = {shard + 1}"
+            )
+            cursor.close()
+
+        event.listen(engine.sync_engine, "connect", set_ids)
+
+
+class ShardedSession:
+    """A `RequestSession` on each shard, for the models of a request."""
+
+    def __init__(
+        self,
+        routers: Sequence[EngineRouter],
+        sticky_key: Optional[Hashable] = None,
+        stats: Optional[SqlStats] = None,
+    ):
+        self.shards = [RequestSession(router, sticky_key, stats) for router in routers]
+
+    async def wrote_elsewhere(self):
+        await asyncio.gather(*(session.wrote_elsewhere() for session in self.shards))
+
+    async def close(self):
+        await asyncio.gather(*(session.close() for session in self.shards))
+
+
+class ShardedModel(ModelHelper):
+    """
+    A model whose rows are spread over `shards`, a model for each shard, by
+    their ids (see `ShardIds`). New rows are placed by their `route_by`
+    column: the id of their parent (e.g. `post_id`), or for top level rows
+    (`route_by="id"`), a hash of their author, so that a retried create
+    lands on the same shard as the first attempt.
+
+    Queries filtered by id, or by the `route_by` column, go to the shards
+    which hold those ids, with each shard's share of a list of ids. Other
+    queries go to every shard. Shards are queried concurrently, and their
+    rows are merged: rows are merged by id, pages and search results in
+    their order, and counts of the same group are added up.
+
+    Writes of several rows are made on each shard in a transaction of its
+    own, so they may be partly made if one shard fails.
+    """
+
+    def __init__(self, shards: Sequence[ModelHelper], ids: ShardIds, route_by: str):
+        # the schema and options of the model, which are the same on every
+        # shard; statements built from them run on any of them.
+        self.__dict__.update(vars(shards[0]))
+        self.shards = list(shards)
+        self.ids = ids
+        self.route_by = route_by
+
+    def bind(self, session: Union[RequestSession, ShardedSession]) -> "ShardedModel":
+        assert isinstance(session, ShardedSession)
+        bound = copy.copy(self)
+        bound.shards = [
+            shard.bind(shard_session)
+            for shard, shard_session in zip(self.shards, session.shards)
+        ]
+        return bound
+
+    def _split(self, where: Dict[str, Any]) -> Dict[int, Dict[str, Any]]:
+        """Return the filter for each shard which may hold rows matching `where`."""
+        key = next(
+            (
+                key
+                for key in ("id", self.route_by)
+                if where.get(key) is not None and not isinstance(where[key], Select)
+            ),
+            None,
+        )
+        if key is None:
+            return {shard: where for shard in range(len(self.shards))}
+
+        values = where[key]
+        if not isinstance(values, (list, tuple)):
+            shard = self.ids.shard_of(values)
+            return {} if shard is None else {shard: where}
+
+        split: Dict[int, List[Any]] = {}
+        for value in values:
+            shard = self.ids.shard_of(value)
+            if shard is not None:
+                split.setdefault(shard, []).append(value)
+
+        return {shard: {**where, key: ids} for shard, ids in split.items()}
+
+    async def _fan_out(
+        self,
+        where: Dict[str, Any],
+        query: Callable[[ModelHelper, Dict[str, Any]], Awaitable[Any]],
+    ) -> List[Any]:
+        split = self._split(where)
+        return await asyncio.gather(
+            *(
+                query(self.shards[shard], shard_where)
+                for shard, shard_where in split.items()
+            )
+        )
+
+    def _placement(self, values: Dict[str, Any]) -> Optional[int]:
+        """The shard for a new row with `values`."""
+        if self.route_by == "id":
+            author = str(values[self.author_key]).encode()
+            return zlib.crc32(author) % len(self.shards)
+
+        return self.ids.shard_of(values[self.route_by])
+
+    async def load_all(self, *cols: Union[ColumnElement, str], **where):
+        results = await self._fan_out(
+            where, lambda model, where: model.load_all(*cols, **where)
+        )
+        names = [col if isinstance(col, str) else str(col.key) for col in cols]
+        if names and "id" not in names:
+            return [row for rows in results for row in rows]
+
+        # each shard's rows are in id order
+        return list(heapq.merge(*results, key=lambda row: row.id))
+
+    async def count_all(self, *group_by: str, **where):
+        results = await self._fan_out(
+            where, lambda model, where: model.count_all(*group_by, **where)
+        )
+        counts: Dict[Tuple[Any, ...], int] = {}
+
+        for rows in results:
+            for *group, count in rows:
+                counts[tuple(group)] = counts.get(tuple(group), 0) + count
+
+        return [(*group, count) for group, count in counts.items()]
+
+    async def stream_all(
+        self,
+        *cols: Union[ColumnElement, str],
+        chunk_size: int = STREAM_CHUNK_SIZE,
+        **where,
+    ) -> AsyncIterator[Any]:
+        # one shard at a time, so only one cursor is open
+        for shard, shard_where in self._split(where).items():
+            async for row in self.shards[shard].stream_all(
+                *cols, chunk_size=chunk_size, **shard_where
+            ):
+                yield row
+
+    async def load_matches(self, query: str, *, after=None, limit: int):
+        results = await self._fan_out(
+            {},
+            lambda model, _: model.load_matches(query, after=after, limit=limit),
+        )
+        rows = [row for rows in results for row in rows]
+        rows.sort(key=lambda row: (-row.score, row.id))
+        return rows[:limit]
+
+    async def load_pages(
+        self, *cols: Union[ColumnElement, str], pages: Sequence[PageSpec]
+    ) -> List[List[Any]]:
+        # the pages (by their index) loaded from each shard
+        by_shard: Dict[int, List[int]] = {}
+        for i, spec in enumerate(pages):
+            for shard in self._split(spec.where):
+                by_shard.setdefault(shard, []).append(i)
+
+        results = await asyncio.gather(
+            *(
+                self.shards[shard].load_pages(*cols, pages=[pages[i] for i in indexes])
+                for shard, indexes in by_shard.items()
+            )
+        )
+        merged: List[List[Any]] = [[] for _ in pages]
+
+        for indexes, shard_pages in zip(by_shard.values(), results):
+            for i, rows in zip(indexes, shard_pages):
+                merged[i].extend(rows)
+
+        # each shard's rows are in order, but are merged into one page
+        for spec, rows in zip(pages, merged):
+            rows.sort(
+                key=lambda row: tuple(getattr(row, col) for col in spec.order_by),
+                reverse=spec.descending,
+            )
+            del rows[spec.limit :]
+
+        return merged
+
+    async def create(
+        self,
+        on_duplicate_key: dict = None,
+        *,
+        idempotency_key: Optional[str] = None,
+        **values,
+    ):
+        shard = self._placement(values)
+        if shard is None:
+            return Result(error=InternalError(ValueError(f"No shard for {values}")))
+
+        return await self.shards[shard].create(
+            on_duplicate_key, idempotency_key=idempotency_key, **values
+        )
+
+    async def create_many(
+        self, rows: Sequence[Dict[str, Any]], *, update_on_duplicate: Sequence[str] = ()
+    ):
+        # the rows (by their index) created on each shard
+        by_shard: Dict[int, List[int]] = {}
+        for i, row in enumerate(rows):
+            shard = self._placement(row)
+            if shard is None:
+                return Result(error=InternalError(ValueError(f"No shard for {row}")))
+            by_shard.setdefault(shard, []).append(i)
+
+        results = await asyncio.gather(
+            *(
+                self.shards[shard].create_many(
+                    [rows[i] for i in indexes],
+                    update_on_duplicate=update_on_duplicate,
+                )
+                for shard, indexes in by_shard.items()
+            )
+        )
+        ids = [0] * len(rows)
+
+        for indexes, result in zip(by_shard.values(), results):
+            if result.is_failed:
+                return result
+            for i, item_id in zip(indexes, result.collapse()):
+                ids[i] = item_id
+
+        return Result(value=ids)
+
+    async def update(self, item_id: int, *, where: Dict[str, Any] = None, **values):
+        shard = self.ids.shard_of(item_id)
+        if shard is None:
+            return Result(value=0)
+
+        return await self.shards[shard].update(item_id, where=where, **values)
+
+    async def delete(self, item_id: int, *, where: Dict[str, Any] = None):
+        shard = self.ids.shard_of(item_id)
+        if shard is None:
+            return Result(value=0)
+
+        return await self.shards[shard].delete(item_id, where=where)
+
+    async def misplaced_ids(self, sample: Optional[int] = None) -> Dict[int, int]:
+        """
+        Return an id of a row on each shard which doesn't belong there by its
+        id, e.g. of a row written before the database was sharded, by shard.
+        Such rows would be looked for on another shard, and not be found.
+
+        Every row is checked, which scans the whole table, unless `sample` is
+        given: then only the `sample` lowest and highest ids of each shard
+        are, as read from the primary key. Rows written before the database
+        was sharded have the lowest ids, and those of a misconfigured shard
+        the highest.
+        """
+
+        async def find(shard: int) -> Optional[int]:
+            model = self.shards[shard]
+            id_column: Any = model.table.c["id"]
+            sources: List[Any] = [model.table]
+            if sample is not None:
+                ends: List[Any] = [
+                    select(id_column).order_by(order).limit(sample)
+                    for order in (id_column, id_column.desc())
+                ]
+                sources = [end.subquery() for end in ends]
+
+            async with model._reading() as conn:
+                for source in sources:
+                    ids = source.c["id"]
+                    cursor = await conn.execute(
+                        select(ids)
+                        .where((ids - (shard + 1)) % self.ids.slots != 0)
+                        .limit(1)
+                    )
+                    item_id = cursor.scalar()
+                    if item_id is not None:
+                        return item_id
+            return None
+
+        found = await asyncio.gather(
+            *(find(shard) for shard in range(len(self.shards)))
+        )
+        return {
+            shard: item_id for shard, item_id in enumerate(found) if item_id is not None
+        }
+
+    async def rebuild_counter(self, chunk_size: int = STREAM_CHUNK_SIZE) -> int:
+        chunks = 0
+        for shard in self.shards:
+            chunks += await shard.rebuild_counter(chunk_size)
+        return chunks
+
+
+class ShardedPurger:
+    """Runs a `Purger` on each shard, and reports on them together."""
+
+    def __init__(self, purgers: Sequence[Purger]):
+        self.purgers = list(purgers)
+
+    @property
+    def purged(self) -> Dict[str, int]:
+        purged: Dict[str, int] = {}
+        for purger in self.purgers:
+            for table, count in purger.purged.items():
+                purged[table] = purged.get(table, 0) + count
+        return purged
+
+    def progress(self) -> Dict[str, Any]:
+        progresses = [purger.progress() for purger in self.purgers]
+        return {
+            "pending": sum(progress["pending"] for progress in progresses),
+            "purging": next(
+                (p["purging"] for p in progresses if p["purging"] is not None), None
+            ),
+            "purged": self.purged,
+        }
+
+    def start(self):
+        for purger in self.purgers:
+            purger.start()
+
+    async def close(self):
+        await asyncio.gather(*(purger.close() for purger in self.purgers))
+
+    async def purge(self) -> int:
+        purged = await asyncio.gather(*(purger.purge() for purger in self.purgers))
+        return sum(purged)
+
+
+def routers_of(model: ModelHelper) -> List[EngineRouter]:
+    """The routers of the databases holding the rows of `model`."""
+    if isinstance(model, ShardedModel):
+        return [shard.router for shard in model.shards]
+    return [model.router]
+
+
+def open_session(
+    model: ModelHelper,
+    sticky_key: Optional[Hashable] = None,
+    stats: Optional[SqlStats] = None,
+) -> Union[RequestSession, ShardedSession]:
+    """Return a session for a request, on the databases of `model`."""
+    if isinstance(model, ShardedModel):
+        return ShardedSession(routers_of(model), sticky_key, stats)
+    return RequestSession(model.router, sticky_key, stats)
+
+
+__all__ = [
+    "ShardIds",
+    "ShardedModel",
+    "ShardedPurger",
+    "ShardedSession",
+    "open_session",
+    "routers_of",
+]
@@ -0,0 +1,175 @@
+"""
+blog_app.core.model.slow_queries - logs the statements which take longer
+than a threshold, with the GraphQL operation that ran them, and captures the
+query plans of a sample of them.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import random
+import re
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import event
+
+
+# the name of the GraphQL operation being executed, if any.
+current_operation: ContextVar[Optional[str]] = ContextVar(
+    "current_operation", default=None
+)
+
+# lists of parameters, as bound to an IN (or VALUES) list
+_PLACEHOLDER_LIST = re.compile(r"\((?:%s|\?)(?:, (?:%s|\?))+\)")
+
+_EXPLAINABLE = {"SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE"}
+
+
+def statement_template(statement: str) -> str:
+    """
+    The statement with its whitespace collapsed and its lists of
+    placeholders shortened, so that statements which differ only in the
+    length of a list share a template.
+
+    >>> statement_template("SELECT id FROM post\\nWHERE id IN (%s, %s, %s)")
+    'SELECT id FROM post WHERE id IN (%s, ...)'
+    """
+    statement = " ".join(statement.split())
+    return _PLACEHOLDER_LIST.sub(
+        lambda match: "(%s, ...)" % match.group(0)[1:-1].split(", ")[0], statement
+    )
+
+
+def parameter_shape(parameters: Any, executemany: bool = False) -> str:
+    """
+    The types of the `parameters` of a statement, without their values,
+    with runs of the same type counted.
+
+    >>> parameter_shape((1, 2, 3, "a", None))
+    'int*3, str, NoneType'
+    >>> parameter_shape([(1, "a"), (2, "b")], executemany=True)
+    '2 x (int, str)'
+    """
+    if executemany:
+        first = parameter_shape(parameters[0]) if parameters else ""
+        return f"{len(parameters)} x ({first})"
+
+    if isinstance(parameters, dict):
+        return ", ".join(
+            f"{name}: {type(value).__name__}" for name, value in parameters.items()
+        )
+
+    runs = itertools.groupby(type(value).__name__ for value in parameters or ())
+    return ", ".join(
+        name if count == 1 else f"{name}*{count}"
+        for name, count in ((name, len(list(group))) for name, group in runs)
+    )
+
+
+class SlowQueryLog:
+    """
+    Logs each statement run by the engines it's attached to which takes
+    longer than `threshold` seconds: its template, the shape of its
+    parameters, its duration and the GraphQL operation that ran it.
+
+    A fraction, `explain_rate`, of the slow statements also have their plan
+    explained (`EXPLAIN FORMAT=JSON` on MySQL), on a connection of their
+    own, in the background. The plans are written to the `explain_file` as
+    JSON lines, which is rotated when it reaches `max_bytes`, keeping
+    `backups` old files.
+    """
+
+    def __init__(
+        self,
+        threshold: float,
+        *,
+        explain_rate: float = 0.0,
+        explain_file: Optional[str] = None,
+        max_bytes: int = 10 * 1024 * 1024,
+        backups: int = 5,
+    ):
+        self.threshold = threshold
+        self.explain_rate = explain_rate if explain_file else 0.0
+        self._tasks: Set[asyncio.Task] = set()
+        self._plans = logging.getLogger(f"{__name__}.plans")
+        self._plans.propagate = False
+
+        if self.explain_rate:
+            self._plans.setLevel(logging.INFO)
+            path = os.path.abspath(str(explain_file))
+            # each app (and CLI command) creates its own log, for the same file
+            if all(
+                getattr(handler, "baseFilename", None) != path
+                for handler in self._plans.handlers
+            ):
+                self._plans.addHandler(
+                    logging.handlers.RotatingFileHandler(
+                        path, maxBytes=max_bytes, backupCount=backups
+                    )
+                )
+
+    def attach(self, engine: Any):
+        """Watch the statements run by an (asynchronous) `engine`."""
+
+        def before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+        def after(conn, cursor, statement, parameters, context, executemany):
+            duration = time.perf_counter() - conn.info["slow_query_start"].pop()
+            if duration >= self.threshold:
+                self.record(engine, statement, parameters, executemany, duration)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", before)
+        event.listen(engine.sync_engine, "after_cursor_execute", after)
+
+    def record(
+        self,
+        engine: Any,
+        statement: str,
+        parameters: Any,
+        executemany: bool,
+        duration: float,
+    ):
+        record = {
+            "operation": current_operation.get(),
+            "duration_ms": round(duration * 1000, 3),
+            "statement": statement_template(statement),
+            "parameters": parameter_shape(parameters, executemany),
+        }
+        logging.warning("Slow query: %s", json.dumps(record))
+
+        if (
+            not executemany
+            and statement.split(None, 1)[0].upper() in _EXPLAINABLE
+            and random.random() < self.explain_rate
+        ):
+            task = asyncio.get_event_loop().create_task(
+                self._explain(engine, record, statement, parameters)
+            )
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _explain(
+        self, engine: Any, record: Dict[str, Any], statement: str, parameters: Any
+    ):
+        mysql = engine.dialect.name == "mysql"
+        prefix = "EXPLAIN FORMAT=JSON " if mysql else "EXPLAIN QUERY PLAN "
+
+        try:
+            async with engine.connect() as conn:
+                result = await conn.exec_driver_sql(prefix + statement, parameters)
+                rows = result.fetchall()
+        except Exception as error:
+            logging.warning("Couldn't explain a slow query: %s", error)
+            return
+
+        plan: Any = json.loads(rows[0][0]) if mysql else [row[-1] for row in rows]
+        self._plans.info(json.dumps({**record, "plan": plan}))
+
+
+__all__ = ["SlowQueryLog", "current_operation", "parameter_shape", "statement_template"]
@@ -0,0 +1,250 @@
+"""
+blog_app.core.model.sqlite - an asyncio SQLite dialect, for running the app
+on an embedded database file rather than a MySQL server.
+
+SQLAlchemy (as pinned) has no asyncio driver for SQLite, so this adapts
+`aiosqlite` to the DBAPI that the `pysqlite` dialect expects, in the same
+way as SQLAlchemy's own `aiomysql` dialect. Importing this module registers
+the dialect, for URLs of the form `sqlite+aiosqlite:///path/to/blog.db`.
+
+Each connection is tuned with `PRAGMAS` when it's opened: the database is
+kept in WAL mode, so that readers don't block the writer (or each other),
+and foreign keys are enforced, so that deletes cascade as they do on MySQL.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import util
+from sqlalchemy.dialects import registry
+from sqlalchemy.dialects.sqlite.base import SQLiteExecutionContext
+from sqlalchemy.dialects.sqlite.pysqlite import SQLiteDialect_pysqlite
+from sqlalchemy.pool import (  # type: ignore
+    AsyncAdaptedQueuePool,
+    FallbackAsyncAdaptedQueuePool,
+)
+from sqlalchemy.util.concurrency import await_fallback, await_only  # type: ignore
+
+
+PRAGMAS: Dict[str, Any] = {
+    # readers see the last commit while a write is in progress, and commits
+    # append to the log rather than rewriting pages in place.
+    "journal_mode": "WAL",
+    # in WAL mode, a crash can lose the last commits but not corrupt the file.
+    "synchronous": "NORMAL",
+    "foreign_keys": "ON",
+    # wait for the write lock (in milliseconds) rather than failing at once.
+    "busy_timeout": 5000,
+    # a 64MB page cache (negative sizes are in KB), and 256MB memory mapped.
+    "cache_size": -64000,
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+
+
+class AsyncAdapt_aiosqlite_cursor:
+    server_side = False
+
+    def __init__(self, adapt_connection: "AsyncAdapt_aiosqlite_connection"):
+        self._adapt_connection = adapt_connection
+        self._connection = adapt_connection._connection
+        self.await_ = adapt_connection.await_
+        self._cursor: Any = None
+        self._rows: List[Any] = []
+        self.arraysize = 1
+        self.description: Any = None
+        self.rowcount = -1
+        self.lastrowid: Optional[int] = None
+
+    def close(self):
+        self._rows[:] = []
+
+    def execute(self, operation, parameters=None):
+        cursor = self.await_(self._connection.cursor())
+
+        if parameters is None:
+            self.await_(cursor.execute(operation))
+        else:
+            self.await_(cursor.execute(operation, parameters))
+
+        self.description = cursor.description
+        self.rowcount = cursor.rowcount
+        self.lastrowid = cursor.lastrowid
+
+        if self.server_side and cursor.description:
+            self._cursor = cursor
+        else:
+            if cursor.description:
+                self._rows = list(self.await_(cursor.fetchall()))
+            self.await_(cursor.close())
+
+    def executemany(self, operation, seq_of_parameters):
+        cursor = self.await_(self._connection.cursor())
+        self.await_(cursor.executemany(operation, seq_of_parameters))
+        self.description = None
+        self.rowcount = cursor.rowcount
+        self.lastrowid = cursor.lastrowid
+        self.await_(cursor.close())
+
+    def setinputsizes(self, *inputsizes):
+        pass
+
+    def __iter__(self):
+        while self._rows:
+            yield self._rows.pop(0)
+
+    def fetchone(self):
+        if self._rows:
+            return self._rows.pop(0)
+        else:
+            return None
+
+    def fetchmany(self, size=None):
+        if size is None:
+            size = self.arraysize
+
+        retval = self._rows[0:size]
+        self._rows[:] = self._rows[size:]
+        return retval
+
+    def fetchall(self):
+        retval = self._rows[:]
+        self._rows[:] = []
+        return retval
+
+
+class AsyncAdapt_aiosqlite_ss_cursor(AsyncAdapt_aiosqlite_cursor):
+    """A cursor which fetches its rows as they're asked for."""
+
+    server_side = True
+
+    def close(self):
+        if self._cursor is not None:
+            self.await_(self._cursor.close())
+            self._cursor = None
+
+    def fetchone(self):
+        return self.await_(self._cursor.fetchone())
+
+    def fetchmany(self, size=None):
+        return self.await_(self._cursor.fetchmany(size=size or self.arraysize))
+
+    def fetchall(self):
+        return self.await_(self._cursor.fetchall())
+
+
+class AsyncAdapt_aiosqlite_connection:
+    await_ = staticmethod(await_only)
+
+    def __init__(self, dbapi: "AsyncAdapt_aiosqlite_dbapi", connection: Any):
+        self.dbapi = dbapi
+        self._connection = connection
+
+    def create_function(self, *args, **kw):
+        self.await_(self._connection.create_function(*args, **kw))
+
+    def cursor(self, server_side=False):
+        if server_side:
+            return AsyncAdapt_aiosqlite_ss_cursor(self)
+        else:
+            return AsyncAdapt_aiosqlite_cursor(self)
+
+    def rollback(self):
+        self.await_(self._connection.rollback())
+
+    def commit(self):
+        self.await_(self._connection.commit())
+
+    def close(self):
+        self.await_(self._connection.close())
+
+
+class AsyncAdaptFallback_aiosqlite_connection(AsyncAdapt_aiosqlite_connection):
+    await_ = staticmethod(await_fallback)
+
+
+class AsyncAdapt_aiosqlite_dbapi:
+    def __init__(self, aiosqlite: Any, sqlite: Any):
+        self.aiosqlite = aiosqlite
+        self.sqlite = sqlite
+        self.paramstyle = "qmark"
+
+        for name in (
+            "Warning",
+            "Error",
+            "InterfaceError",
+            "DataError",
+            "DatabaseError",
+            "OperationalError",
+            "IntegrityError",
+            "ProgrammingError",
+            "InternalError",
+            "NotSupportedError",
+            "PARSE_COLNAMES",
+            "PARSE_DECLTYPES",
+            "Binary",
+            "sqlite_version",
+            "sqlite_version_info",
+        ):
+            setattr(self, name, getattr(self.sqlite, name))
+
+    def connect(self, *arg, **kw):
+        async_fallback = kw.pop("async_fallback", False)
+        connection = self.aiosqlite.connect(*arg, **kw)
+        # each connection runs its queries on a thread of its own, which
+        # mustn't keep the process alive.
+        getattr(connection, "_thread", connection).daemon = True
+
+        if util.asbool(async_fallback):
+            return AsyncAdaptFallback_aiosqlite_connection(
+                self, await_fallback(connection)
+            )
+        else:
+            return AsyncAdapt_aiosqlite_connection(self, await_only(connection))
+
+
+class SQLiteExecutionContext_aiosqlite(SQLiteExecutionContext):
+    def create_server_side_cursor(self):
+        return self._dbapi_connection.cursor(server_side=True)
+
+
+class SQLiteDialect_aiosqlite(SQLiteDialect_pysqlite):
+    driver = "aiosqlite"
+
+    supports_server_side_cursors = True
+    execution_ctx_cls = SQLiteExecutionContext_aiosqlite
+
+    is_async = True
+
+    @classmethod
+    def dbapi(cls):
+        return AsyncAdapt_aiosqlite_dbapi(
+            __import__("aiosqlite"), __import__("sqlite3")
+        )
+
+    @classmethod
+    def get_pool_class(cls, url):
+        if util.asbool(url.query.get("async_fallback", False)):
+            return FallbackAsyncAdaptedQueuePool
+        else:
+            return AsyncAdaptedQueuePool
+
+    def on_connect(self):
+        connect = super().on_connect()
+
+        def set_pragmas(conn):
+            cursor = conn.cursor()
+            for name, value in PRAGMAS.items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+            cursor.close()
+
+            connect(conn)
+
+        return set_pragmas
+
+
+dialect = SQLiteDialect_aiosqlite
+
+registry.register("sqlite.aiosqlite", __name__, "SQLiteDialect_aiosqlite")
+
+
+__all__ = ["PRAGMAS", "SQLiteDialect_aiosqlite"]
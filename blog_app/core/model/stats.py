@@ -0,0 +1,170 @@
+"""
+blog_app.core.model.stats - what the SQL run while handling a request costs:
+the statements run, rows returned, bytes fetched and time taken, per table.
+"""
+
+import logging
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+from sqlalchemy.sql.util import find_tables
+
+
+class SqlBudget(NamedTuple):
+    """
+    The most SQL a single operation may run; zero leaves a limit unset.
+    `reject` fails statements once the budget is spent, rather than only
+    logging a warning.
+    """
+
+    statements: int = 0
+    rows: int = 0
+    seconds: float = 0.0
+    reject: bool = False
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.statements or self.rows or self.seconds)
+
+    def exceeded_by(self, totals: Dict[str, float]) -> Optional[str]:
+        """Describe the limit that `totals` exceed, if any."""
+        for limit, used in [
+            (self.statements, totals["statements"]),
+            (self.rows, totals["rows"]),
+            (self.seconds, totals["seconds"]),
+        ]:
+            if limit and used > limit:
+                return (
+                    f"{totals['statements']} statements, {totals['rows']} rows"
+                    f" and {totals['seconds'] * 1000:.1f}ms of SQL (budget:"
+                    f" {self.statements or '-'} statements, {self.rows or '-'} rows,"
+                    f" {self.seconds * 1000 or '-'}ms)"
+                )
+        return None
+
+
+class SqlBudgetExceeded(Exception):
+    pass
+
+
+def _table_name(statement: Any) -> str:
+    # the table written to, or else the first that's read from.
+    table = getattr(statement, "table", None)
+    if table is None:
+        tables = find_tables(statement)
+        table = tables[0] if tables else None
+    return table.name if table is not None else "?"
+
+
+def _size(value: Any) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    return 8
+
+
+class SqlStats:
+    """
+    Tallies the statements run on the connections that `track` returns.
+    Bytes fetched are estimated from the values of the rows returned: the
+    length of strings, and 8 bytes for numbers, dates and the like.
+
+    Once the `budget` is exceeded a warning is logged, and with
+    `budget.reject`, every statement that follows fails with
+    `SqlBudgetExceeded`.
+
+    >>> stats = SqlStats()
+    >>> stats.record("post", [(1, "title")], 0.002)
+    >>> stats.report()["tables"]["post"]
+    {'statements': 1, 'rows': 1, 'bytes': 13, 'timeMs': 2.0}
+    """
+
+    def __init__(self, budget: SqlBudget = SqlBudget()):
+        self.budget = budget
+        self.tables: Dict[str, Dict[str, float]] = {}
+        self.exceeded: Optional[str] = None
+
+    def track(self, conn: Any) -> "TrackedConnection":
+        return TrackedConnection(conn, self)
+
+    def totals(self) -> Dict[str, float]:
+        totals = {"statements": 0, "rows": 0, "bytes": 0, "seconds": 0.0}
+        for table in self.tables.values():
+            for key in totals:
+                totals[key] += table[key]
+        return totals
+
+    def record(self, table: str, rows: Any, seconds: float):
+        stats = self.tables.setdefault(
+            table, {"statements": 0, "rows": 0, "bytes": 0, "seconds": 0.0}
+        )
+        stats["statements"] += 1
+        stats["rows"] += len(rows)
+        stats["bytes"] += sum(_size(value) for row in rows for value in row)
+        stats["seconds"] += seconds
+
+        if self.exceeded is None:
+            self.exceeded = self.budget.exceeded_by(self.totals())
+            if self.exceeded:
+                logging.warning(
+                    "An operation ran over its SQL budget: %s", self.exceeded
+                )
+
+    def rejection(self) -> Optional[str]:
+        """The reason statements are rejected, once the budget is spent."""
+        if self.exceeded and self.budget.reject:
+            return f"The operation is over its SQL budget: {self.exceeded}"
+        return None
+
+    def check(self):
+        rejection = self.rejection()
+        if rejection:
+            raise SqlBudgetExceeded(rejection)
+
+    def report(self) -> Dict[str, Any]:
+        def format(stats: Dict[str, float]) -> Dict[str, Any]:
+            return {
+                "statements": stats["statements"],
+                "rows": stats["rows"],
+                "bytes": stats["bytes"],
+                "timeMs": round(stats["seconds"] * 1000, 3),
+            }
+
+        return {
+            **format(self.totals()),
+            "overBudget": self.exceeded is not None,
+            "tables": {name: format(stats) for name, stats in self.tables.items()},
+        }
+
+
+class TrackedConnection:
+    """
+    Wraps a connection, recording each statement that it executes in
+    `stats`. Statements which return rows have them read up front, to be
+    counted, and are returned as a (buffered) result of those rows.
+    """
+
+    def __init__(self, conn: Any, stats: SqlStats):
+        self.conn = conn
+        self.stats = stats
+
+    async def execute(self, statement: Any, *args, **kwargs) -> Any:
+        self.stats.check()
+        start = time.perf_counter()
+        result = await self.conn.execute(statement, *args, **kwargs)
+        rows = []
+
+        if result.returns_rows:
+            frozen = result.freeze()
+            rows = frozen.data
+            result = frozen()
+
+        self.stats.record(_table_name(statement), rows, time.perf_counter() - start)
+        return result
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.conn, name)
+
+
+__all__ = ["SqlBudget", "SqlBudgetExceeded", "SqlStats", "TrackedConnection"]
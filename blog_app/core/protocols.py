@@ -4,12 +4,17 @@ blog_app.core.protocols -- interfaces for inter-module communication
 """
 
 from datetime import datetime
+from decimal import Decimal
 from typing import (
+    Any,
     Awaitable,
+    Dict,
     Hashable,
     List,
+    NamedTuple,
     Optional,
     Protocol,
+    Tuple,
     TypeVar,
     Union,
     runtime_checkable,
@@ -21,10 +26,19 @@ from strawberry.asgi import Request, WebSocket
 from blog_app.core.result import Result
 from blog_app.core.types import AppError
 from blog_app.core.model import ReactionType
-from blog_app.core.helpers import Collection
+from blog_app.core.helpers import (
+    Collection,
+    IdOrderedCollection,
+    Connection,
+    Loader,
+    PageRequest,
+    Selection,
+)
 
 AppRequest = Union[Request, WebSocket]
 KeyType = TypeVar("KeyType", contravariant=True, bound=Hashable)
+# counts of items by the values of the fields they're grouped by
+GroupCounts = Dict[Tuple[Any, ...], int]
 LoaderType = TypeVar("LoaderType", covariant=True)
 
 
@@ -44,6 +58,9 @@ AppReactionType = strawberry.enum(ReactionType)
 
 @strawberry.interface(name="Reaction")
 class AppReaction:
+    # implementations keep their columns in slots
+    __slots__ = ()
+
     id: int
     comment_id: int
     reaction_type: AppReactionType
@@ -52,23 +69,39 @@ class AppReaction:
     updated: datetime
 
 
+@strawberry.type
+class ReactionCount:
+    reaction_type: AppReactionType
+    count: int
+
+
 @strawberry.interface(name="Comment")
 class AppComment:
+    # implementations keep their columns in slots
+    __slots__ = ()
+
     id: int
     post_id: int
     content: str
     author_id: strawberry.ID
     author: Person
-    reactions: Collection[AppReaction] = strawberry.field(
+    reactions: IdOrderedCollection[AppReaction] = strawberry.field(
         description="Return all reactions which have been set on this comment,"
         " wrapped in a `Collection`."
     )
+    reaction_counts: List[ReactionCount] = strawberry.field(
+        description="Return the number of reactions of each type which have been"
+        " set on this comment."
+    )
     created: datetime
     updated: datetime
 
 
 @strawberry.interface(name="Post")
 class AppPost:
+    # implementations keep their columns in slots
+    __slots__ = ()
+
     id: int
     author_id: strawberry.ID
     author: Person
@@ -78,6 +111,9 @@ class AppPost:
         description="Return all comments which have been added to this post,"
         " wrapped in a `Collection`."
     )
+    comment_count: int = strawberry.field(
+        description="Return the number of comments which have been added to this post."
+    )
     created: datetime
     updated: datetime
 
@@ -102,14 +138,60 @@ class PostContext(Protocol):
 @runtime_checkable
 class CommentContext(Protocol):
     @property
-    def by_post_id(self) -> Dataloader[int, List[AppComment]]:
+    def loader(self) -> Loader[AppComment]:
+        ...
+
+    @property
+    def dataloader(self) -> Dataloader[int, Optional[AppComment]]:
+        ...
+
+    def by_post_id(
+        self, selection: Selection = None
+    ) -> Dataloader[int, List[AppComment]]:
+        ...
+
+    def page_by_post_id(
+        self, selection: Selection = None
+    ) -> Dataloader[Tuple[int, PageRequest], Connection[AppComment]]:
+        ...
+
+    def count_by_post_id(self) -> Dataloader[int, GroupCounts]:
         ...
 
 
 @runtime_checkable
 class ReactionContext(Protocol):
     @property
-    def by_comment_id(self) -> Dataloader[int, List[AppReaction]]:
+    def loader(self) -> Loader[AppReaction]:
+        ...
+
+    def by_comment_id(
+        self, selection: Selection = None
+    ) -> Dataloader[int, List[AppReaction]]:
+        ...
+
+    def page_by_comment_id(
+        self, selection: Selection = None
+    ) -> Dataloader[Tuple[int, PageRequest], Connection[AppReaction]]:
+        ...
+
+    def count_by_comment_id(self) -> Dataloader[int, GroupCounts]:
+        ...
+
+
+class SearchHit(NamedTuple):
+    """An item matching a search: a "post" or a "comment", with its id."""
+
+    kind: str
+    id: int
+    score: Decimal
+
+
+@runtime_checkable
+class SearchContext(Protocol):
+    async def search(
+        self, query: str, first: int, after: Optional[Tuple[Any, ...]] = None
+    ) -> List[SearchHit]:
         ...
 
 
@@ -119,6 +201,7 @@ class AppContext(Protocol):
     posts: PostContext
     comments: CommentContext
     reactions: ReactionContext
+    search: SearchContext
 
 
 __all__ = [
@@ -128,9 +211,12 @@ __all__ = [
     "CommentContext",
     "PostContext",
     "ReactionContext",
+    "SearchContext",
+    "SearchHit",
     "Person",
     "AppPost",
     "AppComment",
     "AppReaction",
     "AppReactionType",
+    "ReactionCount",
 ]
@@ -6,19 +6,25 @@ from strawberry.dataloader import DataLoader
 from blog_app.core.helpers import Loader
 from blog_app.core.model import ModelMap, ModelHelper
 from blog_app.core.protocols import AppRequest, PostContext
-from .types import Post
+from .types import Post, POST_FIELD_COLUMNS
 
 
 @dataclass
 class Context:
     loader: Loader[Post]
     model: ModelHelper
+    # load the collections nested in a `posts` query before resolving it
+    plan_queries: bool = False
 
     @property
     def dataloader(self) -> DataLoader[int, Optional[Post]]:
         return self.loader.dataloader
 
 
-async def build_post_context(model_map: ModelMap) -> PostContext:
-    loader = Loader(constructor=Post, model=model_map["post"])
-    return Context(loader=loader, model=model_map["post"])
+async def build_post_context(
+    model_map: ModelMap, plan_queries: bool = False
+) -> PostContext:
+    loader = Loader(
+        constructor=Post, model=model_map["post"], field_columns=POST_FIELD_COLUMNS
+    )
+    return Context(loader=loader, model=model_map["post"], plan_queries=plan_queries)
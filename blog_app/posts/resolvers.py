@@ -1,5 +1,5 @@
 import logging
-from typing import Optional, Union, cast
+from typing import List, Optional, Union, cast
 
 from strawberry.types import Info
 
@@ -11,11 +11,12 @@ from blog_app.core import (
     InternalError,
     ItemNotFoundError,
 )
-from blog_app.core.helpers import QueryableCollection
+from blog_app.core.helpers import NestedCollection, QueryableCollection, QueryPlanner
 from blog_app.auth.types import AuthError
 from blog_app.common.logic import (
     EditType,
     handle_create,
+    handle_create_many,
     handle_edit,
     Unauthorized,
     remove_falsy_values,
@@ -24,6 +25,7 @@ from .context import Context
 from .types import (
     PostCreationResponse,
     PostDeletionResponse,
+    PostInput,
     PostTitle,
     PostUpdateResponse,
 )
@@ -59,12 +61,36 @@ def get_posts_model(info: Info[AppContext, AppRequest]):
     return cast(Context, info.context.posts).model
 
 
+def get_planner(info: Info[AppContext, AppRequest]) -> QueryPlanner:
+    return QueryPlanner(
+        get_loader(info),
+        {
+            "comments": NestedCollection(
+                info.context.comments.loader,
+                "post_id",
+                {
+                    "reactions": NestedCollection(
+                        info.context.reactions.loader, "comment_id"
+                    )
+                },
+            )
+        },
+    )
+
+
 async def get_posts(info: Info[AppContext, AppRequest]) -> QueryableCollection[AppPost]:
+    if cast(Context, info.context.posts).plan_queries:
+        # if planning fails, the selection is still loaded as it's resolved.
+        await InternalError.wrap(get_planner(info).prefetch, info)
+
     return QueryableCollection(loader=get_loader(info))
 
 
 async def create_post(
-    title: PostTitle, content: str, info: Info[AppContext, AppRequest]
+    title: PostTitle,
+    content: str,
+    info: Info[AppContext, AppRequest],
+    idempotency_key: Optional[str] = None,
 ) -> Union[PostCreationResponse, PostError]:
     return (
         (
@@ -72,6 +98,7 @@ async def create_post(
                 {"title": title, "content": content},
                 info.context.auth,
                 get_posts_model(info),
+                idempotency_key=idempotency_key,
             )
         )
         .map(lambda id: PostCreationResponse(id=id, title=title))
@@ -80,6 +107,22 @@ async def create_post(
     )
 
 
+async def create_posts(
+    posts: List[PostInput], info: Info[AppContext, AppRequest]
+) -> List[Union[PostCreationResponse, PostError]]:
+    created = await handle_create_many(
+        [{"title": post.title, "content": post.content} for post in posts],
+        info.context.auth,
+        get_posts_model(info),
+    )
+    return [
+        created.map(lambda ids: PostCreationResponse(id=ids[i], title=post.title))
+        .map_err(coerce_error)
+        .collapse()
+        for i, post in enumerate(posts)
+    ]
+
+
 async def update_post(
     id: int,
     info: Info[AppContext, AppRequest],
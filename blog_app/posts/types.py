@@ -35,8 +35,20 @@ PostTitle = strawberry.scalar(
 )
 
 
+# columns needed by the fields of `Post` that aren't loaded from a column of
+# the same name.
+POST_FIELD_COLUMNS = {
+    "author": ["author_id"],
+    "comments": ["id"],
+    "comment_count": ["id"],
+}
+
+
 @strawberry.type(name="Post_")
 class Post(AppPost):
+    # items are built from rows by the thousand, see `Loader._build`
+    __slots__ = ("id", "author_id", "title", "content", "created", "updated")
+
     id: int
     author_id: strawberry.ID
     title: str
@@ -55,7 +67,17 @@ class Post(AppPost):
     async def comments(
         self, info: Info[AppContext, AppRequest]
     ) -> Collection[AppComment]:
-        return Collection(lambda: info.context.comments.by_post_id.load(self.id))
+        return Collection(
+            lambda selection: info.context.comments.by_post_id(selection).load(self.id),
+            lambda request, selection: info.context.comments.page_by_post_id(
+                selection
+            ).load((self.id, request)),
+        )
+
+    @strawberry.field
+    async def comment_count(self, info: Info[AppContext, AppRequest]) -> int:
+        counts = await info.context.comments.count_by_post_id().load(self.id)
+        return sum(counts.values())
 
 
 @strawberry.type
@@ -63,6 +85,12 @@ class PostRetrievalError:
     message: str
 
 
+@strawberry.input
+class PostInput:
+    title: PostTitle  # type: ignore[valid-type]
+    content: str
+
+
 @strawberry.type
 class PostCreationResponse:
     id: int
@@ -1,22 +1,37 @@
 from dataclasses import dataclass
+from typing import Optional
 
-from blog_app.core.helpers import Loader
-from blog_app.core.model import ModelHelper, ModelMap
+from blog_app.core.helpers import Loader, Selection
+from blog_app.core.model import ModelHelper, ModelMap, WriteCoalescer
 from blog_app.core.protocols import ReactionContext
 
-from .types import Reaction
+from .types import Reaction, REACTION_FIELD_COLUMNS
 
 
 @dataclass
 class Context:
     loader: Loader[Reaction]
     model: ModelHelper
+    writer: Optional[WriteCoalescer] = None
 
-    @property
-    def by_comment_id(self):
-        return self.loader.get_group_dataloader("comment_id")
+    def by_comment_id(self, selection: Selection = None):
+        columns = self.loader.project(selection, "comment_id")
+        return self.loader.get_group_dataloader("comment_id", columns)
 
+    def page_by_comment_id(self, selection: Selection = None):
+        columns = self.loader.project(selection, "comment_id")
+        return self.loader.get_page_dataloader("comment_id", columns)
 
-async def build_reaction_context(model_map: ModelMap) -> ReactionContext:
-    loader = Loader(constructor=Reaction, model=model_map["reaction"])
-    return Context(loader=loader, model=model_map["reaction"])
+    def count_by_comment_id(self):
+        return self.loader.get_count_dataloader("comment_id", "reaction_type")
+
+
+async def build_reaction_context(
+    model_map: ModelMap, writer: Optional[WriteCoalescer] = None
+) -> ReactionContext:
+    loader = Loader(
+        constructor=Reaction,
+        model=model_map["reaction"],
+        field_columns=REACTION_FIELD_COLUMNS,
+    )
+    return Context(loader=loader, model=model_map["reaction"], writer=writer)
@@ -1,5 +1,5 @@
 import logging
-from typing import Union, cast
+from typing import List, Union, cast
 
 import strawberry
 from strawberry.types import Info
@@ -12,10 +12,16 @@ from blog_app.core import (
     InternalError,
     ItemNotFoundError,
 )
-from blog_app.common.logic import EditType, handle_create, handle_edit, Unauthorized
+from blog_app.common.logic import (
+    EditType,
+    handle_create,
+    handle_create_many,
+    handle_edit,
+    Unauthorized,
+)
 from blog_app.auth.types import AuthError
 from .context import Context as LocalContext
-from .types import ReactionSetResponse, ReactionDeletionResponse
+from .types import ReactionInput, ReactionSetResponse, ReactionDeletionResponse
 
 ReactionError = Union[AuthError, InternalError]
 ReactionEditError = Union[ReactionError, ItemNotFoundError]
@@ -48,6 +54,12 @@ def get_comments_model(info: Info[AppContext, AppRequest]):
     return cast(LocalContext, info.context.reactions).model
 
 
+def get_reactions_writer(info: Info[AppContext, AppRequest]):
+    # group commit is opt-in; without it, reactions are written directly.
+    context = cast(LocalContext, info.context.reactions)
+    return context.writer or context.model
+
+
 async def set_reaction(
     comment_id: int, reaction_type: AppReactionType, info: Info[AppContext, AppRequest]
 ) -> Union[ReactionSetResponse, ReactionError]:
@@ -56,7 +68,7 @@ async def set_reaction(
             await handle_create(
                 {"comment_id": comment_id, "reaction_type": reaction_type},
                 info.context.auth,
-                get_comments_model(info),
+                get_reactions_writer(info),
                 on_conflict_set={"reaction_type": reaction_type},
             )
         )
@@ -70,6 +82,39 @@ async def set_reaction(
     )
 
 
+async def set_reactions(
+    reactions: List[ReactionInput], info: Info[AppContext, AppRequest]
+) -> List[Union[ReactionSetResponse, ReactionError]]:
+    # a user has one reaction per comment, so when a comment is given more
+    # than once, the last reaction set for it wins.
+    reaction_types = {
+        reaction.comment_id: reaction.reaction_type for reaction in reactions
+    }
+    created = (
+        await handle_create_many(
+            [
+                {"comment_id": comment_id, "reaction_type": reaction_type}
+                for comment_id, reaction_type in reaction_types.items()
+            ],
+            info.context.auth,
+            get_comments_model(info),
+            update_on_conflict=["reaction_type"],
+        )
+    ).map(lambda ids: dict(zip(reaction_types, ids)))
+
+    return [
+        created.map(
+            lambda reaction_ids: ReactionSetResponse(
+                id=reaction_ids[reaction.comment_id],
+                reaction_type=reaction_types[reaction.comment_id],
+            )
+        )
+        .map_err(coerce_error)
+        .collapse()
+        for reaction in reactions
+    ]
+
+
 async def delete_reaction(
     id: int, info: Info[AppContext, AppRequest]
 ) -> Union[ReactionDeletionResponse, ReactionEditError]:
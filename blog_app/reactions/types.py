@@ -7,8 +7,16 @@ from strawberry.types import Info
 from blog_app.core import AppReaction, AppReactionType, AppContext, AppRequest, Person
 
 
+# columns needed by the fields of `Reaction` that aren't loaded from a column
+# of the same name.
+REACTION_FIELD_COLUMNS = {"author": ["author_id"]}
+
+
 @strawberry.type(name="Reaction_")
 class Reaction(AppReaction):
+    # items are built from rows by the thousand, see `Loader._build`
+    __slots__ = ("id", "comment_id", "author_id", "reaction_type", "updated")
+
     id: int
     comment_id: int
     author_id: strawberry.ID
@@ -22,6 +30,12 @@ class Reaction(AppReaction):
         return await info.context.auth.users.load(self.author_id)  # type: ignore
 
 
+@strawberry.input
+class ReactionInput:
+    comment_id: int
+    reaction_type: AppReactionType
+
+
 @strawberry.type
 class ReactionSetResponse:
     id: int
@@ -0,0 +1 @@
+from .context import build_search_context
@@ -0,0 +1,56 @@
+import asyncio
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from blog_app.core.model import ModelHelper, ModelMap
+from blog_app.core.protocols import SearchContext, SearchHit
+
+
+@dataclass
+class Context:
+    # the models searched, by the kind of item they hold. Hits that are as
+    # relevant as each other are ordered by kind, then id.
+    models: Dict[str, ModelHelper]
+
+    async def search(
+        self, query: str, first: int, after: Optional[Tuple[Any, ...]] = None
+    ) -> List[SearchHit]:
+        """
+        Return the `first` items most relevant to `query`, which follow the
+        hit whose `(score, kind, id)` are `after`.
+
+        Each kind of item is searched for (at most) its `first` hits, and the
+        most relevant of those are the `first` hits of all kinds.
+        """
+        results = await asyncio.gather(
+            *(
+                model.load_matches(query, after=_after(kind, after), limit=first)
+                for kind, model in self.models.items()
+            )
+        )
+        hits = [
+            SearchHit(kind=kind, id=row.id, score=row.score)
+            for kind, rows in zip(self.models, results)
+            for row in rows
+        ]
+        hits.sort(key=lambda hit: (-hit.score, hit.kind, hit.id))
+        return hits[:first]
+
+
+def _after(
+    kind: str, after: Optional[Tuple[Any, ...]]
+) -> Optional[Tuple[Decimal, Optional[int]]]:
+    if after is None:
+        return None
+
+    score, after_kind, after_id = after
+    if kind == after_kind:
+        return score, after_id
+
+    # items as relevant as the cursor come after it if their kind does.
+    return score, 0 if kind > after_kind else None
+
+
+async def build_search_context(model_map: ModelMap) -> SearchContext:
+    return Context(models={"comment": model_map["comment"], "post": model_map["post"]})
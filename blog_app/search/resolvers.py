@@ -0,0 +1,52 @@
+import asyncio
+from typing import Any, Awaitable, Optional
+
+from strawberry.types import Info
+
+from blog_app.core import AppContext, AppRequest, SearchHit
+from blog_app.core.helpers import Connection, Edge, PageRequest
+from blog_app.core.helpers.pagination import decode_cursor, encode_cursor
+from .types import SearchOrder, SearchResult
+
+
+def load_hit(info: Info[AppContext, AppRequest], hit: SearchHit) -> Awaitable[Any]:
+    # loaded through the same dataloaders as any other post or comment, so that
+    # their nested fields are batched together.
+    if hit.kind == "post":
+        return info.context.posts.dataloader.load(hit.id)
+
+    return info.context.comments.dataloader.load(hit.id)
+
+
+async def search(
+    query: str,
+    info: Info[AppContext, AppRequest],
+    first: Optional[int] = None,
+    after: Optional[str] = None,
+) -> Connection[SearchResult]:
+    request = PageRequest.parse(first)
+    hits = await info.context.search.search(
+        query,
+        request.first + 1,  # one extra hit tells us if there's more
+        decode_cursor(after, SearchOrder.RELEVANCE) if after else None,
+    )
+    items = await asyncio.gather(
+        *(load_hit(info, hit) for hit in hits[: request.first])
+    )
+
+    return Connection.from_edges(
+        [
+            Edge(
+                cursor=encode_cursor(
+                    SearchOrder.RELEVANCE, [hit.score, hit.kind, hit.id]
+                ),
+                node=item,
+            )
+            for hit, item in zip(hits, items)
+            if item is not None  # removed since it was found
+        ],
+        has_next_page=len(hits) > request.first,
+    )
+
+
+__all__ = ["search"]
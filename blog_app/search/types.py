@@ -0,0 +1,22 @@
+from enum import Enum
+from typing import Tuple
+
+import strawberry
+
+from blog_app.comments.types import Comment
+from blog_app.posts.types import Post
+
+
+SearchResult = strawberry.union(
+    "SearchResult", (Post, Comment), description="A post or comment found by a search."
+)
+
+
+class SearchOrder(Enum):
+    """Search results are ordered by relevance, then kind, then id."""
+
+    RELEVANCE = "relevance"
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        return ("score", "kind", "id")
@@ -0,0 +1,187 @@
+"""
+cli.benchmarks - micro-benchmarks for the database access layer.
+
+These run against an in-memory SQLite database, so they measure the CPU
+time spent in the application and SQLAlchemy for each query, rather than
+the time spent waiting on MySQL.
+"""
+
+import dataclasses
+import timeit
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.schema import MetaData
+from sqlalchemy.sql import select
+
+from blog_app.comments.types import Comment
+from blog_app.core.helpers import Loader
+from blog_app.core.model import ModelMap, register_tables
+from blog_app.core.model.fast_path import IdLoad
+from blog_app.posts.types import Post
+
+
+# (model, selected columns, filters) of the queries made by the loaders
+QUERY_SHAPES: List[Tuple[str, Tuple[str, ...], Dict[str, Any]]] = [
+    ("post", ("id", "title"), {"id": list(range(1, 21))}),
+    ("post", (), {"id": 7}),
+    ("comment", ("id", "post_id", "content"), {"post_id": list(range(1, 21))}),
+    ("reaction", ("id", "comment_id"), {"comment_id": list(range(1, 51))}),
+    ("reaction", (), {"author_id": "author"}),
+]
+
+
+def _connect() -> Tuple[ModelMap, Any]:
+    metadata = MetaData()
+    model_map = register_tables(metadata)
+    conn: Any = create_engine("sqlite://", future=True).connect()
+    metadata.create_all(conn)
+
+    return model_map, conn
+
+
+def _time(func: Callable[[], Any], number: int) -> float:
+    """Return the best time for a single call of `func`, in microseconds."""
+    func()
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def statement_cache(number: int = 2000) -> Iterator[str]:
+    """
+    Compare building a select statement for every query with reusing the
+    statement kept for its shape by `ModelHelper._select_rows`.
+    """
+    model_map, conn = _connect()
+
+    for name, cols, where in QUERY_SHAPES:
+        model = model_map[name]  # type: ignore[misc]
+
+        def build_every_time():
+            columns = [model.table.c[col] for col in cols]
+            stmt = select(*(columns or model.table.columns))
+            conn.execute(model._restrict_rows(stmt, where)).fetchall()
+
+        def reuse_statement():
+            conn.execute(*model._select_rows(cols, where)).fetchall()
+
+        before = _time(build_every_time, number)
+        after = _time(reuse_statement, number)
+        filters = ", ".join(
+            f"{key} IN <{len(val)}>" if isinstance(val, list) else f"{key} = ?"
+            for key, val in where.items()
+        )
+
+        yield (
+            f"{name:<9} {filters:<20} {before:8.1f}us -> {after:8.1f}us"
+            f"  ({before - after:+.1f}us saved per query)"
+        )
+
+
+def id_loads(number: int = 2000, rows: int = 100) -> Iterator[str]:
+    """
+    Compare loading rows by a list of ids through SQLAlchemy (with the
+    statement kept for its shape) with running SQL compiled ahead of time,
+    as `ModelHelper` does with `fast_loads`.
+    """
+    model_map, conn = _connect()
+    conn.execute(
+        model_map["post"].table.insert(),
+        [{"title": f"post {i}", "author_id": "author"} for i in range(rows)],
+    )
+
+    for cols, count in [(("id", "title"), 20), ((), 20), (("id", "title"), rows)]:
+        model = model_map["post"]
+        where = {"id": list(range(1, count + 1))}
+        columns: List[Any] = [model.table.c[col] for col in cols] or model.columns
+        load = IdLoad(
+            model._visible(select(*columns)), model.table.c["id"], conn.dialect
+        )
+
+        def core():
+            cursor = conn.execute(*model._select_rows(cols, where))
+            [row._asdict() for row in cursor.fetchall()]
+
+        def fast_path():
+            cursor = conn.exec_driver_sql(load.sql(count), tuple(where["id"]))
+            [row._asdict() for row in load.rows(cursor.fetchall())]
+
+        before = _time(core, number)
+        after = _time(fast_path, number)
+        selected = ", ".join(cols) or "*"
+
+        yield (
+            f"post ({selected:<9}) id IN <{count:>3}> {before:8.1f}us -> {after:8.1f}us"
+            f"  ({before - after:+.1f}us saved per query)"
+        )
+
+
+def _retained(func: Callable[[], Any]) -> float:
+    """Return the memory held by the result of `func`, in MB."""
+    tracemalloc.start()
+    result = func()  # noqa: F841
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / 1024 / 1024
+
+
+def row_building(rows: int = 100_000) -> Iterator[str]:
+    """
+    Compare building items from rows by keyword, into instances with a
+    `__dict__`, with building them as `Loader` does: positionally, into
+    instances of the `__slots__` backed GraphQL types.
+    """
+    model_map, conn = _connect()
+    conn.execute(
+        model_map["post"].table.insert(),
+        [{"title": "post", "author_id": "author", "content": "x" * 100}],
+    )
+    conn.execute(
+        model_map["comment"].table.insert(),
+        [{"post_id": 1, "author_id": "author", "content": "x" * 100}] * rows,
+    )
+
+    for name, constructor, cols in [
+        ("comment", Comment, ()),
+        ("comment", Comment, ("id", "content")),
+        ("post", Post, ()),
+    ]:
+        model = model_map[name]  # type: ignore[misc]
+        columns: List[Any] = [model.table.c[col] for col in cols] or model.columns
+        fetched = conn.execute(select(*columns)).fetchall()
+        if len(fetched) < rows:
+            fetched = fetched * (rows // len(fetched))
+
+        # the type as it was, without slots
+        fields = [(f.name, f.type) for f in dataclasses.fields(constructor) if f.init]
+        unslotted = dataclasses.make_dataclass(constructor.__name__, fields)
+        names = [col.name for col in model.columns]
+
+        def by_keyword():
+            empty = dict.fromkeys(names)
+            return [unslotted(**{**empty, **row._asdict()}) for row in fetched]
+
+        loader = Loader(constructor, model)
+
+        def positionally():
+            return [loader._build(row) for row in fetched]
+
+        before, after = _time(by_keyword, 1) / 1000, _time(positionally, 1) / 1000
+        size_before, size_after = _retained(by_keyword), _retained(positionally)
+        selected = ", ".join(cols) or "*"
+
+        yield (
+            f"{len(fetched)} {name} ({selected:<11})"
+            f" {before:6.1f}ms -> {after:6.1f}ms,"
+            f" {size_before:5.1f}MB -> {size_after:5.1f}MB"
+        )
+
+
+BENCHMARKS: Dict[str, Callable[..., Iterator[str]]] = {
+    "statement-cache": statement_cache,
+    "id-loads": id_loads,
+    "row-building": row_building,
+}
+
+
+__all__ = ["BENCHMARKS"]
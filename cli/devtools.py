@@ -1,12 +1,27 @@
 import asyncio
+import contextlib
 import subprocess
+import sys
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional
 
 import typer
 import uvicorn
 
 from blog_app import _debug_app
-from blog_app.database import create_tables
+from blog_app.core.model.model_helper import STREAM_CHUNK_SIZE
+from blog_app.database import (
+    archive_posts,
+    check_shard_rows,
+    create_tables,
+    export_table,
+    migrate_tables,
+    purge_deleted,
+    rebuild_counter_tables,
+)
 from blog_app.settings import load as load_settings
+from cli.benchmarks import BENCHMARKS
 
 app = typer.Typer()
 
@@ -78,5 +93,115 @@ def create_model():
     asyncio.run(create_tables(settings.database))
 
 
+def _migrate(target: Optional[int], dry_run: bool):
+    settings = load_settings()
+    planned = asyncio.run(migrate_tables(settings.database, target, dry_run))
+
+    if not planned:
+        typer.secho("The database is up to date.", fg=typer.colors.GREEN, err=True)
+
+    for name, statements in planned:
+        if dry_run:
+            typer.echo(f"-- {name}")
+            for sql in statements:
+                typer.echo(f"{sql};")
+        else:
+            typer.secho(f"Migrated {name}", fg=typer.colors.GREEN, err=True)
+
+
+@app.command()
+def migrate(
+    to: Optional[int] = typer.Option(None, help="Version (the latest by default)"),
+    dry_run: bool = False,
+):
+    """Upgrade the database schema, or print its SQL with --dry-run."""
+    _migrate(to, dry_run)
+
+
+@app.command()
+def downgrade(to: int = typer.Argument(...), dry_run: bool = False):
+    """Downgrade the database schema to a version (0 drops every table)."""
+    _migrate(to, dry_run)
+
+
+@app.command()
+def export(
+    table: str = "post",
+    output: Optional[Path] = None,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+):
+    """Export all rows of a table as JSON lines (to stdout by default)."""
+    settings = load_settings()
+
+    try:
+        with (
+            output.open("w") if output else contextlib.nullcontext(sys.stdout)
+        ) as out:
+            count = asyncio.run(export_table(settings.database, table, out, chunk_size))
+    except ValueError as err:
+        typer.secho(str(err), fg=typer.colors.RED, err=True)
+        raise typer.Exit(1)
+
+    typer.secho(f"Exported {count} rows from {table}.", fg=typer.colors.GREEN, err=True)
+
+
+@app.command()
+def rebuild_counters(chunk_size: int = STREAM_CHUNK_SIZE):
+    """Recount the comment and reaction counters from their tables."""
+    settings = load_settings()
+    chunks = asyncio.run(rebuild_counter_tables(settings.database, chunk_size))
+
+    for table, count in chunks.items():
+        typer.secho(f"Rebuilt {table} in {count} chunks.", fg=typer.colors.GREEN)
+
+
+@app.command()
+def purge():
+    """Purge every deleted post now, with its comments and reactions."""
+    settings = load_settings()
+    purged = asyncio.run(purge_deleted(settings.database))
+
+    for table, count in purged.items():
+        typer.secho(f"Purged {count} rows from {table}.", fg=typer.colors.GREEN)
+
+
+@app.command()
+def archive(older_than_days: int = 365):
+    """Move old posts, with their comments and reactions, to the archive."""
+    settings = load_settings()
+    moved = asyncio.run(
+        archive_posts(settings.database, timedelta(days=older_than_days))
+    )
+
+    for table, count in moved.items():
+        typer.secho(f"Archived {count} rows from {table}.", fg=typer.colors.GREEN)
+
+
+@app.command()
+def check_shards():
+    """Check that every row of each shard belongs there by its id."""
+    settings = load_settings()
+
+    try:
+        asyncio.run(check_shard_rows(settings.database))
+    except ValueError as err:
+        typer.secho(str(err), fg=typer.colors.RED, err=True)
+        raise typer.Exit(1)
+
+    typer.secho("Every row is on its shard.", fg=typer.colors.GREEN)
+
+
+@app.command()
+def benchmark(name: str = typer.Argument(None)):
+    """Run the micro-benchmarks (all of them, by default)."""
+    for bench_name, bench in BENCHMARKS.items():
+        if name and name != bench_name:
+            continue
+
+        typer.secho(f"{bench_name}:", fg=typer.colors.YELLOW)
+        for line in bench():
+            typer.echo(f"  {line}")
+
+
 if __name__ == "__main__":
     app()
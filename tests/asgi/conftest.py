@@ -202,11 +202,13 @@ def setup_auto_insert_model_factory_instances(
     post_model = model_map["post"]
     PostFactory.engine = post_model.engine
     PostFactory.table = post_model.table
+    PostFactory.model_helper = post_model
     PostFactory.event_loop = event_loop
 
     comment_model = model_map["comment"]
     CommentFactory.engine = comment_model.engine
     CommentFactory.table = comment_model.table
+    CommentFactory.model_helper = comment_model
     CommentFactory.event_loop = event_loop
 
 
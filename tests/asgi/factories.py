@@ -63,6 +63,7 @@ class UserFactory(factory.Factory):
 class ModelFactory(factory.Factory):
     engine: ClassVar[Any] = None
     table: ClassVar[Optional[Table]] = None
+    model_helper: ClassVar[Any] = None
     event_loop: ClassVar[Optional[asyncio.AbstractEventLoop]] = None
 
     id = None
@@ -96,6 +97,7 @@ class ModelFactory(factory.Factory):
         args.pop("engine", None)
         args.pop("table", None)
         args.pop("event_loop", None)
+        args.pop("model_helper", None)
 
     @classmethod
     def _create(cls, model_class, **args):
@@ -121,24 +123,20 @@ class ModelFactory(factory.Factory):
     def fetch(cls, id: int):
         # Fetch an item from the db and return a matching
         # model
-        assert cls.engine is not None
+        assert cls.model_helper is not None
 
         async def fetch_coro():
-            assert cls.table is not None
-            stmt = cls.table.select().where(cls.table.c.id == id)
-
-            async with cls.engine.connect() as conn:
-                cursor = await conn.execute(stmt)
-                row = cursor.fetchone()
+            # as the app would load it, so that deleted items aren't found
+            rows = await cls.model_helper.load_all(id=[id])
 
-            if row is None:
-                return row
+            if not rows:
+                return None
 
-            row_dict = row._asdict()
-            author = FakeUser.find(row_dict.pop("author_id"))
+            row_dict = rows[0]._asdict()
+            author = FakeUser.find(row_dict["author_id"])
             assert author is not None
 
-            return cls.build(author=author, **row)
+            return cls.build(author=author, **row_dict)
 
         return cls._run_coroutine(fetch_coro())
 
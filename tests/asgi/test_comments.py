@@ -54,7 +54,7 @@ def test_can_get_all_post_comments_without_auth(
     all_expected_comments = [
         get_item_repr(
             comment,
-            strip_keys=["post_id", "reactions"],
+            strip_keys=["post_id", "reactions", "reaction_counts"],
             author_id="authorId",
             created=lambda dt: dt.isoformat(),
             updated=lambda dt: dt.isoformat(),
@@ -123,6 +123,40 @@ def test_add_comment_with_auth(
     assert created_comment.content == comment.content
 
 
+def test_add_comments_with_auth(
+    client, comment_factory: Type[CommentFactory], post: FakePost
+):
+    comments: List[FakeComment] = comment_factory.build_batch(3)
+    result = client.execute(
+        """
+        mutation addComments($comments: [CommentInput!]!) {
+            addComments(comments: $comments) {
+                ... on AuthError {
+                    reason
+                }
+                ... on CommentResponse {
+                    id
+                    content
+                }
+            }
+        }
+        """,
+        variables={
+            "comments": [
+                {"postId": post.id, "content": comment.content} for comment in comments
+            ]
+        },
+        access_token=post.author.access_token,
+    )
+
+    assert result.get("errors") is None
+    added = result["data"]["addComments"]
+    assert [item["content"] for item in added] == [c.content for c in comments]
+
+    for item in added:
+        assert comment_factory.fetch(item["id"]).content == item["content"]
+
+
 def test_update_comment_requires_auth(
     client: GraphQLClient,
     comment_factory: Type[CommentFactory],
@@ -40,7 +40,7 @@ def test_can_get_all_posts_without_auth(
     all_expected_posts = [
         get_item_repr(
             post,
-            strip_keys=["comments"],
+            strip_keys=["comments", "comment_count"],
             author_id="authorId",
             created=lambda dt: dt.isoformat(),
             updated=lambda dt: dt.isoformat(),
@@ -82,7 +82,7 @@ def test_can_get_posts_by_id_without_auth(
     all_expected_posts = [
         get_item_repr(
             post,
-            strip_keys=["comments"],
+            strip_keys=["comments", "comment_count"],
             author_id="authorId",
             created=lambda dt: dt.isoformat(),
             updated=lambda dt: dt.isoformat(),
@@ -92,6 +92,49 @@ def test_can_get_posts_by_id_without_auth(
     assert result["data"]["posts"]["byId"] == all_expected_posts
 
 
+def test_can_page_through_posts_without_auth(
+    client: GraphQLClient, post_factory: Type[PostFactory]
+):
+    post_factory.clear()  # delete all exisiting records
+
+    posts: List[FakePost] = post_factory.create_batch(25)
+    query = """
+        query pagePosts($after: String) {
+            posts {
+                page(first: 10, after: $after) {
+                    edges {
+                        cursor
+                        node {
+                            id
+                        }
+                    }
+                    pageInfo {
+                        hasNextPage
+                        endCursor
+                    }
+                }
+            }
+        }
+    """
+
+    received_ids: List[int] = []
+    after = None
+    has_next_page = True
+
+    while has_next_page:
+        result = client.execute(query, variables={"after": after})
+        assert result.get("errors") is None
+
+        page = result["data"]["posts"]["page"]
+        assert len(page["edges"]) <= 10
+
+        received_ids.extend(edge["node"]["id"] for edge in page["edges"])
+        has_next_page = page["pageInfo"]["hasNextPage"]
+        after = page["pageInfo"]["endCursor"]
+
+    assert received_ids == [post.id for post in posts]
+
+
 def test_create_post_bad_title(client, post_factory: Type[PostFactory]):
     post: FakePost = post_factory.build()
     result = client.execute(
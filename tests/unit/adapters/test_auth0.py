@@ -462,3 +462,17 @@ async def test_get_verified_user_returns_auth_error_on_missing_field(
     result = (await authenticator.get_verified_user(token)).collapse()
     assert isinstance(result, AuthError)
     assert result.reason == AuthErrorReason.INVALID_TOKEN
+
+
+@pytest.mark.asyncio
+async def test_fetch_signing_keys_caches_the_key_set(
+    requests_mock, settings: Auth0AuthenticatorSettings, authenticator
+):
+    jwks = requests_mock.get(
+        f"https://{settings.domain}/.well-known/jwks.json", json={"keys": []}
+    )
+
+    await authenticator.fetch_signing_keys()
+    await authenticator.fetch_signing_keys()
+
+    assert jwks.call_count == 1
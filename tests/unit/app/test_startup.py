@@ -0,0 +1,69 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+import toml
+from starlette.testclient import TestClient
+
+from blog_app import BlogApp
+from blog_app.database import DatabaseSettings, migrate_tables
+
+
+@pytest.fixture
+def start_app(tmp_path: Path, monkeypatch, event_loop):
+    # the app and the test client run on `event_loop`, which is closed after
+    # the test
+    def start_app(url: str) -> BlogApp:
+        settings = {"blog-app": {"database": {"connection_url": url}}}
+        settings_path = tmp_path / "blog-app.toml"
+        settings_path.write_text(toml.dumps(settings))
+        monkeypatch.setenv("BLOG_APP_SETTINGS", str(settings_path))
+        return BlogApp(graphiql=False)
+
+    return start_app
+
+
+def test_app_is_ready_once_warmed_up(start_app, tmp_path: Path, event_loop):
+    url = f"sqlite+aiosqlite:///{tmp_path}/db"
+    event_loop.run_until_complete(
+        migrate_tables(DatabaseSettings(connection_url=url))  # type: ignore[call-arg]
+    )
+    app = start_app(url)
+
+    # without the lifespan events, the app never warms up
+    assert TestClient(app).get("/ready").status_code == 503
+
+    with TestClient(app) as client:
+        response = client.get("/ready")
+        assert response.status_code == 200
+        assert client.get("/stats/pool").json()["checked_in"] == 5
+        # the purger is off unless `purge_interval` is set
+        assert client.get("/stats/purge").json() is None
+
+    assert not app.ready
+
+
+def test_app_starts_but_isnt_ready_without_its_database(start_app, tmp_path: Path):
+    app = start_app(f"sqlite+aiosqlite:///{tmp_path}/missing/db")
+
+    with TestClient(app) as client:
+        assert client.get("/ready").status_code == 503
+        assert app._warming_up is not None and not app._warming_up.done()
+
+    assert app._warming_up.cancelled()
+
+
+def test_app_becomes_ready_once_its_database_can_be_reached(
+    start_app, tmp_path: Path, event_loop
+):
+    app = start_app(f"sqlite+aiosqlite:///{tmp_path}/later/db")
+    app.warm_up_retry_interval = 0.01
+
+    event_loop.run_until_complete(app.startup())
+    assert not app.ready
+
+    (tmp_path / "later").mkdir()
+    event_loop.run_until_complete(asyncio.wait_for(app._warming_up, 5))
+    assert app.ready
+
+    event_loop.run_until_complete(app.shutdown())
@@ -0,0 +1,118 @@
+from types import SimpleNamespace
+
+import pytest
+
+from blog_app.common.logic import (
+    MAX_BATCH_SIZE,
+    EditType,
+    Unauthorized,
+    handle_create,
+    handle_create_many,
+    handle_edit,
+)
+from blog_app.core import InternalError, ItemNotFoundError, Result
+
+
+@pytest.fixture
+def auth(mocker):
+    auth = mocker.Mock()
+    auth.get_logged_in_user = mocker.AsyncMock(
+        return_value=Result(value=SimpleNamespace(id="author"))
+    )
+    return auth
+
+
+@pytest.fixture
+def loader(mocker):
+    loader = mocker.Mock()
+    loader.model.author_key = "author_id"
+    loader.model.update = mocker.AsyncMock(return_value=Result(value=1))
+    loader.model.delete = mocker.AsyncMock(return_value=Result(value=1))
+    loader.model.load_all = mocker.AsyncMock(return_value=[])
+    loader.model.is_archived = mocker.Mock(return_value=False)
+    return loader
+
+
+@pytest.mark.parametrize("edit", [EditType.UPDATE, EditType.DELETE])
+@pytest.mark.asyncio
+async def test_handle_edit_only_writes(auth, loader, edit: EditType):
+    """Check that a successful edit is one conditional write, with no reads."""
+    result = await handle_edit(5, auth, loader, edit)
+
+    assert result.is_ok
+    getattr(loader.model, edit.value).assert_awaited_once_with(
+        5, where={"author_id": "author"}
+    )
+    loader.load.assert_not_called()
+    loader.model.load_all.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_handle_edit_reports_missing_item(auth, loader):
+    loader.model.update.return_value = Result(value=0)
+
+    result = await handle_edit(5, auth, loader, EditType.UPDATE, content="new")
+
+    assert isinstance(result.collapse(), ItemNotFoundError)
+    loader.model.load_all.assert_awaited_once_with("id", id=5)
+
+
+@pytest.mark.asyncio
+async def test_handle_edit_reports_item_of_another_author(auth, loader):
+    loader.model.delete.return_value = Result(value=0)
+    loader.model.load_all.return_value = [(5,)]
+
+    result = await handle_edit(5, auth, loader, EditType.DELETE)
+
+    assert isinstance(result.collapse(), Unauthorized)
+
+
+@pytest.mark.asyncio
+async def test_handle_edit_reports_archived_item_as_missing(auth, loader):
+    loader.model.update.return_value = Result(value=0)
+    loader.model.load_all.return_value = [(5,)]
+    loader.model.is_archived.return_value = True
+
+    result = await handle_edit(5, auth, loader, EditType.UPDATE, content="new")
+
+    assert isinstance(result.collapse(), ItemNotFoundError)
+
+
+@pytest.mark.asyncio
+async def test_handle_edit_passes_on_write_errors(auth, loader):
+    loader.model.delete.return_value = Result(error=InternalError())
+
+    result = await handle_edit(5, auth, loader, EditType.DELETE)
+
+    assert isinstance(result.collapse(), InternalError)
+    loader.model.load_all.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_handle_create_passes_on_idempotency_keys(auth, loader, mocker):
+    model = loader.model
+    model.create = mocker.AsyncMock(return_value=Result(value=3))
+
+    result = await handle_create(
+        {"title": "hello"}, auth, model, idempotency_key="retry-1"
+    )
+
+    assert result.collapse() == 3
+    model.create.assert_awaited_once_with(
+        on_duplicate_key=None,
+        idempotency_key="retry-1",
+        title="hello",
+        author_id="author",
+    )
+
+
+@pytest.mark.asyncio
+async def test_handle_create_many_refuses_too_many_items(auth, loader, mocker):
+    model = loader.model
+    model.create_many = mocker.AsyncMock(return_value=Result(value=[]))
+
+    with pytest.raises(ValueError, match=f"At most {MAX_BATCH_SIZE}"):
+        await handle_create_many([{}] * (MAX_BATCH_SIZE + 1), auth, model)
+
+    model.create_many.assert_not_awaited()
+    auth.get_logged_in_user.assert_not_awaited()
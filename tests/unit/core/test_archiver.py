@@ -0,0 +1,60 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy.dialects import mysql
+from sqlalchemy.schema import MetaData
+
+from blog_app.core.model import Archiver, register_tables
+
+
+def result(mocker, *ids, rowcount=0):
+    return mocker.Mock(
+        scalars=lambda: mocker.Mock(all=lambda: list(ids)), rowcount=rowcount
+    )
+
+
+def sql_of(call) -> str:
+    return str(call.args[0].compile(dialect=mysql.dialect())).replace("\n", "")
+
+
+@pytest.mark.asyncio
+async def test_archive_moves_each_post_with_its_comments_and_reactions(mocker):
+    model_map = register_tables(MetaData())
+    conn = mocker.AsyncMock()
+    conn.execute.side_effect = [
+        result(mocker, 7),  # posts to archive
+        result(mocker, rowcount=2),  # copy comments
+        result(mocker, rowcount=3),  # copy reactions
+        result(mocker),  # delete reactions
+        result(mocker),  # delete comments
+        result(mocker, rowcount=1),  # copy the post
+        result(mocker),  # delete the post
+    ]
+    model_map["post"].engine = mocker.MagicMock()
+    model_map["post"].engine.connect.return_value.__aenter__.return_value = conn
+
+    archiver = Archiver(
+        model_map["post"],
+        [("post_id", model_map["comment"]), ("comment_id", model_map["reaction"])],
+        chunk_size=10,
+    )
+
+    moved = await archiver.archive(datetime(2020, 1, 1))
+
+    assert moved == {"post": 1, "comment": 2, "reaction": 3}
+    # the post moves with everything beneath it in one transaction
+    conn.commit.assert_awaited_once()
+
+    calls = conn.execute.await_args_list
+    assert sql_of(calls[0]).startswith(
+        "SELECT post.id FROM post WHERE post.created < %s AND post.deleted IS NULL"
+    )
+    assert sql_of(calls[2]) == (
+        "INSERT INTO reaction_archive (id, comment_id, author_id, reaction_type,"
+        " updated) SELECT reaction.id, reaction.comment_id, reaction.author_id,"
+        " reaction.reaction_type, reaction.updated FROM reaction"
+        " WHERE reaction.comment_id IN"
+        " (SELECT comment.id FROM comment WHERE comment.post_id = %s)"
+    )
+    assert sql_of(calls[4]) == "DELETE FROM comment WHERE comment.post_id = %s"
+    assert sql_of(calls[6]) == "DELETE FROM post WHERE post.id = %s"
@@ -0,0 +1,126 @@
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+
+from blog_app.core import InternalError, Result
+from blog_app.core.model import WriteCoalescer
+
+
+class ReactionModelStub:
+    author_key = "author_id"
+
+    def __init__(self, fail_batches: bool = False):
+        self.fail_batches = fail_batches
+        self.batches: List[List[Dict[str, Any]]] = []
+        self.single_rows: List[Dict[str, Any]] = []
+
+    async def create_many(self, rows, *, update_on_duplicate=()):
+        self.batches.append(list(rows))
+        if self.fail_batches:
+            return Result(error=InternalError())
+        return Result(value=[row["comment_id"] * 10 for row in rows])
+
+    async def create(self, on_duplicate_key=None, **values):
+        self.single_rows.append(values)
+        if values["comment_id"] < 0:
+            return Result(error=InternalError())
+        return Result(value=values["comment_id"] * 10)
+
+
+def reaction(comment_id: int):
+    return {"comment_id": comment_id, "reaction_type": "like", "author_id": "a"}
+
+
+async def set_reaction(writer: WriteCoalescer, comment_id: int):
+    values = reaction(comment_id)
+    return await writer.create({"reaction_type": "like"}, **values)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_creates_are_written_together():
+    model = ReactionModelStub()
+    writer = WriteCoalescer(model, window=0.01)  # type: ignore[arg-type]
+
+    results = await asyncio.gather(*(set_reaction(writer, i) for i in range(1, 6)))
+
+    assert [result.collapse() for result in results] == [10, 20, 30, 40, 50]
+    assert model.batches == [[reaction(i) for i in range(1, 6)]]
+    assert model.single_rows == []
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_written_early():
+    model = ReactionModelStub()
+    writer = WriteCoalescer(model, window=60, max_rows=2)  # type: ignore[arg-type]
+
+    results = await asyncio.wait_for(
+        asyncio.gather(set_reaction(writer, 1), set_reaction(writer, 2)), timeout=1
+    )
+
+    assert [result.collapse() for result in results] == [10, 20]
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_retried_row_by_row():
+    model = ReactionModelStub(fail_batches=True)
+    writer = WriteCoalescer(model, window=0.01)  # type: ignore[arg-type]
+
+    ok, failed = await asyncio.gather(set_reaction(writer, 1), set_reaction(writer, -1))
+
+    assert ok.collapse() == 10
+    assert isinstance(failed.collapse(), InternalError)
+    assert model.single_rows == [reaction(1), reaction(-1)]
+
+
+@pytest.mark.asyncio
+async def test_close_writes_waiting_rows():
+    model = ReactionModelStub()
+    writer = WriteCoalescer(model, window=60)  # type: ignore[arg-type]
+
+    pending = asyncio.ensure_future(set_reaction(writer, 1))
+    await asyncio.sleep(0)
+    await asyncio.wait_for(writer.close(), timeout=1)
+
+    assert (await pending).collapse() == 10
+
+
+@pytest.mark.asyncio
+async def test_cancelled_callers_dont_hold_up_their_batch():
+    model = ReactionModelStub()
+    writer = WriteCoalescer(model, window=0.01)  # type: ignore[arg-type]
+
+    cancelled = asyncio.ensure_future(set_reaction(writer, 1))
+    waiting = asyncio.ensure_future(set_reaction(writer, 2))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+
+    assert (await asyncio.wait_for(waiting, timeout=1)).collapse() == 20
+
+
+@pytest.mark.asyncio
+async def test_unexpected_errors_reach_every_caller():
+    model = ReactionModelStub()
+    model.create_many = None  # type: ignore[assignment]
+    writer = WriteCoalescer(model, window=0.01)  # type: ignore[arg-type]
+
+    results = await asyncio.wait_for(
+        asyncio.gather(
+            set_reaction(writer, 1), set_reaction(writer, 2), return_exceptions=True
+        ),
+        timeout=1,
+    )
+
+    assert all(isinstance(result, TypeError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_bound_writers_have_the_request_read_its_write(mocker):
+    session = mocker.Mock(wrote_elsewhere=mocker.AsyncMock())
+    writer = WriteCoalescer(
+        ReactionModelStub(), window=0.01  # type: ignore[arg-type]
+    ).bind(session)
+
+    await set_reaction(writer, 1)
+
+    session.wrote_elsewhere.assert_awaited_once()
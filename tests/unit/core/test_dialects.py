@@ -0,0 +1,131 @@
+from typing import Any, Dict, List
+
+import pytest
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.schema import CreateTable, MetaData
+from sqlalchemy.sql import select
+
+from blog_app.core.model import ReactionType, register_tables
+from blog_app.core.model.dialects import upsert
+from blog_app.core.model.fulltext import MatchAgainst
+from blog_app.database import DatabaseSettings, create_model_map, migrate_tables
+
+
+@pytest.fixture
+def model_map():
+    return register_tables(MetaData())
+
+
+def conn_of(mocker, dialect):
+    return mocker.Mock(dialect=dialect)
+
+
+def test_upsert_updates_on_any_unique_key_in_mysql(model_map, mocker):
+    table = model_map["reaction"].table
+    values = {"comment_id": 1, "author_id": "a", "reaction_type": "like"}
+
+    stmt = upsert(
+        conn_of(mocker, mysql.dialect()),
+        table,
+        values,
+        ["comment_id", "author_id"],
+        lambda inserted: {"reaction_type": inserted["reaction_type"]},
+    )
+
+    assert str(stmt.compile(dialect=mysql.dialect())).endswith(
+        "ON DUPLICATE KEY UPDATE reaction_type = VALUES(reaction_type),"
+        " updated = now()"
+    )
+
+
+def test_upsert_updates_on_conflict_with_the_key_in_sqlite(model_map, mocker):
+    table = model_map["reaction"].table
+    values = {"comment_id": 1, "author_id": "a", "reaction_type": "like"}
+
+    stmt = upsert(
+        conn_of(mocker, sqlite.dialect()),
+        table,
+        values,
+        ["comment_id", "author_id"],
+        lambda inserted: {"reaction_type": inserted["reaction_type"]},
+    )
+
+    assert str(stmt.compile(dialect=sqlite.dialect())).endswith(
+        "ON CONFLICT (comment_id, author_id) DO UPDATE SET"
+        " reaction_type = excluded.reaction_type, updated = CURRENT_TIMESTAMP"
+    )
+
+
+def test_updated_columns_are_kept_current_by_mysql_only(model_map):
+    table = model_map["post"].table
+
+    assert (
+        "updated TIMESTAMP NOT NULL"
+        " DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"
+    ) in str(CreateTable(table).compile(dialect=mysql.dialect()))
+    assert "updated TIMESTAMP DEFAULT (CURRENT_TIMESTAMP) NOT NULL" in str(
+        CreateTable(table).compile(dialect=sqlite.dialect())
+    )
+
+
+def test_match_against_scans_columns_in_sqlite(model_map):
+    table = model_map["post"].table
+    columns: List[Any] = [MatchAgainst(table.c.title, table.c.content, "cats")]
+    stmt = select(*columns)
+
+    assert str(stmt.compile(dialect=sqlite.dialect())).split("\n")[0] == (
+        "SELECT ((instr(lower(coalesce(post.title, '')), lower(?)) > 0)"
+        " + (instr(lower(coalesce(post.content, '')), lower(?)) > 0))"
+        " AS match_against_1 "
+    )
+
+
+@pytest.mark.asyncio
+async def test_models_run_on_sqlite(tmp_path):
+    settings = DatabaseSettings(  # type: ignore[call-arg]
+        connection_url=f"sqlite+aiosqlite:///{tmp_path}/db"
+    )
+    await migrate_tables(settings)
+    model_map = create_model_map(settings)
+    posts, comments = model_map["post"], model_map["comment"]
+    reactions = model_map["reaction"]
+
+    async with posts.engine.connect() as conn:
+        cursor = await conn.exec_driver_sql("PRAGMA journal_mode")
+        assert cursor.scalar() == "wal"
+
+    assert (await posts.create(title="a", author_id="x")).collapse() == 1
+    assert (
+        await posts.create_many([{"title": "b", "author_id": "x"}] * 2)
+    ).collapse() == [2, 3]
+
+    await comments.create(post_id=1, author_id="x", content="c")
+    reaction: Dict[str, Any] = {
+        "comment_id": 1,
+        "author_id": "x",
+        "reaction_type": "like",
+    }
+    assert (await reactions.create(**reaction)).collapse() == 1
+    reaction["reaction_type"] = "smile"
+    upserted = await reactions.create({"reaction_type": "smile"}, **reaction)
+    assert upserted.collapse() == 1
+
+    counts = await reactions.count_all("comment_id", "reaction_type", comment_id=1)
+    assert [tuple(row) for row in counts if row[2]] == [(1, ReactionType.smile, 1)]
+    assert [row.id async for row in posts.stream_all("id", chunk_size=2)] == [1, 2, 3]
+
+    # the posts commented on must be visible
+    assert (await posts.delete(2)).collapse() == 1
+    commented = await comments.create_many(
+        [{"post_id": post_id, "author_id": "x", "content": "c"} for post_id in (3, 2)]
+    )
+    assert commented.is_failed
+    assert (await comments.create(post_id=4, author_id="x", content="c")).is_failed
+
+    # deletes cascade to the comments
+    async with posts.engine.connect() as conn:
+        await conn.execute(posts.table.delete().where(posts.table.c.id == 1))
+        await conn.commit()
+    assert (await comments.load_all("id")) == []
+
+    await posts.engine.dispose()
@@ -0,0 +1,75 @@
+from typing import Any, List
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.dialects import mysql
+from sqlalchemy.dialects.mysql import aiomysql
+from sqlalchemy.schema import MetaData
+from sqlalchemy.sql import select
+
+from blog_app.core.model import ReactionType, register_tables
+from blog_app.core.model.fast_path import IdLoad
+from blog_app.database import DatabaseSettings, create_model_map, migrate_tables
+
+
+@pytest.fixture
+def model_map():
+    return register_tables(MetaData())
+
+
+def test_id_load_compiles_a_statement_for_any_number_of_ids(model_map):
+    model = model_map["comment"]
+    columns: List[Any] = [model.table.c.id, model.table.c.content]
+    load = IdLoad(
+        model._visible(select(*columns)),
+        model.table.c.id,
+        aiomysql.dialect(),  # type: ignore[attr-defined]
+    )
+
+    assert " ".join(load.sql(3).split()) == (
+        "SELECT comment.id, comment.content FROM comment"
+        " WHERE comment.post_id NOT IN"
+        " (SELECT post.id FROM post WHERE post.deleted IS NOT NULL)"
+        " AND (comment.id IN (%s, %s, %s))"
+    )
+
+
+def test_id_load_converts_rows_as_sqlalchemy_would(model_map):
+    model = model_map["reaction"]
+    columns: List[Any] = [model.table.c.id, model.table.c.reaction_type]
+    load = IdLoad(select(*columns), model.table.c.id, mysql.dialect())
+
+    [row] = load.rows([(1, "smile")])
+
+    assert row.reaction_type == ReactionType.smile
+    assert row._asdict() == {"id": 1, "reaction_type": ReactionType.smile}
+
+
+@pytest.mark.asyncio
+async def test_fast_loads_match_the_rows_loaded_through_sqlalchemy(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path}/db"
+    await migrate_tables(DatabaseSettings(connection_url=url))  # type: ignore[call-arg]
+    model_map = create_model_map(
+        DatabaseSettings(connection_url=url, fast_id_loads=True)  # type: ignore[call-arg]
+    )
+    posts = model_map["post"]
+    await posts.create_many(
+        [{"title": f"post {i}", "author_id": "a"} for i in range(5)]
+    )
+    await posts.delete(2)
+    statements: List[str] = []
+    event.listen(
+        posts.engine.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    fast = await posts.load_all("id", "title", id=[1, 2, 3])
+    # run through the engine, so that it's seen by the slow query log
+    assert statements[0] == posts._id_loads[("id", "title"), "sqlite"].sql(3)
+    posts.fast_loads = False
+    core = await posts.load_all("id", "title", id=[1, 2, 3])
+
+    assert [row._asdict() for row in fast] == [row._asdict() for row in core]
+    assert [row.id for row in fast] == [1, 3]
+    await posts.router.dispose()
@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+import pytest
+
+from blog_app.database import DatabaseSettings, create_model_map, migrate_tables
+
+
+@pytest.fixture
+async def model_map(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path}/db"
+    await migrate_tables(DatabaseSettings(connection_url=url))  # type: ignore[call-arg]
+    model_map = create_model_map(
+        DatabaseSettings(connection_url=url, idempotency_key_ttl=60)  # type: ignore[call-arg]
+    )
+    yield model_map
+    await model_map["post"].router.dispose()
+
+
+@pytest.mark.asyncio
+async def test_retried_creates_return_the_first_item(model_map):
+    posts = model_map["post"]
+    post = {"title": "hello", "author_id": "a"}
+
+    first = await posts.create(idempotency_key="k1", **post)
+    retried = await posts.create(idempotency_key="k1", **post)
+    # keys are only unique to their author
+    other = await posts.create(idempotency_key="k1", title="hi", author_id="b")
+
+    assert first.collapse() == retried.collapse() == 1
+    assert other.collapse() == 2
+    assert [row.id for row in await posts.load_all("id")] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_expired_keys_create_another_item(model_map):
+    comments = model_map["comment"]
+    await model_map["post"].create(title="hello", author_id="a")
+    comment = {"post_id": 1, "content": "c", "author_id": "a"}
+
+    assert comments.idempotency
+    # keys expire as soon as they're saved
+    comments.idempotency.ttl = timedelta(0)
+
+    assert (await comments.create(idempotency_key="k", **comment)).collapse() == 1
+    assert (await comments.create(idempotency_key="k", **comment)).collapse() == 2
+
+
+@pytest.mark.asyncio
+async def test_models_without_keys_refuse_them(model_map):
+    await model_map["post"].create(title="hello", author_id="a")
+    await model_map["comment"].create(post_id=1, content="c", author_id="a")
+
+    created = await model_map["reaction"].create(
+        idempotency_key="k", comment_id=1, author_id="a", reaction_type="like"
+    )
+
+    assert not created.is_ok
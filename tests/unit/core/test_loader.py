@@ -0,0 +1,82 @@
+import asyncio
+import gc
+import weakref
+from collections import namedtuple
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.schema import MetaData
+
+from blog_app.core.helpers import Loader
+from blog_app.core.model import register_tables
+from blog_app.posts.types import Post
+
+
+@pytest.mark.asyncio
+async def test_count_dataloader_groups_counts_by_key(mocker):
+    model = register_tables(MetaData())["reaction"]
+    count_all = model.count_all = mocker.AsyncMock(  # type: ignore[assignment]
+        return_value=[(1, "like", 3), (1, "smile", 1), (3, "like", 2)]
+    )
+    loader = Loader(SimpleNamespace, model)
+    dataloader = loader.get_count_dataloader("comment_id", "reaction_type")
+
+    counts = await asyncio.gather(*(dataloader.load(key) for key in (1, 2, 3)))
+    assert counts == [{("like",): 3, ("smile",): 1}, {}, {("like",): 2}]
+
+    # every key is counted in one query
+    count_all.assert_awaited_once_with(
+        "comment_id", "reaction_type", comment_id=[1, 2, 3]
+    )
+
+
+def test_count_dataloaders_are_kept_for_each_loader():
+    model = register_tables(MetaData())["reaction"]
+    loader = Loader(SimpleNamespace, model)
+
+    dataloader = loader.get_count_dataloader("comment_id", "reaction_type")
+
+    assert loader.get_count_dataloader("comment_id", "reaction_type") is dataloader
+    assert loader.get_count_dataloader("comment_id") is not dataloader
+    # a loader is made for each request, and doesn't share its dataloaders
+    other = Loader(SimpleNamespace, model)
+    assert other.get_count_dataloader("comment_id", "reaction_type") is not dataloader
+
+
+def test_page_dataloaders_are_kept_for_each_loader():
+    model = register_tables(MetaData())["comment"]
+    loader = Loader(SimpleNamespace, model)
+
+    dataloader = loader.get_page_dataloader("post_id", ("id", "post_id"))
+
+    assert loader.get_page_dataloader("post_id", ("id", "post_id")) is dataloader
+    assert loader.get_page_dataloader("post_id", None) is not dataloader
+    other = Loader(SimpleNamespace, model)
+    assert other.get_page_dataloader("post_id", ("id", "post_id")) is not dataloader
+
+
+def test_loaders_are_freed_with_their_dataloaders():
+    model = register_tables(MetaData())["comment"]
+    loader = Loader(SimpleNamespace, model)
+    loader.get_group_dataloader("post_id", ("id", "post_id"))
+    loader.get_page_dataloader("post_id", None)
+    loader.get_count_dataloader("post_id")
+    freed = weakref.ref(loader)
+
+    del loader
+    gc.collect()
+
+    assert freed() is None
+
+
+def test_items_are_built_positionally_from_rows_of_any_shape():
+    model = register_tables(MetaData())["post"]
+    loader = Loader(Post, model)
+    Row = namedtuple("Row", ["title", "id"])
+
+    post = loader._build(Row("first", 1))
+
+    assert (post.id, post.title, post.content) == (1, "first", None)
+    assert not hasattr(post, "__dict__")
+    # the mapping of the row's columns is worked out once
+    assert list(loader._builders) == [("title", "id")]
@@ -0,0 +1,201 @@
+from typing import Dict, Set
+
+import pytest
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.schema import MetaData
+
+from blog_app.core.model import register_tables
+from blog_app.core.model.migrations import (
+    MIGRATIONS,
+    AddColumn,
+    AddIndex,
+    CreateTable,
+    RemoveIndex,
+    Schema,
+    plan_migration,
+)
+
+
+@pytest.fixture
+def metadata():
+    metadata = MetaData()
+    register_tables(metadata)
+    return metadata
+
+
+def schema_of(metadata, indexes, version=0) -> Schema:
+    return Schema(metadata, mysql.dialect(), indexes, version)
+
+
+def statements(planned):
+    return [sql for _, sql_list in planned for sql in sql_list]
+
+
+def test_migrations_cover_every_table_and_index(metadata):
+    tables = {}
+    for migration in MIGRATIONS:
+        for step in migration.steps:
+            if isinstance(step, CreateTable):
+                tables[step.name] = set(step.indexes)
+            elif isinstance(step, AddIndex):
+                tables[step.table].add(step.name)
+            elif isinstance(step, RemoveIndex):
+                tables[step.table].remove(step.name)
+            else:
+                assert isinstance(step, AddColumn)
+                assert step.name in metadata.tables[step.table].c
+
+    assert tables == {
+        table.name: {index.name for index in table.indexes}
+        for table in metadata.tables.values()
+    }
+    assert [m.version for m in MIGRATIONS] == list(range(1, len(MIGRATIONS) + 1))
+
+
+def test_plan_migration_creates_an_empty_database(metadata):
+    schema = schema_of(metadata, {})
+
+    planned = plan_migration(schema)
+
+    assert [name for name, _ in planned] == [
+        "schema versions",
+        *(f"{m.version}: {m.name}" for m in MIGRATIONS),
+    ]
+    sql = statements(planned)
+    assert sql[0].startswith("CREATE TABLE schema_version")
+    assert sql[1].startswith("CREATE TABLE post")
+    assert sql[-1] == (
+        f"INSERT INTO schema_version (version, name)"
+        f" VALUES ({MIGRATIONS[-1].version}, '{MIGRATIONS[-1].name}')"
+    )
+    assert schema.version == MIGRATIONS[-1].version
+    assert schema.indexes["post"] == {
+        "ix_post_author_id",
+        "ix_post_created_id",
+        "ix_post_fulltext",
+        "ix_post_deleted",
+    }
+
+
+def test_plan_migration_adds_indexes_online(metadata):
+    schema = schema_of(
+        metadata,
+        {
+            "schema_version": set(),
+            "post": {"ix_post_author_id"},
+            "comment": {"ix_comment_post_id"},
+            "reaction": {"ix_reaction_comment_id"},
+        },
+        version=1,
+    )
+
+    assert statements(plan_migration(schema, 2)) == [
+        "ALTER TABLE post ADD INDEX ix_post_created_id (created, id),"
+        " ALGORITHM=INPLACE, LOCK=NONE",
+        "ALTER TABLE comment ADD INDEX ix_comment_post_id_created_id"
+        " (post_id, created, id), ALGORITHM=INPLACE, LOCK=NONE",
+        "INSERT INTO schema_version (version, name)"
+        " VALUES (2, 'indexes for pagination by creation time')",
+    ]
+
+
+def test_plan_migration_adds_columns_online(metadata):
+    tables: Dict[str, Set[str]] = {
+        table: set() for table in ["schema_version", *metadata.tables]
+    }
+    columns = {"post": {"id", "title", "author_id", "content", "created", "updated"}}
+    schema = Schema(metadata, mysql.dialect(), tables, 4, columns)
+
+    assert statements(plan_migration(schema, 5))[:2] == [
+        "ALTER TABLE post ADD COLUMN deleted TIMESTAMP NULL,"
+        " ALGORITHM=INPLACE, LOCK=NONE",
+        "ALTER TABLE post ADD INDEX ix_post_deleted (deleted),"
+        " ALGORITHM=INPLACE, LOCK=NONE",
+    ]
+    assert statements(plan_migration(schema, 4))[:2] == [
+        "ALTER TABLE post DROP INDEX ix_post_deleted, ALGORITHM=INPLACE, LOCK=NONE",
+        "ALTER TABLE post DROP COLUMN deleted, ALGORITHM=INPLACE, LOCK=NONE",
+    ]
+
+
+def test_plan_migration_drops_covered_indexes_online(metadata):
+    schema = schema_of(metadata, {})
+    plan_migration(schema, 7)
+
+    assert statements(plan_migration(schema, 8))[0] == (
+        "ALTER TABLE comment DROP INDEX ix_comment_post_id,"
+        " ALGORITHM=INPLACE, LOCK=NONE"
+    )
+    assert "ix_comment_post_id" not in {
+        index.name for index in metadata.tables["comment"].indexes
+    }
+    assert statements(plan_migration(schema, 7))[0] == (
+        "ALTER TABLE comment ADD INDEX ix_comment_post_id (post_id),"
+        " ALGORITHM=INPLACE, LOCK=NONE"
+    )
+
+
+def test_plan_migration_uses_plain_ddl_on_sqlite(metadata):
+    tables: Dict[str, Set[str]] = {
+        table: set() for table in ["schema_version", *metadata.tables]
+    }
+    schema = Schema(metadata, sqlite.dialect(), tables, 4, {"post": {"id"}})
+
+    assert statements(plan_migration(schema, 5))[:2] == [
+        "ALTER TABLE post ADD COLUMN deleted TIMESTAMP",
+        "CREATE INDEX ix_post_deleted ON post (deleted)",
+    ]
+    assert statements(plan_migration(schema, 4))[:2] == [
+        "DROP INDEX ix_post_deleted",
+        "ALTER TABLE post DROP COLUMN deleted",
+    ]
+
+
+def test_plan_migration_skips_what_an_unversioned_database_has(metadata):
+    # created by `create_all` before the schema was versioned
+    schema = schema_of(
+        metadata,
+        {
+            table.name: {index.name for index in table.indexes}
+            for table in metadata.tables.values()
+            if table.name != "reaction_count"
+        },
+    )
+
+    sql = statements(plan_migration(schema))
+
+    assert [s for s in sql if not s.startswith("INSERT")] == [
+        sql[0],
+        sql[3],  # the reaction_count table
+    ]
+    assert sql[0].startswith("CREATE TABLE schema_version")
+    assert sql[3].startswith("CREATE TABLE reaction_count")
+
+
+def test_plan_migration_downgrades_in_reverse(metadata):
+    schema = schema_of(metadata, {})
+    plan_migration(schema)
+
+    plan_migration(schema, 4)
+    planned = plan_migration(schema, 2)
+
+    assert [name for name, _ in planned] == [
+        "4: revert full text search indexes",
+        "3: revert comment and reaction counters",
+    ]
+    assert statements(planned) == [
+        "ALTER TABLE comment DROP INDEX ix_comment_fulltext,"
+        " ALGORITHM=INPLACE, LOCK=NONE",
+        "ALTER TABLE post DROP INDEX ix_post_fulltext, ALGORITHM=INPLACE, LOCK=NONE",
+        "DELETE FROM schema_version WHERE schema_version.version = 4",
+        "DROP TABLE reaction_count",
+        "DROP TABLE comment_count",
+        "DELETE FROM schema_version WHERE schema_version.version = 3",
+    ]
+    assert schema.version == 2
+    assert plan_migration(schema, 2) == []
+
+
+def test_plan_migration_rejects_unknown_versions(metadata):
+    with pytest.raises(ValueError):
+        plan_migration(schema_of(metadata, {}), len(MIGRATIONS) + 1)
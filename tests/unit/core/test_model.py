@@ -1,11 +1,19 @@
+from collections import namedtuple
+from decimal import Decimal
 from io import StringIO
-from typing import Any
+from typing import Any, Dict, List
 
 import pytest
-from sqlalchemy.schema import MetaData
+from sqlalchemy.dialects import mysql
+from sqlalchemy.schema import CreateIndex, MetaData
 from sqlalchemy.engine import create_engine
 
 from blog_app.core.model import ModelHelper, register_tables
+from blog_app.database import DatabaseSettings, export_table
+
+
+CountRow = namedtuple("CountRow", ["comment_id", "reaction_type", "count"])
+PostRow = namedtuple("PostRow", ["id", "title"])
 
 
 @pytest.fixture
@@ -43,4 +51,403 @@ def test_register_tables_adds_tables_to_metadata(
 ):
     """Check that register_tables adds the expected tables to the passed metadata obj."""
     register_tables(metadata)
-    assert {table.name for table in metadata.sorted_tables} == expected_table_names
+    assert {table.name for table in metadata.sorted_tables} == {
+        *expected_table_names,
+        "comment_count",
+        "reaction_count",
+        "idempotency_key",
+        *(f"{name}_archive" for name in expected_table_names),
+    }
+
+
+class StreamingResultStub:
+    def __init__(self, rows):
+        self.rows = rows
+        self.partition_sizes = []
+
+    async def partitions(self, size):
+        self.partition_sizes.append(size)
+        for i in range(0, len(self.rows), size):
+            yield self.rows[i : i + size]
+
+
+@pytest.mark.asyncio
+async def test_stream_all_reads_server_side_cursor_in_chunks(metadata, mocker):
+    """Check that stream_all() yields every row from a streamed (unbuffered) result."""
+    rows = list(range(25))
+    result = StreamingResultStub(rows)
+
+    conn = mocker.AsyncMock()
+    conn.stream.return_value = result
+    engine = mocker.MagicMock()
+    engine.connect.return_value.__aenter__.return_value = conn
+
+    model = register_tables(metadata)["post"]
+    model.engine = engine
+
+    assert [row async for row in model.stream_all(chunk_size=10)] == rows
+    assert result.partition_sizes == [10]
+    conn.stream.assert_awaited_once()
+    conn.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_export_refuses_unknown_tables():
+    settings = DatabaseSettings(connection_url="mysql+aiomysql://")  # type: ignore
+
+    with pytest.raises(ValueError, match="export one of post, comment, reaction"):
+        await export_table(settings, "user", StringIO())
+
+
+def mock_connection(engine, conn):
+    engine.connect.return_value.__aenter__.return_value = conn
+
+
+@pytest.mark.asyncio
+async def test_create_many_inserts_rows_in_one_statement(metadata, mocker):
+    """Check that create_many() inserts every row with one multi-row INSERT."""
+    conn = mocker.AsyncMock()
+    conn.execute.return_value = mocker.Mock(lastrowid=10)
+
+    model = register_tables(metadata)["post"]
+    model.engine = mocker.MagicMock()
+    mock_connection(model.engine, conn)
+
+    rows = [{"title": f"post {i}", "content": "", "author_id": "a"} for i in range(3)]
+    result = await model.create_many(rows)
+
+    assert result.collapse() == [10, 11, 12]
+    conn.execute.assert_awaited_once()
+    conn.commit.assert_awaited_once()
+
+    stmt = conn.execute.await_args.args[0]
+    sql = str(stmt.compile(dialect=mysql.dialect()))
+    assert sql.count("(%s, %s, %s)") == 3
+
+
+@pytest.mark.asyncio
+async def test_create_many_upsert_returns_existing_ids(metadata, mocker):
+    """Check that rows updated on a duplicate key report the id of the existing row."""
+    conn = mocker.AsyncMock()
+    conn.execute.side_effect = [
+        mocker.Mock(fetchall=lambda: [(1, "a", 1, "like")]),  # rows being replaced
+        mocker.Mock(),  # counter
+        mocker.Mock(lastrowid=0),
+        mocker.Mock(fetchall=lambda: [(7, 2, "a"), (3, 1, "a")]),
+    ]
+
+    model = register_tables(metadata)["reaction"]
+    model.engine = mocker.MagicMock()
+    mock_connection(model.engine, conn)
+
+    rows = [
+        {"comment_id": 1, "reaction_type": "like", "author_id": "a"},
+        {"comment_id": 2, "reaction_type": "smile", "author_id": "a"},
+    ]
+    result = await model.create_many(rows, update_on_duplicate=["reaction_type"])
+
+    assert result.collapse() == [3, 7]
+    conn.commit.assert_awaited_once()
+
+    upsert = conn.execute.await_args_list[2].args[0]
+    sql = str(upsert.compile(dialect=mysql.dialect()))
+    assert "ON DUPLICATE KEY UPDATE reaction_type = VALUES(reaction_type)" in sql
+
+
+@pytest.mark.asyncio
+async def test_create_many_counts_changed_reaction_types(metadata, mocker):
+    """Check that the counts follow reactions which are replaced by another type."""
+    conn = mocker.AsyncMock()
+    conn.execute.side_effect = [
+        # the reaction by "a" on comment 1 is a smile
+        mocker.Mock(fetchall=lambda: [(1, "a", 1, "smile")]),
+        mocker.Mock(),  # counter
+        mocker.Mock(lastrowid=0),
+        mocker.Mock(fetchall=lambda: [(3, 1, "a"), (4, 2, "a")]),
+    ]
+
+    model = register_tables(metadata)["reaction"]
+    model.engine = mocker.MagicMock()
+    mock_connection(model.engine, conn)
+
+    rows = [
+        {"comment_id": 1, "reaction_type": "like", "author_id": "a"},
+        {"comment_id": 2, "reaction_type": "smile", "author_id": "a"},
+        {"comment_id": 2, "reaction_type": "like", "author_id": "a"},
+    ]
+    result = await model.create_many(rows, update_on_duplicate=["reaction_type"])
+    assert result.collapse() == [3, 4, 4]
+
+    lock, count = (call.args[0] for call in conn.execute.await_args_list[:2])
+    assert str(lock.compile(dialect=mysql.dialect())).endswith("FOR UPDATE")
+
+    params = count.compile(dialect=mysql.dialect()).params
+    changes = [
+        tuple(params[f"{col}_m{i}"] for col in ("comment_id", "reaction_type", "count"))
+        for i in range(3)
+    ]
+    assert sorted(changes) == [(1, "like", 1), (1, "smile", -1), (2, "like", 1)]
+
+
+@pytest.mark.asyncio
+async def test_create_many_without_rows_skips_database(metadata, mocker):
+    model = register_tables(metadata)["post"]
+    model.engine = mocker.MagicMock()
+
+    assert (await model.create_many([])).collapse() == []
+    model.engine.connect.assert_not_called()
+
+
+def test_select_rows_reuses_statement_for_each_shape(metadata):
+    """Check that queries of the same shape share a statement, whatever the values."""
+    model = register_tables(metadata)["comment"]
+
+    stmt, params = model._select_rows(("id", "content"), {"post_id": [1, 2]})
+    same_stmt, other_params = model._select_rows(
+        ("id", "content"), {"post_id": [3, 4, 5]}
+    )
+    assert stmt is same_stmt
+    assert params == {"where_post_id": [1, 2]}
+    assert other_params == {"where_post_id": [3, 4, 5]}
+
+    single_stmt, single_params = model._select_rows(("id", "content"), {"post_id": 3})
+    assert single_stmt is not stmt
+    assert single_params == {"where_post_id": 3}
+
+    sql = str(stmt.compile(dialect=mysql.dialect())).replace("\n", "")
+    assert "AND comment.post_id IN ([POSTCOMPILE_where_post_id])" in sql
+
+
+def test_select_rows_orders_rows_by_id(metadata):
+    """Check that rows come in id order, whichever index the query uses."""
+    model = register_tables(metadata)["comment"]
+
+    wheres: List[Dict[str, Any]] = [
+        {"post_id": [1, 2]},
+        {"post_id": model.select_ids(id=1)},
+    ]
+    for where in wheres:
+        stmt, _ = model._select_rows(("id",), where)
+        sql = str(stmt.compile(dialect=mysql.dialect())).replace("\n", "")
+        assert sql.endswith("ORDER BY comment.id")
+
+
+def test_select_rows_ignores_unknown_columns(metadata):
+    model = register_tables(metadata)["post"]
+
+    stmt, params = model._select_rows((), {"id": 1, "not_a_column": 2})
+    assert params == {"where_id": 1}
+
+
+@pytest.mark.asyncio
+async def test_count_all_counts_each_group(metadata, mocker):
+    conn = mocker.AsyncMock()
+    conn.execute.return_value = mocker.Mock(fetchall=lambda: [(1, "like", 3)])
+
+    model = register_tables(metadata)["reaction"]
+    model.engine = mocker.MagicMock()
+    mock_connection(model.engine, conn)
+
+    assert await model.count_all("author_id", comment_id=[1, 2]) == [(1, "like", 3)]
+
+    stmt = conn.execute.await_args.args[0]
+    sql = str(stmt.compile(dialect=mysql.dialect())).replace("\n", "")
+    assert sql.startswith("SELECT reaction.author_id, count(*) AS count")
+    assert sql.endswith("GROUP BY reaction.author_id")
+
+
+@pytest.mark.asyncio
+async def test_count_all_reads_counter_table(metadata, mocker):
+    conn = mocker.AsyncMock()
+    conn.execute.return_value = mocker.Mock(
+        fetchall=lambda: [CountRow(1, "like", 2), CountRow(2, "smile", 1)]
+    )
+
+    model = register_tables(metadata)["reaction"]
+    model.engine = mocker.MagicMock()
+    mock_connection(model.engine, conn)
+
+    await model.count_all("comment_id", "reaction_type", comment_id=[1, 2])
+
+    stmt = conn.execute.await_args.args[0]
+    sql = str(stmt.compile(dialect=mysql.dialect())).replace("\n", "")
+    assert sql.startswith(
+        "SELECT reaction_count.comment_id, reaction_count.reaction_type,"
+        " reaction_count.count FROM reaction_count"
+    )
+    assert "GROUP BY" not in sql
+
+
+@pytest.mark.asyncio
+async def test_count_all_counts_archived_rows(metadata, mocker):
+    model = register_tables(metadata)["reaction"]
+    archived = [CountRow(2, "like", 5)]
+    model.engine = mocker.MagicMock()
+    mock_connection(
+        model.engine,
+        mocker.AsyncMock(
+            execute=mocker.AsyncMock(return_value=mocker.Mock(fetchall=lambda: []))
+        ),
+    )
+    count_archived = mocker.AsyncMock(return_value=archived)
+    assert model.archive
+    model.archive.count_all = count_archived  # type: ignore
+
+    # the reactions of comments that aren't known to be archived aren't
+    # looked for in the archive
+    assert await model.count_all("comment_id", "reaction_type", comment_id=[1]) == []
+    count_archived.assert_not_awaited()
+
+    model.archived.add("comment", [2])
+    rows = await model.count_all("comment_id", "reaction_type", comment_id=[1, 2])
+
+    assert rows == archived
+    count_archived.assert_awaited_once_with(
+        "comment_id", "reaction_type", comment_id=[2]
+    )
+
+
+@pytest.mark.asyncio
+async def test_load_all_falls_back_to_archive(metadata, mocker):
+    model = register_tables(metadata)["post"]
+    conn = mocker.AsyncMock()
+    conn.execute.return_value = mocker.Mock(fetchall=lambda: [PostRow(1, "hot")])
+    model.engine = mocker.MagicMock()
+    mock_connection(model.engine, conn)
+    assert model.archive
+    archive_conn = mocker.AsyncMock()
+    archive_conn.execute.return_value = mocker.Mock(
+        fetchall=lambda: [PostRow(3, "cold")]
+    )
+    model.archive.engine = mocker.MagicMock()
+    mock_connection(model.archive.engine, archive_conn)
+
+    rows = await model.load_all("id", "title", id=[1, 2, 3])
+
+    assert rows == [PostRow(1, "hot"), PostRow(3, "cold")]
+    stmt, params = archive_conn.execute.await_args.args
+    assert str(stmt).startswith("SELECT post_archive.id, post_archive.title")
+    assert params == {"where_id": [2, 3]}
+    assert model.is_archived(3) and not model.is_archived(1)
+
+    # rows filtered on other columns are never looked for in the archive
+    await model.load_all("id", author_id="a")
+    assert archive_conn.execute.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_delete_counts_deleted_row(metadata, mocker):
+    conn = mocker.AsyncMock()
+    conn.execute.return_value.fetchall = lambda: [(4,)]
+    conn.execute.return_value.rowcount = 1
+
+    model = register_tables(metadata)["comment"]
+    model.engine = mocker.MagicMock()
+    mock_connection(model.engine, conn)
+
+    assert (await model.delete(9, where={"author_id": "a"})).collapse() == 1
+
+    lock, count, delete = (call.args[0] for call in conn.execute.await_args_list)
+    assert lock.compile().params == {"id_1": 9, "author_id_1": "a"}
+    assert count.compile(dialect=mysql.dialect()).params == {
+        "post_id_m0": 4,
+        "count_m0": -1,
+    }
+    conn.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_delete_hides_soft_deleted_row(metadata, mocker):
+    conn = mocker.AsyncMock()
+    conn.execute.return_value.rowcount = 1
+
+    model = register_tables(metadata)["post"]
+    model.engine = mocker.MagicMock()
+    mock_connection(model.engine, conn)
+
+    assert (await model.delete(9, where={"author_id": "a"})).collapse() == 1
+
+    stmt = conn.execute.await_args.args[0]
+    sql = str(stmt.compile(dialect=mysql.dialect())).replace("\n", "")
+    assert sql == (
+        "UPDATE post SET updated=now(), deleted=now() WHERE post.id = %s"
+        " AND post.author_id = %s AND post.deleted IS NULL"
+    )
+
+
+def test_select_rows_leaves_out_hidden_rows(metadata):
+    model_map = register_tables(metadata)
+
+    post_stmt, _ = model_map["post"]._select_rows((), {"id": 1})
+    comment_stmt, _ = model_map["comment"]._select_rows(("id",), {"id": 1})
+    reaction_stmt, _ = model_map["reaction"]._select_rows(("id",), {"id": 1})
+
+    post_sql = str(post_stmt.compile(dialect=mysql.dialect())).replace("\n", "")
+    assert post_sql.startswith(
+        "SELECT post.id, post.title, post.author_id, post.content, post.created,"
+        " post.updated FROM post WHERE post.deleted IS NULL"
+    )
+    assert "comment.post_id NOT IN (SELECT post.id FROM post"
+    " WHERE post.deleted IS NOT NULL)" in str(comment_stmt).replace("\n", "")
+    # reactions are only reached through their comments
+    assert "NOT IN" not in str(reaction_stmt)
+
+
+@pytest.mark.asyncio
+async def test_rebuild_counter_recounts_in_chunks(metadata, mocker):
+    conn = mocker.AsyncMock()
+    conn.execute.side_effect = [
+        mocker.Mock(one=lambda: (3, 250)),  # post ids of comments
+        mocker.Mock(one=lambda: (None, None)),  # empty counter table
+        *(mocker.Mock() for _ in range(6)),
+    ]
+
+    model = register_tables(metadata)["comment"]
+    model.engine = mocker.MagicMock()
+    mock_connection(model.engine, conn)
+
+    assert await model.rebuild_counter(chunk_size=100) == 3
+    assert conn.commit.await_count == 3
+
+    delete, recount = (call.args[0] for call in conn.execute.await_args_list[-2:])
+    assert delete.compile().params == {"post_id_1": 203, "post_id_2": 302}
+    assert str(recount.compile(dialect=mysql.dialect())).startswith(
+        "INSERT INTO comment_count (post_id, count) SELECT comment.post_id, count(*)"
+    )
+
+
+@pytest.mark.asyncio
+async def test_load_matches_ranks_by_relevance_after_cursor(metadata, mocker):
+    conn = mocker.AsyncMock()
+    conn.execute.return_value = mocker.Mock(fetchall=lambda: [])
+
+    model = register_tables(metadata)["post"]
+    model.engine = mocker.MagicMock()
+    mock_connection(model.engine, conn)
+
+    await model.load_matches("cats", after=(Decimal("0.5"), 4), limit=10)
+
+    stmt = conn.execute.await_args.args[0]
+    compiled = stmt.compile(dialect=mysql.dialect())
+    sql = str(compiled).replace("\n", "")
+    match = "MATCH (post.title, post.content) AGAINST (%s IN NATURAL LANGUAGE MODE)"
+    score = f"CAST({match} AS DECIMAL(20, 10))"
+
+    assert (
+        f"WHERE {match} > %s AND post.deleted IS NULL"
+        f" AND ({score} < %s OR {score} = %s AND post.id > %s)" in sql
+    )
+    assert sql.endswith(f"ORDER BY score DESC, post.id  LIMIT %s")
+    assert compiled.params["match_against_1"] == "cats"
+
+
+def test_register_tables_declares_fulltext_indexes(metadata):
+    register_tables(metadata)
+    ddl = "\n".join(
+        str(CreateIndex(index).compile(dialect=mysql.dialect()))
+        for table in metadata.sorted_tables
+        for index in table.indexes
+    )
+
+    assert "FULLTEXT INDEX ix_post_fulltext ON post (title, content)" in ddl
+    assert "FULLTEXT INDEX ix_comment_fulltext ON comment (content)" in ddl
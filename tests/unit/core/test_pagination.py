@@ -0,0 +1,116 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.dialects import mysql
+from sqlalchemy.schema import MetaData
+
+from blog_app.core.helpers.pagination import (
+    CollectionOrder,
+    IdOrder,
+    PageRequest,
+    decode_cursor,
+    encode_cursor,
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+)
+from blog_app.core.model import register_tables
+from blog_app.core.model.model_helper import ModelHelper, PageSpec
+from blog_app.search.types import SearchOrder
+
+
+@pytest.fixture
+def model_map():
+    return register_tables(MetaData())
+
+
+def compile_sql(stmt) -> str:
+    return str(stmt.compile(dialect=mysql.dialect())).replace("\n", "")
+
+
+@pytest.mark.parametrize(
+    "order,values",
+    [
+        (CollectionOrder.ID, (10,)),
+        (CollectionOrder.ID_DESC, (7,)),
+        (CollectionOrder.CREATED, (datetime(2021, 3, 8, 17, 24, 10), 3)),
+        (CollectionOrder.CREATED_DESC, (datetime(2020, 1, 1), 1)),
+    ],
+)
+def test_cursor_round_trip(order: CollectionOrder, values):
+    """Check that a cursor decodes to the values it was encoded from."""
+    assert decode_cursor(encode_cursor(order, values), order) == values
+
+
+def test_cursor_keeps_decimals_exact():
+    values = (Decimal("0.1234567891"), "post", 3)
+    cursor = encode_cursor(SearchOrder.RELEVANCE, values)
+    assert decode_cursor(cursor, SearchOrder.RELEVANCE) == values
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not a cursor",
+        "bm90IGpzb24=",
+        "",
+        # ["id", 4]
+        "WyJpZCIsIDRd",
+        # ["id", [{"dt": 5}]]
+        "WyJpZCIsIFt7ImR0IjogNX1dXQ==",
+    ],
+)
+def test_decode_invalid_cursor_raises_value_error(cursor: str):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, CollectionOrder.ID)
+
+
+def test_id_orders_are_collection_orders():
+    assert [order.collection_order for order in IdOrder] == [
+        CollectionOrder.ID,
+        CollectionOrder.ID_DESC,
+    ]
+
+
+def test_page_request_defaults():
+    request = PageRequest.parse()
+    assert request.first == DEFAULT_PAGE_SIZE
+    assert request.after is None
+    assert request.order == CollectionOrder.ID
+
+
+def test_page_request_enforces_max_page_size():
+    assert PageRequest.parse(first=MAX_PAGE_SIZE * 10).first == MAX_PAGE_SIZE
+
+
+def test_page_statement_uses_keyset_and_limit(model_map):
+    """Check that pages are loaded with an ordered range query, not an offset."""
+    spec = PageSpec(
+        where={},
+        order_by=CollectionOrder.CREATED.columns,
+        after=(datetime(2021, 1, 1), 5),
+        limit=21,
+    )
+    sql = compile_sql(model_map["post"]._page_statement([], spec))
+
+    assert "post.created > %s OR post.created = %s AND post.id > %s" in sql
+    assert "ORDER BY post.created, post.id" in sql
+    assert "LIMIT %s" in sql
+    assert "OFFSET" not in sql
+    assert "count(" not in sql.lower()
+
+
+def test_page_statement_rejects_unknown_order_columns(model_map):
+    spec = PageSpec(where={}, order_by=CollectionOrder.CREATED.columns)
+
+    with pytest.raises(ValueError):
+        model_map["reaction"]._page_statement([], spec)
+
+
+def test_page_rounds_split_pages_with_same_key():
+    pages = [
+        PageSpec(where={"post_id": 1}, order_by=("id",)),
+        PageSpec(where={"post_id": 2}, order_by=("id",)),
+        PageSpec(where={"post_id": 1}, order_by=("id",), limit=5),
+    ]
+    assert ModelHelper._page_rounds(pages) == [[0, 1], [2]]
@@ -0,0 +1,122 @@
+from collections import namedtuple
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+import pytest
+from graphql import (
+    GraphQLArgument,
+    GraphQLField,
+    GraphQLInt,
+    GraphQLList,
+    GraphQLNonNull,
+    GraphQLObjectType,
+    parse,
+)
+from graphql.language import FieldNode, OperationDefinitionNode
+from sqlalchemy.schema import MetaData
+
+from blog_app.comments.types import Comment, COMMENT_FIELD_COLUMNS
+from blog_app.core.helpers import Loader, NestedCollection, QueryPlanner
+from blog_app.core.model import register_tables
+from blog_app.posts.types import Post, POST_FIELD_COLUMNS
+
+
+PostRow = namedtuple("PostRow", ["id", "title"])
+CommentRow = namedtuple("CommentRow", ["id", "post_id"])
+
+COLLECTION_TYPE = GraphQLObjectType(
+    "PostCollection",
+    {
+        "allItems": GraphQLField(GraphQLList(GraphQLInt)),
+        "byId": GraphQLField(
+            GraphQLList(GraphQLInt),
+            args={"ids": GraphQLArgument(GraphQLNonNull(GraphQLList(GraphQLInt)))},
+        ),
+    },
+)
+
+
+@dataclass
+class ResolveInfoStub:
+    field_nodes: List[FieldNode]
+    fragments: Dict[str, Any] = field(default_factory=dict)
+    return_type: Any = GraphQLNonNull(COLLECTION_TYPE)
+    variable_values: Dict[str, Any] = field(default_factory=dict)
+
+
+def posts_info(query: str, **variables) -> ResolveInfoStub:
+    operation = parse(query).definitions[0]
+    assert isinstance(operation, OperationDefinitionNode)
+    node: Any = operation.selection_set.selections[0]
+    return ResolveInfoStub(field_nodes=[node], variable_values=variables)
+
+
+@pytest.fixture
+def loaders(mocker):
+    model_map = register_tables(MetaData())
+    loaders = (
+        Loader(Post, model_map["post"], POST_FIELD_COLUMNS),
+        Loader(Comment, model_map["comment"], COMMENT_FIELD_COLUMNS),
+    )
+    for loader, rows in zip(
+        loaders,
+        [
+            [PostRow(1, "one"), PostRow(2, "two")],
+            [CommentRow(10, 1), CommentRow(11, 1)],
+        ],
+    ):
+        loader.model.load_all = mocker.AsyncMock(return_value=rows)  # type: ignore
+
+    return loaders
+
+
+@pytest.fixture
+def planner(loaders):
+    post_loader, comment_loader = loaders
+    return QueryPlanner(
+        post_loader, {"comments": NestedCollection(comment_loader, "post_id")}
+    )
+
+
+@pytest.mark.asyncio
+async def test_prefetch_loads_nested_collections_up_front(loaders, planner):
+    post_loader, comment_loader = loaders
+    info = posts_info("{ posts { allItems { title comments { allItems { id } } } } }")
+
+    await planner.prefetch(info)
+
+    post_loader.model.load_all.assert_awaited_once_with("id", "title")
+    # every comment belongs to one of all the posts
+    comment_loader.model.load_all.assert_awaited_once_with("id", "post_id")
+
+    posts = list(await post_loader.all(("id", "title")))
+    assert [post.title for post in posts] == ["one", "two"]
+
+    comments = comment_loader.get_group_dataloader("post_id", ("id", "post_id"))
+    assert [comment.id for comment in await comments.load(1)] == [10, 11]
+    assert await comments.load(2) == []
+
+    # nothing more is loaded while resolving
+    assert post_loader.model.load_all.await_count == 1
+    assert comment_loader.model.load_all.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_prefetch_filters_nested_collections_by_parent_ids(loaders, planner):
+    post_loader, comment_loader = loaders
+    info = posts_info(
+        "query ($ids: [Int]!) { posts { byId(ids: $ids) { id comments {"
+        " allItems { id } page { edges { node { id } } } } } } }",
+        ids=[1, 2, 3],
+    )
+
+    await planner.prefetch(info)
+
+    comment_loader.model.load_all.assert_awaited_once_with(
+        "id", "post_id", post_id=[1, 2, 3]
+    )
+
+    posts = post_loader.get_dataloader("id", ("id",))
+    assert (await posts.load(1)).id == 1
+    assert await posts.load(3) is None
+    assert post_loader.model.load_all.await_count == 1
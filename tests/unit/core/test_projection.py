@@ -0,0 +1,90 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+import pytest
+from graphql import parse
+from graphql.language import FieldNode, FragmentDefinitionNode, OperationDefinitionNode
+from sqlalchemy.schema import MetaData
+
+from blog_app.core.helpers import Loader, get_selection
+from blog_app.core.model import register_tables
+from blog_app.posts.types import Post, POST_FIELD_COLUMNS
+
+
+@dataclass
+class ResolveInfoStub:
+    field_nodes: List[FieldNode]
+    fragments: Dict[str, Any] = field(default_factory=dict)
+
+
+def info_for(query: str, *path: str) -> ResolveInfoStub:
+    """Build resolve info for the field at `path` in the query."""
+    document = parse(query)
+    operation = next(
+        d for d in document.definitions if isinstance(d, OperationDefinitionNode)
+    )
+    fragments = {
+        d.name.value: d
+        for d in document.definitions
+        if isinstance(d, FragmentDefinitionNode)
+    }
+
+    nodes: Any = operation.selection_set.selections
+    for name in path:
+        node = next(n for n in nodes if n.name.value == name)
+        nodes = node.selection_set.selections if node.selection_set else []
+
+    return ResolveInfoStub(field_nodes=[node], fragments=fragments)
+
+
+@pytest.fixture
+def post_loader():
+    model = register_tables(MetaData())["post"]
+    return Loader(constructor=Post, model=model, field_columns=POST_FIELD_COLUMNS)
+
+
+def test_get_selection_returns_selected_fields():
+    info = info_for(
+        "{ posts { allItems { id title __typename } } }", "posts", "allItems"
+    )
+    assert get_selection(info) == {"id", "title"}
+
+
+def test_get_selection_follows_path_and_fragments():
+    info = info_for(
+        """
+        {
+            posts {
+                page {
+                    edges { node { ...PostTitle ... on Post { authorId } } }
+                    pageInfo { hasNextPage }
+                }
+            }
+        }
+        fragment PostTitle on Post { title }
+        """,
+        "posts",
+        "page",
+    )
+    assert get_selection(info, "edges", "node") == {"title", "authorId"}
+
+
+def test_get_selection_without_field_nodes_is_unknown():
+    assert get_selection(object()) is None
+
+
+def test_project_maps_fields_to_columns(post_loader: Loader):
+    assert post_loader.project(frozenset({"title", "author"})) == (
+        "author_id",
+        "id",
+        "title",
+    )
+
+
+def test_project_includes_required_columns(post_loader: Loader):
+    assert post_loader.project(frozenset(), "created") == ("created", "id")
+
+
+@pytest.mark.parametrize("selection", [None, frozenset({"title", "somethingNew"})])
+def test_project_loads_everything_when_unsure(post_loader: Loader, selection):
+    assert post_loader.project(selection) is None
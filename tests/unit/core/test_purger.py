@@ -0,0 +1,91 @@
+import pytest
+from sqlalchemy.dialects import mysql
+from sqlalchemy.schema import MetaData
+
+from blog_app.core.model import Purger, register_tables
+
+
+def result(mocker, *rows):
+    return mocker.Mock(
+        scalar=lambda: len(rows),
+        scalars=lambda: mocker.Mock(all=lambda: list(rows)),
+        rowcount=1,
+    )
+
+
+def sql_of(call) -> str:
+    return str(call.args[0].compile(dialect=mysql.dialect())).replace("\n", "")
+
+
+@pytest.fixture
+def model_map():
+    return register_tables(MetaData())
+
+
+@pytest.mark.asyncio
+async def test_purge_deletes_nested_rows_in_chunks(model_map, mocker):
+    conn = mocker.AsyncMock()
+    conn.execute.side_effect = [
+        result(mocker, 7),  # count of deleted posts
+        result(mocker, 7),  # their ids
+        result(mocker, 1, 2),  # reactions of the post's comments
+        result(mocker),  # delete them
+        result(mocker, 3),
+        result(mocker),
+        result(mocker),  # no reactions left
+        result(mocker, 4, 5),  # comments of the post
+        result(mocker),
+        result(mocker),  # no comments left
+        result(mocker),  # delete the post
+        result(mocker),  # no deleted posts left
+        result(mocker),
+    ]
+    model_map["post"].engine = mocker.MagicMock()
+    model_map["post"].engine.connect.return_value.__aenter__.return_value = conn
+
+    purger = Purger(
+        model_map["post"],
+        [("post_id", model_map["comment"]), ("comment_id", model_map["reaction"])],
+        chunk_size=2,
+    )
+
+    assert await purger.purge() == 1
+    assert purger.progress() == {
+        "pending": 0,
+        "purging": None,
+        "purged": {"post": 1, "comment": 2, "reaction": 3},
+    }
+    # every chunk, and then the post, is committed on its own
+    assert conn.commit.await_count == 4
+
+    calls = conn.execute.await_args_list
+    assert sql_of(calls[2]) == (
+        "SELECT reaction.id FROM reaction WHERE reaction.comment_id IN"
+        " (SELECT comment.id FROM comment WHERE comment.post_id = %s)  LIMIT %s"
+    )
+    assert calls[3].args[0].compile().params == {"id_1": [1, 2]}
+    assert sql_of(calls[10]) == (
+        "DELETE FROM post WHERE post.id = %s AND post.deleted IS NOT NULL"
+    )
+
+
+@pytest.mark.asyncio
+async def test_purge_leaves_rows_claimed_by_other_processes(model_map, mocker):
+    conn = mocker.AsyncMock()
+    conn.dialect.name = "mysql"
+    conn.execute.side_effect = [
+        result(mocker, 7),  # count of deleted posts
+        result(mocker, 7),  # their ids
+    ]
+    # another process holds the lock of post 7
+    conn.exec_driver_sql.return_value = mocker.Mock(scalar=lambda: 0)
+    model_map["post"].engine = mocker.MagicMock()
+    model_map["post"].engine.connect.return_value.__aenter__.return_value = conn
+
+    purger = Purger(model_map["post"], [("post_id", model_map["comment"])])
+
+    assert await purger.purge() == 0
+    conn.exec_driver_sql.assert_awaited_once_with(
+        "SELECT GET_LOCK(%s, 0)", ("purge:post:7",)
+    )
+    conn.commit.assert_not_awaited()
@@ -0,0 +1,196 @@
+import asyncio
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+
+from blog_app.core.model import EngineRouter, RequestSession, SqlStats
+from blog_app.core.model.stats import TrackedConnection
+
+
+class ConnectionStub:
+    def __init__(self, log: List[str]):
+        self.log = log
+
+    async def start(self):
+        self.log.append("connect")
+        return self
+
+    async def exec_driver_sql(self, sql: str):
+        self.log.append(sql)
+
+    async def execute(self, stmt: str):
+        self.log.append(stmt)
+
+    async def commit(self):
+        self.log.append("commit")
+
+    async def rollback(self):
+        self.log.append("rollback")
+
+    async def close(self):
+        self.log.append("close")
+
+
+class EngineStub:
+    dialect = SimpleNamespace(name="mysql")
+
+    def __init__(self, checked_out: int = 0):
+        self.log: List[str] = []
+        self.sync_engine = SimpleNamespace(
+            pool=SimpleNamespace(checkedout=lambda: checked_out)
+        )
+
+    def connect(self):
+        return ConnectionStub(self.log)
+
+
+START_READ = "START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY"
+
+
+@pytest.fixture
+def engine():
+    return EngineStub()
+
+
+@pytest.mark.asyncio
+async def test_session_connects_lazily(engine: EngineStub):
+    session = RequestSession(EngineRouter(engine))
+    await session.close()
+
+    assert engine.log == []
+
+
+@pytest.mark.asyncio
+async def test_reads_share_one_connection_and_transaction(engine: EngineStub):
+    session = RequestSession(EngineRouter(engine))
+
+    async def read(stmt: str):
+        async with session.read() as conn:
+            await conn.execute(stmt)
+
+    await asyncio.gather(read("a"), read("b"), read("c"))
+    await session.close()
+
+    assert engine.log[:2] == ["connect", START_READ]
+    assert sorted(engine.log[2:5]) == ["a", "b", "c"]
+    assert engine.log[5:] == ["close"]
+
+
+@pytest.mark.asyncio
+async def test_session_tallies_sql_in_stats(engine: EngineStub):
+    stats = SqlStats()
+    session = RequestSession(EngineRouter(engine), stats=stats)
+
+    async with session.read() as conn:
+        assert isinstance(conn, TrackedConnection) and conn.stats is stats
+    async with session.write() as conn:
+        assert isinstance(conn, TrackedConnection) and conn.stats is stats
+    await session.close()
+
+
+@pytest.mark.asyncio
+async def test_write_ends_read_transaction(engine: EngineStub):
+    session = RequestSession(EngineRouter(engine))
+
+    async with session.read() as conn:
+        await conn.execute("select")
+    async with session.write() as conn:
+        await conn.execute("insert")
+        await conn.commit()
+    async with session.read() as conn:
+        await conn.execute("select")
+
+    assert engine.log == [
+        "connect",
+        START_READ,
+        "select",
+        "rollback",
+        "insert",
+        "commit",
+        START_READ,
+        "select",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_failed_write_is_rolled_back(engine: EngineStub):
+    session = RequestSession(EngineRouter(engine))
+
+    with pytest.raises(RuntimeError):
+        async with session.write() as conn:
+            await conn.execute("insert")
+            raise RuntimeError()
+
+    assert engine.log == ["connect", "insert", "rollback"]
+
+
+@pytest.fixture
+def replicas():
+    return [EngineStub(checked_out=2), EngineStub(), EngineStub()]
+
+
+def test_router_reads_from_least_busy_replicas_in_turn(
+    engine: EngineStub, replicas: List[EngineStub]
+):
+    router = EngineRouter(engine, replicas)
+
+    assert [router.reader() for _ in range(4)] == [
+        replicas[1],
+        replicas[1],
+        replicas[2],
+        replicas[1],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_session_reads_from_primary_after_write(
+    engine: EngineStub, replicas: List[EngineStub]
+):
+    router = EngineRouter(engine, replicas)
+    session = RequestSession(router, sticky_key="client")
+
+    async with session.read() as conn:
+        await conn.execute("select")
+    async with session.write() as conn:
+        await conn.execute("insert")
+        await conn.commit()
+    async with session.read() as conn:
+        await conn.execute("select")
+    await session.close()
+
+    assert replicas[1].log == ["connect", START_READ, "select", "close"]
+    assert engine.log == [
+        "connect",
+        "insert",
+        "commit",
+        START_READ,
+        "select",
+        "close",
+    ]
+
+    # the client keeps reading from the primary for a while,
+    assert router.reader("client") is engine
+    # unlike other clients.
+    assert router.reader("other client") in replicas
+
+    router.sticky_window = 0
+    assert router.reader("client") in replicas
+
+
+@pytest.mark.asyncio
+async def test_writes_made_elsewhere_are_read_from_the_primary(
+    engine: EngineStub, replicas: List[EngineStub]
+):
+    router = EngineRouter(engine, replicas)
+    session = RequestSession(router, sticky_key="client")
+
+    async with session.read() as conn:
+        await conn.execute("select")
+    await session.wrote_elsewhere()
+    async with session.read() as conn:
+        await conn.execute("select")
+    await session.close()
+
+    assert replicas[1].log == ["connect", START_READ, "select", "close"]
+    assert engine.log == ["connect", START_READ, "select", "close"]
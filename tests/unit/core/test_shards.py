@@ -0,0 +1,162 @@
+import asyncio
+
+import pytest
+
+from blog_app.core.model import RequestSession, ShardedSession, bind_model_map
+from blog_app.core.model.model_helper import PageSpec
+from blog_app.core.model.shards import routers_of
+from blog_app.database import (
+    DatabaseSettings,
+    check_shard_ids,
+    create_model_map,
+    dispose_engines,
+    migrate_tables,
+)
+
+
+@pytest.fixture
+def settings(tmp_path):
+    return DatabaseSettings(  # type: ignore[call-arg]
+        connection_url=f"sqlite+aiosqlite:///{tmp_path}/shard0",
+        shard_urls=[f"sqlite+aiosqlite:///{tmp_path}/shard1"],
+        shard_slots=4,
+    )
+
+
+@pytest.fixture
+async def model_map(settings):
+    await migrate_tables(settings)
+    model_map = create_model_map(settings)
+    yield model_map
+    await dispose_engines(model_map)
+
+
+async def _create_posts(model_map):
+    # authors "d" and "a" are placed on shards 0 and 1
+    posts = model_map["post"]
+    return (
+        await posts.create_many(
+            [
+                {"title": "d1", "author_id": "d"},
+                {"title": "a1", "author_id": "a"},
+                {"title": "d2", "author_id": "d"},
+            ]
+        )
+    ).collapse()
+
+
+@pytest.mark.asyncio
+async def test_migrations_run_on_every_shard(settings):
+    planned = await migrate_tables(settings, dry_run=True)
+
+    assert planned[0][0] == "shard 0: schema versions"
+    assert planned[-1][0].startswith("shard 1: ")
+
+
+@pytest.mark.asyncio
+async def test_ids_say_which_shard_holds_a_post_and_its_comments(model_map):
+    assert await _create_posts(model_map) == [1, 2, 5]
+
+    comments = model_map["comment"]
+    comment_ids = (
+        await comments.create_many(
+            [
+                {"post_id": 2, "author_id": "d", "content": "c"},
+                {"post_id": 1, "author_id": "a", "content": "c"},
+            ]
+        )
+    ).collapse()
+    reaction = await model_map["reaction"].create(
+        comment_id=comment_ids[0], author_id="d", reaction_type="like"
+    )
+
+    assert comment_ids == [2, 1]
+    assert reaction.collapse() == 2
+    shard0, shard1 = comments.shards
+    assert [row.id for row in await shard1.load_all("id")] == [2]
+    assert [row.id for row in await shard0.load_all("id")] == [1]
+
+
+@pytest.mark.asyncio
+async def test_loads_are_split_between_shards_and_merged(model_map):
+    await _create_posts(model_map)
+    posts = model_map["post"]
+
+    rows = await posts.load_all("id", id=[5, 2, 1, 3])
+    assert [row.id for row in rows] == [1, 2, 5]
+    assert await posts.load_all("id", id=3) == []
+    assert sorted(await posts.count_all()) == [(3,)]
+
+    page = PageSpec(where={}, order_by=("id",), descending=True, limit=2)
+    [rows] = await posts.load_pages("id", pages=[page])
+    assert [row.id for row in rows] == [5, 2]
+
+
+@pytest.mark.asyncio
+async def test_writes_go_to_the_shard_of_the_item(model_map):
+    await _create_posts(model_map)
+    posts = model_map["post"]
+
+    assert (await posts.update(2, title="edited")).collapse() == 1
+    assert (await posts.delete(5)).collapse() == 1
+    # ids of shards that don't exist match nothing
+    assert (await posts.update(3, title="edited")).collapse() == 0
+
+    rows = await posts.load_all("id", "title")
+    assert sorted((row.id, row.title) for row in rows) == [(1, "d1"), (2, "edited")]
+
+
+@pytest.mark.asyncio
+async def test_requests_have_a_session_on_each_shard(model_map):
+    await _create_posts(model_map)
+    session = ShardedSession(routers_of(model_map["post"]))
+    bound = bind_model_map(model_map, session)
+
+    try:
+        rows = await bound["post"].load_all("id", id=[1, 2])
+        assert all(isinstance(shard, RequestSession) for shard in session.shards)
+        assert sorted(row.id for row in rows) == [1, 2]
+    finally:
+        await session.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_creates_are_given_distinct_ids(model_map):
+    posts = model_map["post"]
+    results = await asyncio.gather(
+        *(posts.create(title=f"d{i}", author_id="d") for i in range(5))
+    )
+
+    assert sorted(result.collapse() for result in results) == [1, 5, 9, 13, 17]
+
+
+@pytest.mark.asyncio
+async def test_rows_on_the_wrong_shard_are_refused(model_map):
+    await _create_posts(model_map)
+    await check_shard_ids(model_map)
+
+    # e.g. a post written before the database was sharded
+    shard0 = model_map["post"].shards[0]
+    async with shard0.engine.begin() as conn:
+        await conn.execute(
+            shard0.table.insert().values(id=2, title="old", author_id="d")
+        )
+
+    assert await model_map["post"].misplaced_ids() == {0: 2}
+    with pytest.raises(ValueError, match="post 2 on shard 0"):
+        await check_shard_ids(model_map)
+
+
+@pytest.mark.asyncio
+async def test_a_sample_of_the_lowest_and_highest_ids_can_be_checked(model_map):
+    await _create_posts(model_map)
+    shard0 = model_map["post"].shards[0]
+    async with shard0.engine.begin() as conn:
+        await conn.execute(
+            shard0.table.insert().values(id=2, title="old", author_id="d")
+        )
+
+    # the shard holds the ids 1, 2 and 5
+    assert await model_map["post"].misplaced_ids(sample=1) == {}
+    assert await model_map["post"].misplaced_ids(sample=2) == {0: 2}
+    await check_shard_ids(model_map, sample=1)
@@ -0,0 +1,65 @@
+import asyncio
+import json
+import logging
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from blog_app.core.model.slow_queries import (
+    SlowQueryLog,
+    current_operation,
+    parameter_shape,
+    statement_template,
+)
+
+
+def test_statement_template_collapses_lists_of_parameters():
+    assert statement_template("SELECT * FROM post WHERE id IN (?, ?)") == (
+        statement_template("SELECT *\n  FROM post WHERE id IN (?, ?, ?, ?)")
+    )
+
+
+def test_parameter_shape_hides_values():
+    assert parameter_shape({"id": 1, "title": "secret"}) == "id: int, title: str"
+    assert parameter_shape(None) == ""
+
+
+@pytest.mark.asyncio
+async def test_fast_statements_are_not_logged(mocker):
+    log = SlowQueryLog(10.0)
+    record = mocker.patch.object(log, "record")
+    engine = create_async_engine("sqlite+aiosqlite://")
+    log.attach(engine)
+
+    async with engine.connect() as conn:
+        await conn.exec_driver_sql("SELECT 1")
+    await engine.dispose()
+
+    record.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_slow_statements_are_logged_and_explained(tmp_path, caplog):
+    plans = tmp_path / "plans.jsonl"
+    log = SlowQueryLog(0.0, explain_rate=1.0, explain_file=str(plans))
+    engine = create_async_engine("sqlite+aiosqlite://")
+    log.attach(engine)
+
+    token = current_operation.set("GetPosts")
+    try:
+        with caplog.at_level(logging.WARNING):
+            async with engine.connect() as conn:
+                await conn.exec_driver_sql("SELECT ? + ?", (1, 2))
+    finally:
+        current_operation.reset(token)
+    await asyncio.gather(*log._tasks)
+    await engine.dispose()
+
+    logged = json.loads(caplog.records[0].getMessage().split(": ", 1)[1])
+    assert logged["operation"] == "GetPosts"
+    assert logged["statement"] == "SELECT ? + ?"
+    assert logged["parameters"] == "int*2"
+
+    plan = json.loads(plans.read_text().splitlines()[0])
+    assert plan["statement"] == "SELECT ? + ?"
+    assert plan["plan"]
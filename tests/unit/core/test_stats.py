@@ -0,0 +1,77 @@
+import logging
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.schema import MetaData
+
+from blog_app.core.model import SqlBudget, SqlBudgetExceeded, SqlStats, register_tables
+
+
+@pytest.fixture
+def model_map():
+    return register_tables(MetaData())
+
+
+@pytest.fixture
+def sync_conn(model_map):
+    conn = create_engine("sqlite://", future=True).connect()
+    model_map["post"].table.metadata.create_all(conn)
+    conn.execute(
+        model_map["post"].table.insert(),
+        [{"title": "first", "author_id": "a"}, {"title": "second", "author_id": "a"}],
+    )
+    return conn
+
+
+@pytest.fixture
+def tracked(mocker, sync_conn):
+    # an async connection, running its statements on `sync_conn`
+    conn = mocker.Mock(execute=mocker.AsyncMock(side_effect=sync_conn.execute))
+    return lambda stats: stats.track(conn)
+
+
+@pytest.mark.asyncio
+async def test_tracked_connection_counts_statements_rows_and_bytes(model_map, tracked):
+    stats = SqlStats()
+    conn = tracked(stats)
+    posts = model_map["post"].table
+
+    cursor = await conn.execute(posts.select().with_only_columns([posts.c.title]))
+    assert cursor.scalars().all() == ["first", "second"]
+    await conn.execute(posts.update().values(title="third").where(posts.c.id == 1))
+
+    report = stats.report()
+    assert report["tables"]["post"]["statements"] == 2
+    assert report["tables"]["post"]["rows"] == 2
+    assert report["tables"]["post"]["bytes"] == len("first") + len("second")
+    assert report["statements"] == 2
+    assert not report["overBudget"]
+
+
+@pytest.mark.asyncio
+async def test_operations_over_budget_are_logged(model_map, tracked, caplog):
+    stats = SqlStats(SqlBudget(rows=1))
+    conn = tracked(stats)
+
+    with caplog.at_level(logging.WARNING):
+        await conn.execute(model_map["post"].table.select())
+        await conn.execute(model_map["post"].table.select())
+
+    assert stats.report()["overBudget"]
+    assert stats.rejection() is None
+    assert len(caplog.records) == 1
+
+
+@pytest.mark.asyncio
+async def test_statements_over_budget_are_rejected(model_map, tracked):
+    stats = SqlStats(SqlBudget(statements=1, reject=True))
+    conn = tracked(stats)
+    stmt = model_map["post"].table.select()
+
+    await conn.execute(stmt)
+    await conn.execute(stmt)
+    with pytest.raises(SqlBudgetExceeded):
+        await conn.execute(stmt)
+
+    assert stats.report()["statements"] == 2
+    assert stats.rejection()
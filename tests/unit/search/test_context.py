@@ -0,0 +1,55 @@
+from collections import namedtuple
+from decimal import Decimal
+
+import pytest
+
+from blog_app.core import SearchHit
+from blog_app.search.context import Context
+
+
+Match = namedtuple("Match", ["id", "score"])
+
+
+@pytest.fixture
+def models(mocker):
+    comments, posts = mocker.Mock(), mocker.Mock()
+    comments.load_matches = mocker.AsyncMock(
+        return_value=[Match(3, Decimal("0.9")), Match(5, Decimal("0.4"))]
+    )
+    posts.load_matches = mocker.AsyncMock(
+        return_value=[Match(1, Decimal("0.9")), Match(2, Decimal("0.7"))]
+    )
+    return {"comment": comments, "post": posts}
+
+
+@pytest.mark.asyncio
+async def test_search_merges_hits_by_relevance(models):
+    hits = await Context(models).search("cats", first=3)
+
+    assert hits == [
+        SearchHit("comment", 3, Decimal("0.9")),
+        SearchHit("post", 1, Decimal("0.9")),
+        SearchHit("post", 2, Decimal("0.7")),
+    ]
+    for model in models.values():
+        model.load_matches.assert_awaited_once_with("cats", after=None, limit=3)
+
+
+@pytest.mark.asyncio
+async def test_search_continues_after_cursor_for_each_kind(models):
+    await Context(models).search("cats", first=3, after=(Decimal("0.9"), "comment", 3))
+
+    # as relevant posts follow the comment, but not as relevant comments
+    # with lower ids.
+    models["comment"].load_matches.assert_awaited_once_with(
+        "cats", after=(Decimal("0.9"), 3), limit=3
+    )
+    models["post"].load_matches.assert_awaited_once_with(
+        "cats", after=(Decimal("0.9"), 0), limit=3
+    )
+
+    await Context(models).search("cats", first=3, after=(Decimal("0.9"), "post", 1))
+    assert models["comment"].load_matches.await_args.kwargs["after"] == (
+        Decimal("0.9"),
+        None,
+    )
@@ -0,0 +1,45 @@
+from collections import namedtuple
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from sqlalchemy.schema import MetaData
+
+from blog_app.comments.context import build_comment_context
+from blog_app.core import SearchHit
+from blog_app.core.model import register_tables
+from blog_app.posts.context import build_post_context
+from blog_app.search.resolvers import search
+
+
+Row = namedtuple("Row", ["id"])
+
+
+@pytest.mark.asyncio
+async def test_search_loads_hits_of_each_kind_together(mocker):
+    model_map = register_tables(MetaData())
+    load_posts = mocker.AsyncMock(side_effect=lambda id: [Row(i) for i in id])
+    load_comments = mocker.AsyncMock(side_effect=lambda id: [Row(i) for i in id])
+    model_map["post"].load_all = load_posts  # type: ignore[assignment]
+    model_map["comment"].load_all = load_comments  # type: ignore[assignment]
+    hits = [
+        SearchHit("comment", 3, Decimal("0.9")),
+        SearchHit("post", 1, Decimal("0.9")),
+        SearchHit("comment", 5, Decimal("0.4")),
+        SearchHit("post", 2, Decimal("0.3")),
+    ]
+    info: Any = SimpleNamespace(
+        context=SimpleNamespace(
+            search=SimpleNamespace(search=mocker.AsyncMock(return_value=hits)),
+            posts=await build_post_context(model_map),
+            comments=await build_comment_context(model_map),
+        )
+    )
+
+    results = await search("cats", info, first=4)
+
+    assert [edge.node.id for edge in results.edges] == [3, 1, 5, 2]
+    # one query for each kind
+    load_posts.assert_awaited_once_with(id=[1, 2])
+    load_comments.assert_awaited_once_with(id=[3, 5])